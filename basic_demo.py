@@ -3,14 +3,18 @@
 Basic MCP Demo - Test the Browserbase MCP server directly without Gemini.
 
 This script demonstrates how to use the MCP server directly for web automation.
+A single MCP server and browser session are kept for the whole demo, so every
+step sees the page left behind by the previous one.
 """
 
 import asyncio
 import json
 import os
+import shlex
 import sys
+import time
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 
 from dotenv import load_dotenv
 from rich.console import Console
@@ -18,20 +22,32 @@ from rich.panel import Panel
 from rich.prompt import Prompt, Confirm
 from rich.table import Table
 
-from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
+from mcp import StdioServerParameters
+
+from mcp_session import MCPSessionManager, server_command, uses_browserbase_server
+from tool_catalog import ToolCatalog
 
 
 class BasicMCPDemo:
     """A basic demo that uses MCP directly without AI."""
     
     def __init__(self):
+        # The server command may be configured in .env
+        load_dotenv()
         self.console = Console()
         self.available_tools: List[Any] = []
-        load_dotenv()
+        command, args = server_command()
+        self.catalog = ToolCatalog(shlex.join([command, *args]))
+        self.mcp: Optional[MCPSessionManager] = None
+        self.connect_time = 0.0
+        self.timings: List[Tuple[str, float]] = []
     
     def _prepare_env(self) -> Dict[str, str]:
         """Prepare environment variables for MCP server."""
+        if not uses_browserbase_server():
+            # A custom server (e.g. the offline stand-in) needs no Browserbase credentials
+            return os.environ.copy()
+        
         api_key = os.getenv("BROWSERBASE_API_KEY")
         project_id = os.getenv("BROWSERBASE_PROJECT_ID")
         
@@ -52,7 +68,7 @@ class BasicMCPDemo:
         return env
     
     async def connect_to_mcp(self) -> bool:
-        """Connect to the Browserbase MCP server."""
+        """Connect to the Browserbase MCP server and keep the session open."""
         try:
             self.console.print("[yellow]🔌 Connecting to Browserbase MCP server...[/yellow]")
             
@@ -60,57 +76,54 @@ class BasicMCPDemo:
             if not env:
                 return False
             
-            # Start MCP server
+            # Start MCP server; it stays up until cleanup()
+            command, args = server_command()
             server_params = StdioServerParameters(
-                command="npx",
-                args=["@browserbasehq/mcp"],
+                command=command,
+                args=args,
                 env=env
             )
+            self.mcp = MCPSessionManager(server_params, message_handler=self.catalog.handle_message)
             
-            # Test connection and get tools
-            async with stdio_client(server_params) as (read, write):
-                async with ClientSession(read, write) as session:
-                    await session.initialize()
-                    
-                    # Get available tools
-                    tools_response = await session.list_tools()
-                    self.available_tools = tools_response.tools
-                    
-                    self.console.print(f"[green]✅ Connected! Found {len(self.available_tools)} tools[/green]")
-                    
-                    # Display available tools
-                    if self.available_tools:
-                        table = Table(title="Available MCP Tools")
-                        table.add_column("Tool Name", style="cyan")
-                        table.add_column("Description", style="green")
-                        
-                        for tool in self.available_tools:
-                            table.add_row(tool.name, tool.description)
-                        
-                        self.console.print(table)
-                    
-                    return True
+            started = time.perf_counter()
+            session = await self.mcp.start()
+            self.connect_time = time.perf_counter() - started
+            
+            # Get available tools (from the on-disk catalog when it is current)
+            self.available_tools = await self.catalog.ensure(session, self.mcp.server_info.version)
+            
+            self.console.print(f"[green]✅ Connected in {self.connect_time:.1f}s! Found {len(self.available_tools)} tools[/green]")
+            
+            # Display available tools
+            if self.available_tools:
+                table = Table(title="Available MCP Tools")
+                table.add_column("Tool Name", style="cyan")
+                table.add_column("Description", style="green")
+                
+                for tool in self.available_tools:
+                    table.add_row(tool.name, tool.description)
+                
+                self.console.print(table)
+            
+            # One browser session shared by every step and command
+            if any(tool.name == "browserbase_session_create" for tool in self.available_tools):
+                try:
+                    await self.call_tool("browserbase_session_create", {})
+                    self.console.print("[green]✅ Browser session created[/green]")
+                except Exception:
+                    self.console.print("[yellow]⚠️  Could not create a browser session up front; the server will create one on first use[/yellow]")
+            
+            return True
             
         except Exception as e:
             self.console.print(f"[red]❌ Failed to connect: {e}[/red]")
             return False
     
     async def _execute_with_mcp(self, func):
-        """Execute a function with an active MCP connection."""
-        env = self._prepare_env()
-        if not env:
-            raise RuntimeError("Environment not configured properly")
-        
-        server_params = StdioServerParameters(
-            command="npx",
-            args=["@browserbasehq/mcp"],
-            env=env
-        )
-        
-        async with stdio_client(server_params) as (read, write):
-            async with ClientSession(read, write) as session:
-                await session.initialize()
-                return await func(session)
+        """Execute a function with the persistent MCP session."""
+        if self.mcp is None:
+            raise RuntimeError("Not connected to the MCP server")
+        return await self.mcp.run(func)
     
     async def call_tool(self, tool_name: str, arguments: dict) -> any:
         """Call an MCP tool and return the result."""
@@ -119,11 +132,35 @@ class BasicMCPDemo:
             result = await session.call_tool(tool_name, arguments)
             return result
         
+        started = time.perf_counter()
         try:
             return await self._execute_with_mcp(_call_tool_with_session)
         except Exception as e:
             self.console.print(f"[red]❌ Error calling {tool_name}: {e}[/red]")
             raise
+        finally:
+            self.timings.append((tool_name, time.perf_counter() - started))
+    
+    def show_timings(self) -> None:
+        """Show the measured server start and tool call timings."""
+        if not self.timings:
+            return
+        
+        table = Table(
+            title="Timings",
+            caption="Compare with one server per call: python benchmarks/suite.py --scenarios server_per_call tool_call",
+        )
+        table.add_column("Step", style="cyan")
+        table.add_column("Seconds", justify="right", style="green")
+        
+        table.add_row("MCP server cold start (once)", f"{self.connect_time:.2f}")
+        for tool_name, seconds in self.timings:
+            table.add_row(tool_name, f"{seconds:.2f}")
+        
+        total = self.connect_time + sum(seconds for _, seconds in self.timings)
+        table.add_row("[bold]Total with a persistent session[/bold]", f"[bold]{total:.2f}[/bold]")
+        
+        self.console.print(table)
     
     async def demo_basic_browsing(self):
         """Demonstrate basic web browsing capabilities."""
@@ -210,7 +247,10 @@ class BasicMCPDemo:
     
     async def cleanup(self):
         """Clean up resources."""
-        # No persistent session to clean up in this fixed version
+        self.show_timings()
+        if self.mcp is not None:
+            await self.mcp.aclose()
+            self.mcp = None
         self.console.print("[dim]Resources cleaned up[/dim]")
 
 
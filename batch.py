@@ -0,0 +1,165 @@
+"""
+Headless batch mode - run a JSONL file of prompts through MCPSurfClient.
+
+Each input line is a JSON object with a ``prompt`` and an optional ``id``
+(the line number is used otherwise).  Prompts are read lazily and run with
+bounded concurrency; every result is appended to the output JSONL file as
+soon as it finishes, so a crashed run can be resumed: IDs already recorded
+with ``"status": "ok"`` are skipped.  Lines that are not valid JSON objects
+with a string ``prompt`` are recorded with ``"status": "error"`` and the run
+goes on.
+"""
+
+import asyncio
+import json
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Set, Tuple
+
+from rich.console import Console
+
+from rate_limit import Priority, request_priority
+
+
+@dataclass
+class BatchSummary:
+    """Outcome counts for one batch run."""
+    succeeded: int = 0
+    failed: int = 0
+    timed_out: int = 0
+    skipped: int = 0
+    elapsed: float = 0.0
+
+
+def completed_ids(output_path: Path) -> Set[str]:
+    """IDs that already have a successful result in the output file."""
+    done: Set[str] = set()
+    if not output_path.exists():
+        return done
+    with output_path.open() as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A crash can leave a truncated last line behind
+                continue
+            if record.get("status") == "ok":
+                done.add(str(record.get("id")))
+    return done
+
+
+def read_prompts(input_path: Path) -> Iterator[Tuple[str, Optional[str], Optional[str]]]:
+    """Yield (id, prompt, error) from a JSONL file, one line at a time.
+
+    ``error`` says why a line is unusable, in which case ``prompt`` is None.
+    """
+    with input_path.open() as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError as e:
+                yield str(line_number), None, f"Line {line_number} is not valid JSON: {e}"
+                continue
+            if not isinstance(item, dict):
+                yield str(line_number), None, f"Line {line_number} is not a JSON object"
+                continue
+            item_id = str(item.get("id", line_number))
+            prompt = item.get("prompt")
+            if not isinstance(prompt, str) or not prompt.strip():
+                yield item_id, None, f"Line {line_number} has no \"prompt\" string"
+                continue
+            yield item_id, prompt, None
+
+
+async def run_batch(
+    client: Any,
+    input_path: Path,
+    output_path: Path,
+    concurrency: int = 4,
+    timeout: float = 300.0,
+    console: Console = None,
+) -> BatchSummary:
+    """Run every pending prompt in ``input_path`` through ``client.chat_stream``."""
+    console = console or Console()
+    summary = BatchSummary()
+    done = completed_ids(output_path)
+    semaphore = asyncio.Semaphore(concurrency)
+    write_lock = asyncio.Lock()
+    tasks: Set[asyncio.Task] = set()
+    started = time.perf_counter()
+
+    async def chat(prompt: str) -> Tuple[str, str]:
+        chunks, errors = [], []
+        # Interactive users of the same client get the upstream quotas first
+        with request_priority(Priority.BATCH):
+            async for event in client.chat_stream(prompt):
+                if event.type == "text":
+                    chunks.append(event.text)
+                elif event.type == "error":
+                    errors.append(event.text)
+        return "".join(chunks), "\n".join(errors)
+
+    async def run_one(item_id: str, prompt: str, output) -> None:
+        item_started = time.perf_counter()
+        record: Dict[str, Any] = {"id": item_id, "prompt": prompt}
+        try:
+            response, error = await asyncio.wait_for(chat(prompt), timeout)
+            record["response"] = response
+            if error:
+                record.update(status="error", error=error)
+                summary.failed += 1
+            else:
+                record["status"] = "ok"
+                summary.succeeded += 1
+        except asyncio.TimeoutError:
+            record.update(status="timeout", error=f"Timed out after {timeout:g}s")
+            summary.timed_out += 1
+        except Exception as e:
+            record.update(status="error", error=str(e))
+            summary.failed += 1
+        finally:
+            semaphore.release()
+        record["elapsed"] = round(time.perf_counter() - item_started, 3)
+        await write(record, output)
+
+    async def write(record: Dict[str, Any], output) -> None:
+        async with write_lock:
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            output.flush()
+
+        style = "green" if record["status"] == "ok" else "red"
+        console.print(f"[{style}]{'✅' if style == 'green' else '❌'} {record['id']}[/{style}] [dim]({record['elapsed']:.1f}s)[/dim]")
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with output_path.open("a") as output:
+        try:
+            for item_id, prompt, error in read_prompts(input_path):
+                if item_id in done:
+                    summary.skipped += 1
+                    continue
+                if error is not None:
+                    summary.failed += 1
+                    console.print(f"[yellow]⚠️  {error}[/yellow]")
+                    await write({"id": item_id, "status": "error", "error": error, "elapsed": 0.0}, output)
+                    continue
+                await semaphore.acquire()
+                task = asyncio.create_task(run_one(item_id, prompt, output))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            # On any abort, stop the items still running before their output file closes;
+            # they have no record yet, so a resumed run picks them up again
+            pending = list(tasks)
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    summary.elapsed = time.perf_counter() - started
+    return summary
@@ -0,0 +1,5 @@
+"""
+Benchmarks for MCP Surf Demo.
+
+Each module can be run directly, e.g. ``python benchmarks/gemini_concurrency.py``.
+"""
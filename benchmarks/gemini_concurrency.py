@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Chat-turn throughput vs. concurrency on a single event loop.
+
+Runs MCPSurfClient's chat turn against a simulated Gemini model with a fixed
+response latency and compares two modes:
+
+- ``blocking``: the model call sleeps synchronously, like the old
+  ``chat.send_message(...)`` did, so it stalls the event loop.
+- ``async``: the model call awaits, like ``send_message_async``.
+
+No API keys or MCP server are needed.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+from rich.console import Console
+from rich.table import Table
+
+# Add parent directory to path to import main
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from main import MCPSurfClient
+
+
+class SimulatedResponse:
+    """A single-chunk text response that also works as a stream."""
+
+    def __init__(self, text: str):
+        part = SimpleNamespace(text=text, function_call=None)
+        self.candidates = [SimpleNamespace(content=SimpleNamespace(parts=[part]))]
+        self.text = text
+
+    async def __aiter__(self):
+        yield self
+
+
+class SimulatedChat:
+    """A chat session that answers with plain text after a fixed latency."""
+
+    def __init__(self, latency: float, blocking: bool):
+        self.latency = latency
+        self.blocking = blocking
+
+    async def send_message_async(self, content, **kwargs):
+        if self.blocking:
+            time.sleep(self.latency)
+        else:
+            await asyncio.sleep(self.latency)
+        return SimulatedResponse("ok")
+
+
+class IdleSession:
+    """Stands in for the MCP session: the simulated turns never call a tool."""
+
+
+class SimulatedModel:
+    def __init__(self, latency: float, blocking: bool):
+        self.latency = latency
+        self.blocking = blocking
+
+    def start_chat(self, **kwargs):
+        return SimulatedChat(self.latency, self.blocking)
+
+
+async def measure(client: MCPSurfClient, concurrency: int, turns: int) -> float:
+    """Run ``turns`` chat turns with ``concurrency`` workers; return turns/second."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one_turn(i: int) -> None:
+        async with semaphore:
+            await client._chat_with_session(IdleSession(), f"message {i}")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one_turn(i) for i in range(turns)))
+    return turns / (time.perf_counter() - started)
+
+
+async def run(latency: float, levels: list, turns_per_worker: int) -> None:
+    console = Console()
+    os.environ.setdefault("GEMINI_API_KEY", "benchmark-placeholder")
+    client = MCPSurfClient()
+    # No MCP server: start from an empty, up-to-date tool catalog
+    client.catalog.set_tools([], None)
+
+    table = Table(title=f"Chat turns/second (simulated Gemini latency {latency * 1000:.0f} ms)")
+    table.add_column("Concurrency", justify="right", style="cyan")
+    table.add_column("blocking", justify="right")
+    table.add_column("async", justify="right", style="green")
+
+    for concurrency in levels:
+        turns = concurrency * turns_per_worker
+        client.model = SimulatedModel(latency, blocking=True)
+        blocking = await measure(client, concurrency, turns)
+        client.model = SimulatedModel(latency, blocking=False)
+        non_blocking = await measure(client, concurrency, turns)
+        table.add_row(str(concurrency), f"{blocking:.1f}", f"{non_blocking:.1f}")
+
+    console.print(table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated Gemini latency in seconds")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--turns-per-worker", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args.latency, args.levels, args.turns_per_worker))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Cost of the in-process metrics on the hot path.
+
+Times the raw instrument operations (``Counter.inc``, ``Histogram.observe``)
+and the recording ``call_tool`` does per call, next to the cost of
+``MCPSurfClient.call_tool`` against an in-memory session.  The end-to-end
+difference with recording on and off is measured in interleaved rounds and
+reported as a median with its spread: a single off-then-on run is mostly
+noise at this scale.
+
+No API keys or MCP server are needed.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+from mcp.types import CallToolResult, TextContent
+from rich.console import Console
+from rich.table import Table
+
+# Add parent directory to path to import main
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.stats import percentile
+from main import MCPSurfClient
+from metrics import MetricsRegistry
+
+
+class InMemorySession:
+    """Answers every tool call immediately with the same small result."""
+
+    def __init__(self):
+        self.result = CallToolResult(content=[TextContent(type="text", text="ok")])
+        # Request ids, as kept by ClientSession (used to cancel calls that time out)
+        self._request_id = 0
+
+    async def call_tool(self, name, arguments):
+        self._request_id += 1
+        return self.result
+
+
+def time_sync(func, iterations: int) -> float:
+    """Nanoseconds per call of ``func()``."""
+    started = time.perf_counter_ns()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter_ns() - started) / iterations
+
+
+async def time_call_tool(client: MCPSurfClient, iterations: int) -> float:
+    """Nanoseconds per uncached ``call_tool``."""
+    session = InMemorySession()
+    started = time.perf_counter_ns()
+    for _ in range(iterations):
+        await client.call_tool(session, "browserbase_navigate", {"url": "https://example.com"})
+    return (time.perf_counter_ns() - started) / iterations
+
+
+async def run(iterations: int, rounds: int) -> None:
+    console = Console()
+    os.environ.setdefault("GEMINI_API_KEY", "benchmark-placeholder")
+
+    registry = MetricsRegistry()
+    counter = registry.counter("calls_total", "Calls", ("tool", "result"))
+    histogram = registry.histogram("call_seconds", "Latency", ("tool",))
+
+    client = MCPSurfClient(setup_gemini=False)
+    client.console = Console(quiet=True)
+    record = client._record_tool_call
+    recording = time_sync(lambda: record("browserbase_navigate", "ok", time.perf_counter()), iterations)
+
+    def disable_metrics(tool_name, result, started):
+        pass
+
+    per_round = max(1, iterations // rounds)
+    await time_call_tool(client, per_round)  # warm up
+    off, on = [], []
+    for i in range(rounds):
+        # Alternate which mode goes first so drift doesn't favour either
+        for enabled in ((False, True) if i % 2 == 0 else (True, False)):
+            client._record_tool_call = record if enabled else disable_metrics
+            (on if enabled else off).append(await time_call_tool(client, per_round))
+    client._record_tool_call = record
+    deltas = [with_metrics - without_metrics for with_metrics, without_metrics in zip(on, off)]
+
+    def spread(samples):
+        return f"{percentile(samples, 10):.0f} … {percentile(samples, 90):.0f}"
+
+    table = Table(title=f"Metrics overhead ({iterations:,} iterations, {rounds} interleaved rounds of call_tool)")
+    table.add_column("Operation", style="cyan")
+    table.add_column("ns/op", justify="right", style="green")
+    table.add_column("p10 … p90", justify="right")
+    table.add_row("Counter.inc", f"{time_sync(lambda: counter.inc('browserbase_get_text', 'ok'), iterations):.0f}", "")
+    table.add_row("Histogram.observe", f"{time_sync(lambda: histogram.observe(0.42, 'browserbase_get_text'), iterations):.0f}", "")
+    table.add_row("recording per tool call", f"{recording:.0f}", "")
+    table.add_row("call_tool, metrics off", f"{statistics.median(off):.0f}", spread(off))
+    table.add_row("call_tool, metrics on", f"{statistics.median(on):.0f}", spread(on))
+    table.add_row("on - off, per round", f"{statistics.median(deltas):.0f}", spread(deltas))
+    table.add_row("recording / call_tool", f"{recording / statistics.median(off):.2%}", "")
+    console.print(table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=20, help="Interleaved off/on rounds of call_tool (default: 20)")
+    args = parser.parse_args()
+    asyncio.run(run(args.iterations, args.rounds))
+
+
+if __name__ == "__main__":
+    main()
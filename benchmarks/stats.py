@@ -0,0 +1,139 @@
+"""
+Summary statistics and resource usage helpers for the benchmarks.
+"""
+
+import asyncio
+import os
+import resource
+import sys
+from typing import Dict, List, Optional, Union
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Linearly interpolated percentile of ``samples`` (0 <= pct <= 100)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(samples: List[float], wall_time: float) -> Dict[str, float]:
+    """Latency distribution in milliseconds plus throughput in operations per second."""
+    return {
+        "iterations": len(samples),
+        "mean_ms": round(sum(samples) / len(samples) * 1000, 3) if samples else 0.0,
+        "min_ms": round(min(samples) * 1000, 3) if samples else 0.0,
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+        "max_ms": round(max(samples) * 1000, 3) if samples else 0.0,
+        "throughput_per_s": round(len(samples) / wall_time, 3) if wall_time > 0 else 0.0,
+    }
+
+
+def _maxrss_mb(who: int) -> float:
+    maxrss = resource.getrusage(who).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _vm_hwm_kb(pid: Union[int, str]) -> Optional[int]:
+    """Peak RSS of a live process from ``/proc/<pid>/status`` (Linux only)."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _descendants(pid: int) -> List[int]:
+    """Live descendants of ``pid`` found through ``/proc``."""
+    parents: Dict[int, int] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces; the parent id follows it
+                fields = f.read().rsplit(")", 1)[1].split()
+            parents[int(entry)] = int(fields[1])
+        except (OSError, IndexError, ValueError):
+            continue
+    found, frontier = [], [pid]
+    while frontier:
+        parent = frontier.pop()
+        children = [child for child, ppid in parents.items() if ppid == parent]
+        found.extend(children)
+        frontier.extend(children)
+    return found
+
+
+class ServerRssSampler:
+    """Track the largest peak RSS among this process's live child processes.
+
+    ``RUSAGE_CHILDREN`` only covers reaped children, and on Linux a child
+    inherits its parent's ``ru_maxrss`` across exec, so the MCP servers are
+    sampled through ``/proc`` while they run.  Where ``/proc`` is missing the
+    ``RUSAGE_CHILDREN`` figure is used instead.
+
+    Usage::
+
+        async with ServerRssSampler() as sampler:
+            await scenario()
+        server_mb = sampler.peak_mb
+    """
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak_kb: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def sample(self) -> None:
+        for pid in _descendants(os.getpid()):
+            hwm = _vm_hwm_kb(pid)
+            if hwm is not None:
+                self.peak_kb = max(self.peak_kb or 0, hwm)
+
+    async def _sample_forever(self) -> None:
+        while True:
+            self.sample()
+            await asyncio.sleep(self.interval)
+
+    async def __aenter__(self) -> "ServerRssSampler":
+        if os.path.isdir("/proc"):
+            self._task = asyncio.create_task(self._sample_forever())
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    @property
+    def peak_mb(self) -> float:
+        if self.peak_kb is None:
+            return _maxrss_mb(resource.RUSAGE_CHILDREN)
+        return round(self.peak_kb / 1024, 1)
+
+
+def peak_rss(sampler: ServerRssSampler) -> Dict[str, float]:
+    """Peak resident set size of this process and of the largest server child (MB).
+
+    The client figure is a high-water mark over the life of the process, so
+    it only describes one scenario when that scenario ran in a process of its
+    own.
+    """
+    own = _vm_hwm_kb("self")
+    return {
+        "client_peak_rss_mb": round(own / 1024, 1) if own is not None else _maxrss_mb(resource.RUSAGE_SELF),
+        "server_peak_rss_mb": sampler.peak_mb,
+    }
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark suite for MCP Surf Demo.
+
+Scenarios:
+
+- ``cold_connect``: spawn the MCP server, initialize, list tools, shut down
+  (what ``_test_mcp_connection`` used to cost on every start)
+- ``server_per_call``: spawn the MCP server, initialize, navigate once, shut
+  down (what every ``BasicMCPDemo`` tool call used to cost)
+- ``tool_call``: one ``browserbase_get_text`` on a warm session
+- ``chat_turn``: a full chat turn that navigates and reads a page
+- ``concurrent_chats``: many chat turns at once over a warm session pool
+
+By default everything runs against the offline stand-in server and a scripted
+Gemini model, so numbers are reproducible and need no API keys; ``--live``
+uses the configured servers instead.  Each scenario runs in a fresh process
+and the MCP servers' memory is sampled while they run, so the peak RSS columns
+belong to that scenario alone.  Results are printed as a table and can be
+written as JSON to diff across commits:
+
+    python benchmarks/suite.py --output before.json
+    python benchmarks/suite.py --baseline before.json
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from rich.console import Console
+from rich.table import Table
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.stats import ServerRssSampler, peak_rss, summarize
+
+SCENARIOS = ["cold_connect", "server_per_call", "tool_call", "chat_turn", "concurrent_chats"]
+PAGE_URL = "https://example.com"
+
+# Latency applied to the scripted Gemini model in offline mode (seconds)
+gemini_latency: Optional[float] = None
+
+
+def configure_offline(tool_latency_ms: float, gemini_latency_ms: float) -> None:
+    """Point the client at the stand-in server and scripted Gemini."""
+    global gemini_latency
+    gemini_latency = gemini_latency_ms / 1000
+    os.environ["MCP_SERVER_COMMAND"] = sys.executable
+    os.environ["MCP_SERVER_ARGS"] = os.path.join(ROOT, "offline", "mcp_server.py")
+    os.environ["STANDIN_LATENCY_MS"] = str(tool_latency_ms)
+    os.environ["GEMINI_SCRIPT"] = os.path.join(ROOT, "offline", "scripts", "browse_example.json")
+    os.environ.setdefault("MCP_TOOL_CACHE", os.path.join(tempfile.mkdtemp(), "tool_catalog.json"))
+
+
+def make_client(pool_size: int = 1):
+    """A client with the result cache disabled so every turn hits the tools."""
+    os.environ["MCP_POOL_MIN_SIZE"] = str(pool_size)
+    os.environ["MCP_POOL_MAX_SIZE"] = str(pool_size)
+    from main import MCPSurfClient
+    from result_cache import ToolResultCache
+
+    client = MCPSurfClient()
+    client.console.quiet = True
+    client.tool_cache = ToolResultCache(policies={})
+    if gemini_latency is not None:
+        client.model.latency = gemini_latency
+    return client
+
+
+async def timed(operation: Callable[[], Awaitable[Any]], iterations: int) -> Dict[str, Any]:
+    samples: List[float] = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        op_started = time.perf_counter()
+        await operation()
+        samples.append(time.perf_counter() - op_started)
+    return summarize(samples, time.perf_counter() - started)
+
+
+async def bench_cold_connect(iterations: int, concurrency: int) -> Dict[str, Any]:
+    from mcp_session import MCPSessionManager
+
+    client = make_client()
+
+    async def connect() -> None:
+        async with MCPSessionManager(client._server_params()) as manager:
+            await manager.run(lambda session: session.list_tools())
+
+    return await timed(connect, iterations)
+
+
+async def bench_server_per_call(iterations: int, concurrency: int) -> Dict[str, Any]:
+    from mcp import ClientSession
+    from mcp.client.stdio import stdio_client
+
+    client = make_client()
+
+    async def call() -> None:
+        async with stdio_client(client._server_params()) as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                await session.call_tool("browserbase_navigate", {"url": PAGE_URL})
+
+    return await timed(call, iterations)
+
+
+async def bench_tool_call(iterations: int, concurrency: int) -> Dict[str, Any]:
+    async with make_client() as client:
+        async with client.pool.acquire() as session:
+            await session.call_tool("browserbase_navigate", {"url": PAGE_URL})
+            return await timed(lambda: session.call_tool("browserbase_get_text", {}), iterations)
+
+
+async def bench_chat_turn(iterations: int, concurrency: int) -> Dict[str, Any]:
+    async with make_client() as client:
+        await client.chat("warm up")
+        return await timed(lambda: client.chat(f"What is on {PAGE_URL}?"), iterations)
+
+
+async def bench_concurrent_chats(iterations: int, concurrency: int) -> Dict[str, Any]:
+    async with make_client(pool_size=concurrency) as client:
+        samples: List[float] = []
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one_chat() -> None:
+            async with semaphore:
+                started = time.perf_counter()
+                await client.chat(f"What is on {PAGE_URL}?")
+                samples.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one_chat() for _ in range(iterations * concurrency)))
+        result = summarize(samples, time.perf_counter() - started)
+        result["concurrency"] = concurrency
+        return result
+
+
+BENCHMARKS = {
+    "cold_connect": bench_cold_connect,
+    "server_per_call": bench_server_per_call,
+    "tool_call": bench_tool_call,
+    "chat_turn": bench_chat_turn,
+    "concurrent_chats": bench_concurrent_chats,
+}
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_scenario(name: str, iterations: int, concurrency: int, gemini_latency_s: Optional[float]) -> Dict[str, Any]:
+    """Run one scenario in the current process and add its peak RSS."""
+    global gemini_latency
+    gemini_latency = gemini_latency_s
+
+    async def measure() -> Dict[str, Any]:
+        async with ServerRssSampler() as sampler:
+            result = await BENCHMARKS[name](iterations, concurrency)
+        result.update(peak_rss(sampler))
+        return result
+
+    return asyncio.run(measure())
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    report: Dict[str, Any] = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "mode": "live" if args.live else "offline",
+        "settings": {
+            "iterations": args.iterations,
+            "concurrency": args.concurrency,
+            "tool_latency_ms": args.tool_latency_ms,
+            "gemini_latency_ms": args.gemini_latency_ms,
+        },
+        "scenarios": {},
+    }
+    spawn = multiprocessing.get_context("spawn")
+    for name in args.scenarios:
+        # The client's peak RSS is a high-water mark for the whole process, so
+        # only a fresh process measures a single scenario
+        with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as executor:
+            result = executor.submit(run_scenario, name, args.iterations, args.concurrency, gemini_latency).result()
+        report["scenarios"][name] = result
+    return report
+
+
+def print_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]], console: Console) -> None:
+    table = Table(title=f"Benchmarks ({report['mode']}, commit {report['commit'] or 'unknown'})")
+    table.add_column("Scenario", style="cyan", no_wrap=True)
+    for column in ("p50 ms", "p95 ms", "p99 ms", "ops/s", "client RSS MB", "server RSS MB"):
+        table.add_column(column, justify="right")
+    if baseline:
+        table.add_column("p50 vs baseline", justify="right")
+
+    for name, result in report["scenarios"].items():
+        row = [
+            name,
+            f"{result['p50_ms']:.1f}",
+            f"{result['p95_ms']:.1f}",
+            f"{result['p99_ms']:.1f}",
+            f"{result['throughput_per_s']:.1f}",
+            f"{result['client_peak_rss_mb']:.0f}",
+            f"{result['server_peak_rss_mb']:.0f}",
+        ]
+        if baseline:
+            before = baseline.get("scenarios", {}).get(name)
+            if before and before["p50_ms"]:
+                change = (result["p50_ms"] - before["p50_ms"]) / before["p50_ms"] * 100
+                style = "green" if change <= 0 else "red"
+                row.append(f"[{style}]{change:+.1f}%[/{style}]")
+            else:
+                row.append("-")
+        table.add_row(*row)
+
+    console.print(table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end benchmarks for MCP Surf Demo")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("-n", "--iterations", type=int, default=20, help="Iterations per scenario (default: 20)")
+    parser.add_argument("-c", "--concurrency", type=int, default=8, help="Parallel chats for concurrent_chats (default: 8)")
+    parser.add_argument("--tool-latency-ms", type=float, default=20.0, help="Injected stand-in tool latency (default: 20)")
+    parser.add_argument("--gemini-latency-ms", type=float, default=50.0, help="Scripted Gemini latency (default: 50)")
+    parser.add_argument("--live", action="store_true", help="Use the configured MCP server and Gemini instead of the offline stand-ins")
+    parser.add_argument("-o", "--output", help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", help="Compare p50 latencies with a previous JSON report")
+    args = parser.parse_args()
+
+    if not args.live:
+        configure_offline(args.tool_latency_ms, args.gemini_latency_ms)
+
+    console = Console()
+    report = run(args)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(report, baseline, console)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        console.print(f"[green]✅ Results written to {args.output}[/green]")
+
+
+if __name__ == "__main__":
+    main()
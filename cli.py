@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+MCP Surf Demo command line.
+
+    python cli.py chat                 # interactive Gemini + Browserbase chat (default)
+    python cli.py demo                 # drive the MCP server directly, without Gemini
+    python cli.py status               # show which API keys are configured
+    python cli.py test                 # test the Gemini and Browserbase configuration
+    python cli.py setup                # configuration wizard
+    python cli.py batch prompts.jsonl -o results.jsonl
+    python cli.py serve --port 8080
+
+Importing google-generativeai and mcp takes far longer than anything
+``status`` does, so this module only imports ``argparse``; each subcommand
+imports what it needs when it runs.
+"""
+
+import argparse
+from typing import List, Optional
+
+
+def add_batch_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("input", help='Input JSONL; each line has a "prompt" and optional "id"')
+    parser.add_argument("-o", "--output", required=True, help="Output JSONL, appended to as items finish")
+    parser.add_argument("-c", "--concurrency", type=int, default=4, help="Prompts in flight at once (default: 4)")
+    parser.add_argument("-t", "--timeout", type=float, default=300.0, help="Per-item timeout in seconds (default: 300)")
+
+
+def add_serve_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on (default: 8080)")
+    parser.add_argument("--max-in-flight", type=int, help="Chat turns running at once (default: MCP pool size)")
+    parser.add_argument("--max-queue", type=int, help="Requests allowed to wait before 503s (default: 2x max in flight)")
+    parser.add_argument("--drain-timeout", type=float, default=30.0, help="Seconds to let running turns finish on shutdown (default: 30)")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Gemini + Browserbase MCP client")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.add_parser("chat", help="Interactive chat (default)")
+    subparsers.add_parser("demo", help="Use the MCP server directly, without Gemini")
+    subparsers.add_parser("status", help="Show the configuration status")
+    subparsers.add_parser("test", help="Test the API connections")
+    subparsers.add_parser("setup", help="Run the setup wizard")
+    add_batch_arguments(subparsers.add_parser("batch", help="Run a JSONL file of prompts headlessly"))
+    add_serve_arguments(subparsers.add_parser("serve", help="Serve chat over HTTP (POST /chat, POST /chat/stream)"))
+    return parser
+
+
+def run(args: argparse.Namespace) -> None:
+    """Run the subcommand selected by ``args``."""
+    command = args.command or "chat"
+
+    if command in ("status", "test", "setup"):
+        from config import ConfigHelper
+        helper = ConfigHelper()
+        if command == "status":
+            helper.display_status()
+        elif command == "test":
+            helper.test_connections()
+        else:
+            helper.setup_wizard()
+        return
+
+    import asyncio
+
+    if command == "demo":
+        from basic_demo import main as demo_main
+        asyncio.run(demo_main())
+    elif command == "batch":
+        from main import batch_main
+        asyncio.run(batch_main(args))
+    elif command == "serve":
+        from main import serve_main
+        asyncio.run(serve_main(args))
+    else:
+        from main import main as chat_main
+        asyncio.run(chat_main())
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    run(build_parser().parse_args(argv))
+
+
+if __name__ == "__main__":
+    main()
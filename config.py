@@ -10,11 +10,10 @@ import sys
 from pathlib import Path
 from typing import Dict
 
-import google.generativeai as genai
 from dotenv import load_dotenv
 from rich.console import Console
 from rich.panel import Panel
-from rich.prompt import Prompt, Confirm
+from rich.prompt import Confirm
 from rich.table import Table
 
 
@@ -82,6 +81,8 @@ BROWSERBASE_CONTEXT_ID=your_context_id_here
                 self.console.print("[red]❌ Gemini API key not configured[/red]")
                 return False
             
+            # Imported here so that ``status`` and ``setup`` start quickly
+            import google.generativeai as genai
             genai.configure(api_key=api_key)
             model = genai.GenerativeModel('gemini-1.5-pro-latest')
             
@@ -0,0 +1,237 @@
+"""
+Chat history that lasts longer than one turn.
+
+A :class:`Conversation` holds the Gemini history of one chat so that each
+turn starts a ``ChatSession`` from where the previous one ended: the model
+remembers which pages it already visited and what it found there instead of
+browsing again.  Turns of one conversation run one at a time.
+
+Browsing histories grow quickly, mostly through tool outputs.  Once the
+conversation goes over ``max_tokens`` it is compacted before the next turn:
+first the tool outputs and images of all but the last ``keep_turns`` turns
+are elided, and if that is not enough those old turns are replaced by a
+summary.
+"""
+
+import asyncio
+import json
+import uuid
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, List, Optional
+
+from result_shaping import estimate_tokens
+from screenshots import ImageAttachments
+
+if TYPE_CHECKING:
+    # Importing google-generativeai takes over a second; it is only needed once history is rewritten
+    import google.generativeai as genai
+
+# Gemini bills each image as a fixed number of tokens
+IMAGE_TOKENS = 258
+
+ELIDED_RESULT_CHARS = 200
+
+Summarizer = Callable[[str], Awaitable[str]]
+
+
+def _part_kind(part: "genai.protos.Part") -> Optional[str]:
+    return type(part).pb(part).WhichOneof("data")
+
+
+def content_tokens(content: "genai.protos.Content") -> int:
+    """Estimated token count of one history entry."""
+    tokens = 0
+    for part in content.parts:
+        kind = _part_kind(part)
+        if kind == "text":
+            tokens += estimate_tokens(len(part.text))
+        elif kind == "inline_data":
+            tokens += IMAGE_TOKENS
+        elif kind is not None:
+            tokens += estimate_tokens(len(type(part).to_json(part)))
+    return tokens
+
+
+def is_user_message(content: "genai.protos.Content") -> bool:
+    """Whether ``content`` starts a turn (user text rather than tool results)."""
+    kinds = {_part_kind(part) for part in content.parts}
+    return content.role == "user" and "text" in kinds and "function_response" not in kinds
+
+
+def _function_result(part: "genai.protos.Part") -> str:
+    response = type(part.function_response).to_dict(part.function_response).get("response") or {}
+    result = response.get("result", response)
+    return result if isinstance(result, str) else json.dumps(result)
+
+
+def elide_tool_outputs(content: "genai.protos.Content") -> "genai.protos.Content":
+    """Copy of ``content`` with long function results shortened and images dropped."""
+    import google.generativeai as genai
+
+    parts = []
+    for part in content.parts:
+        kind = _part_kind(part)
+        if kind == "function_response":
+            result = _function_result(part)
+            if len(result) > ELIDED_RESULT_CHARS:
+                result = result[:ELIDED_RESULT_CHARS] + f"... [{len(result) - ELIDED_RESULT_CHARS} characters elided]"
+            parts.append(genai.protos.Part(function_response=genai.protos.FunctionResponse(
+                name=part.function_response.name,
+                response={"result": result},
+            )))
+        elif kind == "inline_data":
+            parts.append(genai.protos.Part(text=f"[{part.inline_data.mime_type} image elided]"))
+        else:
+            parts.append(part)
+    return genai.protos.Content(role=content.role, parts=parts)
+
+
+def transcript(history: List["genai.protos.Content"]) -> str:
+    """Plain-text rendering of history entries, used for summaries."""
+    lines = []
+    for content in history:
+        for part in content.parts:
+            kind = _part_kind(part)
+            if kind == "text":
+                speaker = "User" if content.role == "user" else "Assistant"
+                lines.append(f"{speaker}: {part.text.strip()}")
+            elif kind == "function_call":
+                args = type(part.function_call).to_dict(part.function_call).get("args") or {}
+                lines.append(f"Assistant called {part.function_call.name}({json.dumps(args)})")
+            elif kind == "function_response":
+                result = _function_result(part)
+                lines.append(f"{part.function_response.name} returned: {result[:ELIDED_RESULT_CHARS]}")
+    return "\n".join(lines)
+
+
+def extractive_summary(history: List["genai.protos.Content"], max_chars: int = 4000) -> str:
+    """Summary without a model call: the transcript, keeping the most recent part."""
+    text = transcript(history)
+    if len(text) <= max_chars:
+        return text
+    return "..." + text[-max_chars:]
+
+
+class Conversation:
+    """History and per-conversation state shared by the turns of one chat.
+
+    Usage::
+
+        conversation = Conversation()
+        async with conversation.lock:
+            await conversation.compact_if_needed()
+            chat = model.start_chat(history=conversation.history)
+            ...
+            conversation.commit(chat.history)
+    """
+
+    def __init__(
+        self,
+        conversation_id: Optional[str] = None,
+        max_tokens: int = 32000,
+        keep_turns: int = 3,
+        attachments: Optional[ImageAttachments] = None,
+        summarize: Optional[Summarizer] = None,
+        context_id: Optional[str] = None,
+    ):
+        self.id = conversation_id or uuid.uuid4().hex
+        # Browserbase context (browser profile) whose sessions this conversation uses
+        self.context_id = context_id
+        # Page the browser was last sent to; restored if a turn gets another pooled session
+        self.page_url: Optional[str] = None
+        self.max_tokens = max_tokens
+        self.keep_turns = keep_turns
+        self.attachments = attachments or ImageAttachments()
+        self.summarize = summarize
+        self.history: List["genai.protos.Content"] = []
+        self.lock = asyncio.Lock()
+        self.turns = 0
+        self.compactions = 0
+        self._reported_tokens: Optional[int] = None
+
+    @property
+    def tokens(self) -> int:
+        """Size of the history: as last reported by Gemini, else estimated."""
+        if self._reported_tokens is not None:
+            return self._reported_tokens
+        return sum(content_tokens(content) for content in self.history)
+
+    def record_usage(self, usage: Any) -> None:
+        """Remember the token count Gemini reported for the latest request."""
+        total = getattr(usage, "total_token_count", 0)
+        if total:
+            self._reported_tokens = total
+
+    def commit(self, history: List["genai.protos.Content"]) -> None:
+        """Keep the history of a finished turn.
+
+        Anything after the last plain model reply is dropped: a turn that
+        stopped after a function call would otherwise leave a call without a
+        response, which Gemini rejects on the next turn.
+        """
+        history = list(history)
+        end = len(history)
+        while end and not (
+            history[end - 1].role == "model"
+            and all(_part_kind(part) != "function_call" for part in history[end - 1].parts)
+        ):
+            end -= 1
+        if end < len(history):
+            self._reported_tokens = None
+        self.history = history[:end]
+        self.attachments.pending = []
+        self.turns += 1
+
+    def reset(self) -> None:
+        """Forget the whole conversation."""
+        self.history = []
+        self.page_url = None
+        self.attachments = ImageAttachments(self.attachments.max_dim, self.attachments.max_bytes)
+        self._reported_tokens = None
+
+    async def compact_if_needed(self) -> bool:
+        """Compact the history if it is over budget; returns whether it did."""
+        if self.tokens <= self.max_tokens:
+            return False
+        return await self.compact()
+
+    async def compact(self) -> bool:
+        """Elide old tool outputs, then summarize old turns if still too large.
+
+        Returns False when there is nothing older than ``keep_turns`` turns.
+        """
+        import google.generativeai as genai
+
+        starts = [i for i, content in enumerate(self.history) if is_user_message(content)]
+        if len(starts) <= self.keep_turns:
+            return False
+        cutoff = starts[-self.keep_turns]
+        old, recent = self.history[:cutoff], self.history[cutoff:]
+
+        old = [elide_tool_outputs(content) for content in old]
+        # Images that are no longer in the history may be sent again
+        self.attachments.sent.clear()
+        self.compactions += 1
+        self._reported_tokens = None
+
+        target = self.max_tokens // 2
+        if sum(content_tokens(content) for content in old + recent) <= target:
+            self.history = old + recent
+            return True
+
+        summary = None
+        if self.summarize is not None:
+            try:
+                summary = await self.summarize(transcript(old))
+            except Exception:
+                summary = None
+        if not summary:
+            summary = extractive_summary(old)
+        self.history = [
+            genai.protos.Content(role="user", parts=[genai.protos.Part(
+                text=f"Summary of our conversation so far:\n{summary}"
+            )]),
+            genai.protos.Content(role="model", parts=[genai.protos.Part(
+                text="Understood. I'll keep that in mind."
+            )]),
+        ] + recent
+        return True
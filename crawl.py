@@ -0,0 +1,155 @@
+"""
+``fetch_pages``: read several web pages in one tool call.
+
+Comparing ten product pages otherwise takes ten model steps of navigate +
+get_text through a single browser.  ``fetch_pages`` is a local composite tool
+declared to Gemini next to the MCP tools: the URLs are fetched concurrently by
+the conversation's own session plus any pool sessions that can be had without
+waiting, and the pages are merged into one result in which every page gets a
+fair share of the size budget.  Pages over their share are truncated the same
+way as single tool results and stay readable through ``get_more``.
+
+The conversation's session is one of the workers, so the caller
+(``MCPSurfClient.fetch_pages``) navigates it back to the page it was on.
+"""
+
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import AsyncContextManager, Awaitable, Callable, Deque, List, Optional, Set, Tuple
+
+from mcp import ClientSession
+from mcp.types import Tool
+
+from result_shaping import ResultShaper, strip_boilerplate
+
+FETCH_PAGES_TOOL = Tool(
+    name="fetch_pages",
+    description=(
+        "Open several web pages at once and return the text of each. Use this "
+        "instead of navigating page by page when you need to read or compare "
+        "multiple pages."
+    ),
+    inputSchema={
+        "type": "object",
+        "properties": {
+            "urls": {"type": "array", "items": {"type": "string"}, "description": "URLs of the pages to read"},
+        },
+        "required": ["urls"],
+    },
+)
+
+PageFetcher = Callable[[ClientSession, str], Awaitable[str]]
+SessionBorrower = Callable[[], AsyncContextManager[Optional[ClientSession]]]
+
+# Extra workers still starting a session when their fetch_pages call finished
+_starting_workers: Set[asyncio.Task] = set()
+
+
+@dataclass
+class PageResult:
+    """Text (or error) of one fetched page."""
+
+    url: str
+    text: str = ""
+    error: Optional[str] = None
+    elapsed: float = 0.0
+
+
+def page_budgets(lengths: List[int], max_chars: int) -> List[int]:
+    """Split ``max_chars`` between pages of the given lengths.
+
+    Pages shorter than an equal share keep all of their text, and what they
+    leave over is shared by the longer ones.
+    """
+    budgets = [0] * len(lengths)
+    remaining = max_chars
+    order = sorted(range(len(lengths)), key=lengths.__getitem__)
+    for position, index in enumerate(order):
+        budgets[index] = min(lengths[index], remaining // (len(order) - position))
+        remaining -= budgets[index]
+    return budgets
+
+
+async def fetch_pages(
+    urls: List[str],
+    fetch: PageFetcher,
+    session: ClientSession,
+    borrow: Optional[SessionBorrower] = None,
+    max_workers: int = 4,
+    progress: Optional[Callable[[str], None]] = None,
+) -> List[PageResult]:
+    """Fetch ``urls`` with up to ``max_workers`` sessions, in input order.
+
+    The first worker uses ``session``; the others use sessions from
+    ``borrow()``, which yields None when none is available.  Workers take
+    URLs from a shared queue, so a slow page or a slow session start never
+    holds up the remaining URLs, and the call returns as soon as every page
+    is in: an extra worker whose session is still starting then finishes
+    in the background and hands the session straight back to the pool.
+    """
+    queue: Deque[Tuple[int, str]] = deque(enumerate(urls))
+    results: List[Optional[PageResult]] = [None] * len(urls)
+    done = 0
+    finished = asyncio.Event()
+    if not urls:
+        return []
+
+    async def work(worker_session: ClientSession) -> None:
+        nonlocal done
+        while queue:
+            index, url = queue.popleft()
+            started = time.perf_counter()
+            try:
+                result = PageResult(url, text=await fetch(worker_session, url))
+            except Exception as e:
+                result = PageResult(url, error=str(e))
+            result.elapsed = time.perf_counter() - started
+            results[index] = result
+            done += 1
+            if done == len(urls):
+                finished.set()
+            if progress is not None:
+                progress(f"{'❌' if result.error else '📄'} {url} ({done}/{len(urls)})")
+
+    async def borrowed() -> None:
+        try:
+            async with borrow() as extra_session:
+                if extra_session is not None and queue:
+                    await work(extra_session)
+        except Exception:
+            # A session that fails to start just means one worker fewer
+            pass
+
+    extra_workers = min(max_workers, len(urls)) - 1 if borrow is not None else 0
+    workers = [asyncio.ensure_future(work(session))]
+    workers += [asyncio.ensure_future(borrowed()) for _ in range(extra_workers)]
+    try:
+        await finished.wait()
+    except asyncio.CancelledError:
+        for worker in workers:
+            worker.cancel()
+        raise
+    for worker in workers:
+        if not worker.done():
+            _starting_workers.add(worker)
+            worker.add_done_callback(_starting_workers.discard)
+    return results
+
+
+def merge_pages(pages: List[PageResult], shaper: ResultShaper, max_chars: int, scope: str = "") -> str:
+    """One result with a section per page, fitting ``max_chars`` between them.
+
+    Truncated pages stay readable through ``get_more`` in ``scope``.
+    """
+    texts = [strip_boilerplate(page.text) for page in pages]
+    budgets = page_budgets([0 if page.error else len(text) for page, text in zip(pages, texts)], max_chars)
+    sections = []
+    for number, (page, budget) in enumerate(zip(pages, budgets), 1):
+        header = f"## Page {number} of {len(pages)}: {page.url}"
+        if page.error:
+            sections.append(f"{header}\nError: {page.error}")
+        else:
+            sections.append(f"{header}\n{shaper.shape('browserbase_get_text', page.text, max_chars=budget, scope=scope)}")
+    return "\n\n".join(sections)
@@ -0,0 +1,131 @@
+"""
+Deadlines for chat turns and for the Gemini and MCP calls made within them.
+
+A chat turn gets a time budget (``CHAT_TURN_TIMEOUT``).  Each Gemini request
+and MCP tool call inside it waits for at most its own limit or what is left
+of the turn, whichever is less, so a hung page load or a stalled stream ends
+the call instead of the whole turn; once the budget is spent the turn ends
+with :class:`DeadlineExceeded`.  Like the request priority in
+``rate_limit.py``, the deadline is kept in a context variable, so tasks
+started during the turn (concurrent tool calls, fetch_pages workers,
+prefetches) inherit it.  Tool calls that time out or are cancelled are
+aborted on the server too (``mcp_session.call_tool_with_timeout``).
+
+Usage::
+
+    with turn_deadline(300):
+        timeout = call_timeout(tool_timeouts.get("browserbase_navigate"))
+        result = await call_tool_with_timeout(session, "browserbase_navigate", args, timeout)
+"""
+
+import asyncio
+import contextvars
+import signal
+import time
+from contextlib import contextmanager
+from typing import AsyncIterable, AsyncIterator, Dict, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Seconds each tool call may take unless overridden by MCP_TOOL_TIMEOUTS
+DEFAULT_TOOL_TIMEOUTS: Dict[str, float] = {
+    "browserbase_navigate": 45.0,
+    "browserbase_get_text": 30.0,
+    "browserbase_get_html": 30.0,
+    "browserbase_screenshot": 30.0,
+    "browserbase_take_screenshot": 30.0,
+    "browserbase_click": 20.0,
+    "browserbase_type": 20.0,
+    "browserbase_session_create": 60.0,
+}
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("turn_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a chat turn has used up its time budget."""
+
+
+@contextmanager
+def turn_deadline(seconds: Optional[float]) -> Iterator[None]:
+    """Give the enclosed calls (and tasks started from them) ``seconds`` in total.
+
+    An enclosing deadline that ends sooner still applies; ``None`` adds no limit.
+    """
+    previous = _deadline.get()
+    deadline = previous
+    if seconds is not None:
+        deadline = time.monotonic() + seconds
+        if previous is not None:
+            deadline = min(deadline, previous)
+    _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        # Not a token reset: chat turns are async generators, which may be closed from another context
+        _deadline.set(previous)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left of the current turn, or None without a deadline."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def call_timeout(limit: Optional[float]) -> Optional[float]:
+    """Timeout for one call: ``limit`` or the rest of the turn, whichever is less.
+
+    Raises :class:`DeadlineExceeded` if the turn has no time left.
+    """
+    left = remaining()
+    if left is None:
+        return limit
+    if left <= 0:
+        raise DeadlineExceeded("The chat turn ran out of time")
+    return left if limit is None else min(limit, left)
+
+
+async def iterate_with_timeout(stream: AsyncIterable[T], timeout: Optional[float]) -> AsyncIterator[T]:
+    """Iterate ``stream``, raising TimeoutError if it is not finished within ``timeout`` seconds.
+
+    Items are yielded outside the timeout, so the consumer's own awaits
+    between items are never cancelled by it.
+    """
+    iterator = stream.__aiter__()
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        try:
+            item = await asyncio.wait_for(
+                iterator.__anext__(), None if deadline is None else max(0.0, deadline - time.monotonic())
+            )
+        except StopAsyncIteration:
+            return
+        yield item
+
+
+def parse_tool_timeouts(value: str) -> Dict[str, float]:
+    """Parse ``MCP_TOOL_TIMEOUTS``: comma-separated ``tool=seconds`` entries."""
+    timeouts: Dict[str, float] = {}
+    for entry in value.split(","):
+        name, _, seconds = entry.strip().partition("=")
+        if name and seconds:
+            timeouts[name.strip()] = float(seconds)
+    return timeouts
+
+
+@contextmanager
+def cancel_on_interrupt(task: "asyncio.Future") -> Iterator[None]:
+    """Make Ctrl-C cancel ``task`` instead of interrupting the program."""
+    loop = asyncio.get_running_loop()
+    previous = signal.getsignal(signal.SIGINT)
+    try:
+        loop.add_signal_handler(signal.SIGINT, task.cancel)
+    except (NotImplementedError, RuntimeError, ValueError):
+        # No loop signal handlers here (Windows, or not the main thread): Ctrl-C behaves as before
+        yield
+        return
+    try:
+        yield
+    finally:
+        loop.remove_signal_handler(signal.SIGINT)
+        signal.signal(signal.SIGINT, previous)
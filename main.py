@@ -3,50 +3,213 @@
 MCP Surf Demo - A Python client that connects to Gemini and uses MCP to browse webpages via Browserbase.
 
 This is a fixed version that properly handles the MCP connection lifecycle.
+
+Run as a script it is the same command line as ``cli.py``, which parses the
+arguments before anything below (mcp, rich, google-generativeai) is imported.
 """
 
+if __name__ == "__main__":
+    from cli import main as cli_main
+    cli_main()
+    raise SystemExit(0)
+
+import argparse
 import asyncio
 import json
 import os
+import shlex
 import sys
-from typing import Any, Dict, List, Optional, Tuple
+import time
+import weakref
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
 
-import google.generativeai as genai
 from dotenv import load_dotenv
 from rich.console import Console
+from rich.live import Live
 from rich.panel import Panel
 from rich.prompt import Prompt
 from rich.markdown import Markdown
 
 from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
+
+from batch import run_batch
+from conversation import Conversation
+from crawl import FETCH_PAGES_TOOL, fetch_pages, merge_pages
+from deadlines import (
+    DEFAULT_TOOL_TIMEOUTS,
+    call_timeout,
+    cancel_on_interrupt,
+    iterate_with_timeout,
+    parse_tool_timeouts,
+    turn_deadline,
+)
+from metrics import ClientMetrics, MetricFamily, dump_periodically, dump_settings_from_env
+from mcp_session import (
+    MCPSessionPool,
+    call_tool_with_timeout,
+    parse_browser_contexts,
+    server_command,
+    uses_browserbase_server,
+)
+from result_cache import NAVIGATION_TOOLS, READ_ONLY_TOOLS, SingleFlight, ToolResultCache
+from rate_limit import RateLimitedError, RateLimiter, is_browserbase_rate_limit, with_retries
+from result_shaping import GET_MORE_TOOL, ResultShaper, estimate_tokens
+from screenshots import ImageAttachments
+from speculation import Speculator
+from tool_catalog import ToolCatalog
+from tracing import configure_from_env, tracer
+
+
+@dataclass
+class ChatEvent:
+    """One event of a streamed chat turn.
+    
+    type is "text" (a chunk of the reply), "tool_call" (a tool was requested),
+    "tool_progress" (progress of a running tool, e.g. a page of fetch_pages),
+    "tool_result" (a tool finished after elapsed seconds), "error" (the turn
+    failed; text holds the message) or "done" (the turn finished after elapsed
+    seconds, with time_to_first_token if any text arrived).
+    """
+    type: str
+    text: str = ""
+    tool_name: Optional[str] = None
+    elapsed: Optional[float] = None
+    time_to_first_token: Optional[float] = None
 
 
 class MCPSurfClient:
     """A client that integrates Gemini AI with Browserbase MCP for web browsing."""
     
-    def __init__(self):
-        """Initialize the MCP Surf Client."""
+    def __init__(self, setup_gemini: bool = True):
+        """Initialize the MCP Surf Client.
+        
+        With ``setup_gemini=False`` Gemini is configured by a later call to
+        setup_gemini(), so that it can overlap the MCP server start.
+        """
+        # Load environment variables first: every setting below may come from .env
+        load_dotenv()
         self.console = Console()
+        self.model: Any = None
         self.available_tools: List[Any] = []
+        self.pool: Optional[MCPSessionPool] = None
+        self.max_tool_steps = int(os.getenv("GEMINI_MAX_TOOL_STEPS", "10"))
+        command, args = server_command()
+        self.catalog = ToolCatalog(shlex.join([command, *args]), local_tools=[GET_MORE_TOOL, FETCH_PAGES_TOOL])
+        cache_db = os.getenv("MCP_RESULT_CACHE_DB")
+        self.tool_cache = ToolResultCache(
+            max_bytes=int(float(os.getenv("MCP_RESULT_CACHE_MAX_MB", "64")) * 1024 * 1024),
+            db_path=Path(cache_db) if cache_db else None,
+        )
+        # Client-side quotas; unset limits only pause after an upstream 429
+        self.gemini_limiter = RateLimiter(
+            "gemini",
+            rpm=float(os.getenv("GEMINI_RPM", "0")) or None,
+            tpm=float(os.getenv("GEMINI_TPM", "0")) or None,
+        )
+        self.browserbase_limiter = RateLimiter("browserbase", rpm=float(os.getenv("BROWSERBASE_RPM", "0")) or None)
+        self.max_attempts = int(os.getenv("UPSTREAM_MAX_ATTEMPTS", "5"))
+        # Time budgets in seconds (0 = none): a whole chat turn, each Gemini request, each tool call
+        self.turn_timeout = float(os.getenv("CHAT_TURN_TIMEOUT", "300")) or None
+        self.gemini_timeout = float(os.getenv("GEMINI_REQUEST_TIMEOUT", "120")) or None
+        self.tool_timeouts = {**DEFAULT_TOOL_TIMEOUTS, **parse_tool_timeouts(os.getenv("MCP_TOOL_TIMEOUTS", ""))}
+        self.default_tool_timeout = float(os.getenv("MCP_TOOL_TIMEOUT", "60")) or None
+        # Identical read-only calls in flight at the same time share one MCP request
+        self.single_flight = SingleFlight()
+        # Pooled sessions serve every conversation: the page each browser was last sent to, and for whom
+        self._session_pages: "weakref.WeakKeyDictionary[ClientSession, str]" = weakref.WeakKeyDictionary()
+        self._session_owners: "weakref.WeakKeyDictionary[ClientSession, str]" = weakref.WeakKeyDictionary()
+        # Prefetch the likely next read-only call (get_text after navigate) while Gemini thinks
+        self.speculator = Speculator() if os.getenv("MCP_SPECULATIVE_PREFETCH", "0") == "1" else None
+        # Counters and histograms for /metrics; other components' stats are read at render time
+        self.metrics = ClientMetrics()
+        self.metrics.registry.register_collector(self._collect_metrics)
+        self._metrics_dump: Optional[asyncio.Task] = None
+        # Sessions used at once by one fetch_pages call (the turn's own plus free pool sessions)
+        self.fetch_pages_workers = int(os.getenv("FETCH_PAGES_MAX_WORKERS", "4"))
+        self.result_shaper = ResultShaper(default_max_chars=int(os.getenv("GEMINI_TOOL_RESULT_MAX_CHARS", "8000")))
+        self.image_max_dim = int(os.getenv("GEMINI_IMAGE_MAX_DIM", "1568"))
+        self.image_max_bytes = int(float(os.getenv("GEMINI_IMAGE_MAX_KB", "1024")) * 1024)
+        # Named Browserbase contexts ("work=ctx_1,personal=ctx_2"); conversations pick one by name
+        self.browser_contexts = parse_browser_contexts(os.getenv("BROWSERBASE_CONTEXT_IDS", ""))
         
-        # Load environment variables
-        load_dotenv()
+        configure_from_env()
+        # The conversation continued by run_interactive()
+        self.conversation: Optional[Conversation] = None
+        if setup_gemini:
+            self.setup_gemini()
+    
+    def setup_gemini(self) -> None:
+        """Configure Gemini and start the conversation continued by run_interactive()."""
         self._setup_gemini()
+        self.conversation = self.new_conversation()
+    
+    async def start(self) -> None:
+        """Start the MCP session pool; servers stay up until aclose() is called."""
+        if self.pool is None:
+            self.pool = MCPSessionPool(
+                self._server_params,
+                min_size=int(os.getenv("MCP_POOL_MIN_SIZE", "1")),
+                max_size=int(os.getenv("MCP_POOL_MAX_SIZE", "4")),
+                idle_timeout=float(os.getenv("MCP_POOL_IDLE_TIMEOUT", "300")),
+                message_handler=self.catalog.handle_message,
+            )
+            await self.pool.start()
+        dump = dump_settings_from_env()
+        if dump is not None and self._metrics_dump is None:
+            self._metrics_dump = asyncio.create_task(dump_periodically(self.metrics.registry, *dump))
+    
+    async def aclose(self) -> None:
+        """Shut down every pooled MCP server."""
+        if self._metrics_dump is not None:
+            self._metrics_dump.cancel()
+            await asyncio.gather(self._metrics_dump, return_exceptions=True)
+            self._metrics_dump = None
+        if self.speculator is not None:
+            self.speculator.cancel_all()
+        if self.pool is not None:
+            await self.pool.aclose()
+            self.pool = None
+        self.tool_cache.close()
+    
+    async def __aenter__(self) -> "MCPSurfClient":
+        await self.start()
+        return self
+    
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.aclose()
     
     def _setup_gemini(self) -> None:
         """Configure Google Gemini AI."""
+        script = os.getenv("GEMINI_SCRIPT")
+        if script:
+            # Offline mode: replay a scripted conversation instead of calling Gemini
+            from offline.gemini import ScriptedModel
+            self.model = ScriptedModel.from_file(script)
+            return
+        
         api_key = os.getenv("GEMINI_API_KEY")
         if not api_key:
             self.console.print("[red]❌ GEMINI_API_KEY not found in environment variables[/red]")
             self.console.print("Please set your Gemini API key in the .env file")
             sys.exit(1)
         
+        # Imported here: the offline mode and CLI commands that never reach Gemini skip its import cost
+        import google.generativeai as genai
         genai.configure(api_key=api_key)
         self.model = genai.GenerativeModel('gemini-1.5-pro-latest')
     
-    def _prepare_env(self) -> Dict[str, str]:
-        """Prepare environment variables for MCP server."""
+    def _prepare_env(self, context_id: Optional[str] = None) -> Dict[str, str]:
+        """Prepare environment variables for an MCP server bound to ``context_id``."""
+        context_id = context_id or os.getenv("BROWSERBASE_CONTEXT_ID")
+        if not uses_browserbase_server():
+            # A custom server (e.g. the offline stand-in) needs no Browserbase credentials
+            env = os.environ.copy()
+            if context_id:
+                env["BROWSERBASE_CONTEXT_ID"] = context_id
+            return env
+        
         browserbase_api_key = os.getenv("BROWSERBASE_API_KEY")
         browserbase_project_id = os.getenv("BROWSERBASE_PROJECT_ID")
         
@@ -62,88 +225,311 @@ class MCPSurfClient:
         })
         
         # Add context ID if provided
-        context_id = os.getenv("BROWSERBASE_CONTEXT_ID")
         if context_id:
             env["BROWSERBASE_CONTEXT_ID"] = context_id
         
         return env
     
+    def _server_params(self, context_id: Optional[str] = None) -> StdioServerParameters:
+        """Build the parameters used to spawn an MCP server (for a Browserbase context)."""
+        command, args = server_command()
+        return StdioServerParameters(
+            command=command,
+            args=args,
+            env=self._prepare_env(context_id)
+        )
+    
     async def _test_mcp_connection(self) -> bool:
         """Test MCP server connection and get available tools."""
         try:
             self.console.print("[yellow]🚀 Testing Browserbase MCP server connection...[/yellow]")
             
-            env = self._prepare_env()
-            server_params = StdioServerParameters(
-                command="npx",
-                args=["@browserbasehq/mcp"],
-                env=env
-            )
+            # Get available tools (from the on-disk catalog when it is current)
+            await self._execute_with_mcp(self._ensure_tools)
             
-            async with stdio_client(server_params) as (read, write):
-                async with ClientSession(read, write) as session:
-                    await session.initialize()
-                    
-                    # Get available tools
-                    tools_response = await session.list_tools()
-                    self.available_tools = tools_response.tools
-                    
-                    self.console.print(f"[green]✅ MCP server connected with {len(self.available_tools)} tools available[/green]")
-                    
-                    # Display available tools
-                    tool_names = [tool.name for tool in self.available_tools]
-                    self.console.print(f"[cyan]Available tools: {', '.join(tool_names)}[/cyan]")
-                    
-                    return True
+            self.console.print(f"[green]✅ MCP server connected with {len(self.available_tools)} tools available[/green]")
+            
+            # Display available tools
+            tool_names = [tool.name for tool in self.available_tools]
+            self.console.print(f"[cyan]Available tools: {', '.join(tool_names)}[/cyan]")
+            
+            return True
                     
         except Exception as e:
             self.console.print(f"[red]❌ Failed to connect to MCP server: {e}[/red]")
             return False
     
     async def _execute_with_mcp(self, func) -> Any:
-        """Execute a function with an active MCP connection."""
-        env = self._prepare_env()
-        server_params = StdioServerParameters(
-            command="npx",
-            args=["@browserbasehq/mcp"],
-            env=env
-        )
+        """Execute a function with a pooled MCP session, reconnecting if needed."""
+        await self.start()
+        with tracer.span("mcp.execute", {"mcp.function": getattr(func, "__name__", repr(func))}):
+            return await self.pool.run(func)
+    
+    async def call_tool(self, session: ClientSession, tool_name: str, arguments: Dict[str, Any], speculative: bool = False) -> Any:
+        """Call an MCP tool and return the result, serving read-only tools from cache.
         
-        async with stdio_client(server_params) as (read, write):
-            async with ClientSession(read, write) as session:
-                await session.initialize()
-                return await func(session)
+        With speculative prefetching enabled, a call that was predicted is
+        served from its prefetch, and a successful call starts the prefetch
+        of its likely follow-up (``speculative`` marks those prefetches).
+        """
+        started = time.perf_counter()
+        with tracer.span("mcp.call_tool", {"tool.name": tool_name, "speculative": speculative}) as span:
+            if tracer.enabled:
+                span.set_attribute("request.bytes", len(json.dumps(arguments, default=str)))
+            
+            if self.speculator is not None and not speculative:
+                speculation = self.speculator.claim(session, tool_name, arguments)
+                if speculation is not None:
+                    self.console.print(f"[dim]🔮 Prefetched {tool_name} ({speculation.saved():.2f}s saved)[/dim]")
+                    span.set_attribute("speculation.hit", True)
+                    result = await speculation.task
+                    self._record_tool_call(tool_name, "prefetched", started)
+                    return result
+            
+            cache_key = self._cache_key(session, tool_name, arguments)
+            if cache_key is not None:
+                cached = self.tool_cache.get(cache_key)
+                if cached is not None:
+                    self.console.print(f"[dim]⚡ Cached result for {tool_name}[/dim]")
+                    span.set_attribute("cache.hit", True)
+                    self._record_tool_call(tool_name, "cached", started)
+                    return cached
+            
+            try:
+                if cache_key is not None:
+                    if cache_key in self.single_flight:
+                        self.console.print(f"[dim]🔗 Sharing in-flight {tool_name} call[/dim]")
+                        span.set_attribute("call.coalesced", True)
+                    result = await self.single_flight.do(
+                        cache_key, lambda: self._call_mcp_tool(session, tool_name, arguments, cache_key)
+                    )
+                else:
+                    result = await self._call_mcp_tool(session, tool_name, arguments, cache_key)
+                if tracer.enabled:
+                    span.set_attributes({
+                        "cache.hit": False,
+                        "response.bytes": len(result.model_dump_json()),
+                        "tool.is_error": bool(result.isError),
+                    })
+                self._record_tool_call(tool_name, "error" if result.isError else "ok", started)
+                if self.speculator is not None and not speculative and not result.isError:
+                    self._speculate(session, tool_name)
+                return result
+            except TimeoutError as e:
+                self._record_tool_call(tool_name, "timeout", started)
+                span.set_attribute("call.timed_out", True)
+                self.console.print(f"[red]⏱️  {e}[/red]")
+                raise
+            except asyncio.CancelledError:
+                self._record_tool_call(tool_name, "cancelled", started)
+                raise
+            except Exception as e:
+                self._record_tool_call(tool_name, "exception", started)
+                self.console.print(f"[red]❌ Error calling tool {tool_name}: {e}[/red]")
+                raise
     
-    async def call_tool(self, session: ClientSession, tool_name: str, arguments: Dict[str, Any]) -> Any:
-        """Call an MCP tool and return the result."""
-        try:
+    def _record_tool_call(self, tool_name: str, result: str, started: float) -> None:
+        self.metrics.tool_calls.inc(tool_name, result)
+        self.metrics.tool_call_seconds.observe(time.perf_counter() - started, tool_name)
+    
+    def _collect_metrics(self) -> List[MetricFamily]:
+        """Metrics kept by the pool, caches, rate limiters and speculator, read at render time."""
+        families = []
+        if self.pool is not None:
+            stats = self.pool.stats
+            families += [
+                MetricFamily.single("mcp_surf_pool_size", "gauge", "MCP server processes", self.pool.size),
+                MetricFamily.single("mcp_surf_pool_available", "gauge", "Idle MCP sessions", self.pool.available),
+                MetricFamily.single("mcp_surf_pool_checkouts_total", "counter", "Session checkouts", stats.checkouts),
+                MetricFamily.single("mcp_surf_pool_spawned_total", "counter", "MCP servers spawned", stats.spawned),
+                MetricFamily.single("mcp_surf_pool_evicted_total", "counter", "MCP servers shut down by the pool", stats.evicted),
+                MetricFamily.single("mcp_surf_mcp_reconnects_total", "counter", "MCP servers restarted after they died", stats.reconnects),
+            ]
+        cache = self.tool_cache
+        families += [
+            MetricFamily("mcp_surf_result_cache_lookups_total", "counter", "Tool result cache lookups", [
+                ("mcp_surf_result_cache_lookups_total", {"result": "hit"}, cache.hits),
+                ("mcp_surf_result_cache_lookups_total", {"result": "miss"}, cache.misses),
+            ]),
+            MetricFamily.single("mcp_surf_result_cache_bytes", "gauge", "Bytes held by the tool result cache", cache.stats()["bytes"]),
+            MetricFamily.single("mcp_surf_tool_catalog_cache_hits_total", "counter", "Tool catalogs loaded from disk", self.catalog.cache_hits),
+            MetricFamily.single("mcp_surf_tool_catalog_refreshes_total", "counter", "Tool catalogs listed from the server", self.catalog.refreshes),
+            MetricFamily.single("mcp_surf_coalesced_calls_total", "counter", "Tool calls that shared an identical call in flight", self.single_flight.coalesced),
+            MetricFamily.single("mcp_surf_result_bytes_saved_total", "counter", "Tool result bytes not sent to Gemini", self.result_shaper.stats()["bytes_saved"]),
+        ]
+        limiters = (self.gemini_limiter, self.browserbase_limiter)
+        families += [
+            MetricFamily("mcp_surf_rate_limit_wait_seconds_total", "counter", "Time spent waiting for rate limits",
+                         [("mcp_surf_rate_limit_wait_seconds_total", {"upstream": limiter.name}, limiter.wait_time) for limiter in limiters]),
+            MetricFamily("mcp_surf_rate_limited_total", "counter", "Upstream rate limit responses",
+                         [("mcp_surf_rate_limited_total", {"upstream": limiter.name}, limiter.throttled) for limiter in limiters]),
+        ]
+        if self.speculator is not None:
+            families += [
+                MetricFamily.single("mcp_surf_prefetches_total", "counter", "Speculative prefetches started", self.speculator.started),
+                MetricFamily.single("mcp_surf_prefetch_hits_total", "counter", "Prefetches served to Gemini", self.speculator.hits),
+            ]
+        return families
+    
+    def _cache_key(self, session: ClientSession, tool_name: str, arguments: Dict[str, Any]):
+        """Result cache (and single-flight) key, scoped to the session's Browserbase context."""
+        context_id = self.pool.context_of(session) if self.pool is not None else None
+        return self.tool_cache.key_for(session, tool_name, arguments, context_id)
+    
+    def _speculate(self, session: ClientSession, tool_name: str) -> None:
+        """Start prefetching the calls predicted to follow ``tool_name``."""
+        for next_tool, next_args in self.speculator.predict(tool_name):
+            if self._cache_key(session, next_tool, next_args) is None:
+                # Only calls the cache considers read-only for this page are prefetched
+                continue
+            self.console.print(f"[dim]🔮 Prefetching {next_tool}[/dim]")
+            self.speculator.start(
+                session, next_tool, next_args,
+                lambda next_tool=next_tool, next_args=next_args: self.call_tool(session, next_tool, next_args, speculative=True),
+            )
+    
+    async def _call_mcp_tool(self, session: ClientSession, tool_name: str, arguments: Dict[str, Any], cache_key) -> Any:
+        """Make the actual MCP request (within the Browserbase quota) and update the result cache."""
+        async def call() -> Any:
             self.console.print(f"[yellow]🔧 Calling tool: {tool_name}[/yellow]")
-            result = await session.call_tool(tool_name, arguments)
+            # Within the tool's own limit and the rest of the turn; the server is told to stop on timeout
+            timeout = call_timeout(self.tool_timeouts.get(tool_name, self.default_tool_timeout))
+            result = await call_tool_with_timeout(session, tool_name, arguments, timeout)
+            if result.isError:
+                text = "\n".join(content.text for content in result.content if hasattr(content, "text"))
+                if is_browserbase_rate_limit(text):
+                    raise RateLimitedError(text, result)
             return result
-        except Exception as e:
-            self.console.print(f"[red]❌ Error calling tool {tool_name}: {e}[/red]")
-            raise
-    
-    def create_tool_functions_for_gemini(self) -> List[Dict[str, Any]]:
-        """Convert MCP tools to Gemini function calling format."""
-        gemini_tools = []
         
-        for tool in self.available_tools:
-            # Convert MCP tool schema to Gemini function declaration
-            function_declaration = {
-                "name": tool.name,
-                "description": tool.description,
-                "parameters": tool.inputSchema if hasattr(tool, 'inputSchema') else {"type": "object", "properties": {}}
-            }
-            gemini_tools.append(function_declaration)
+        try:
+            result = await with_retries(call, limiter=self.browserbase_limiter, max_attempts=self.max_attempts)
+        except RateLimitedError as e:
+            # Out of retries: hand the error result to Gemini as before
+            result = e.result
+        self.tool_cache.record_call(session, tool_name, arguments, result)
+        if tool_name in NAVIGATION_TOOLS and not result.isError:
+            self._session_pages[session] = arguments.get("url")
+        if cache_key is not None:
+            self.tool_cache.put(cache_key, result)
+        return result
+    
+    def create_tool_functions_for_gemini(self) -> List[Any]:
+        """Return the precompiled Gemini tools for the cached MCP tool catalog."""
+        return self.catalog.gemini_tools
+    
+    async def _ensure_tools(self, session: ClientSession) -> List[Any]:
+        """Load the tool catalog from cache, listing tools only if the server changed."""
+        server_version = self.pool.server_version if self.pool is not None else None
+        self.available_tools = await self.catalog.ensure(session, server_version)
+        return self.available_tools
+    
+    def new_image_attachments(self) -> ImageAttachments:
+        """Image queue (and dedup set) for one conversation."""
+        return ImageAttachments(max_dim=self.image_max_dim, max_bytes=self.image_max_bytes)
+    
+    def new_conversation(self, conversation_id: Optional[str] = None, context: Optional[str] = None) -> Conversation:
+        """Start an empty conversation with the configured history budget.
         
-        return gemini_tools
+        ``context`` is a name from ``BROWSERBASE_CONTEXT_IDS`` or a raw
+        Browserbase context id; without it the default context is used.
+        """
+        return Conversation(
+            conversation_id,
+            max_tokens=int(os.getenv("GEMINI_HISTORY_MAX_TOKENS", "32000")),
+            keep_turns=int(os.getenv("GEMINI_HISTORY_KEEP_TURNS", "3")),
+            attachments=self.new_image_attachments(),
+            summarize=self._summarize if hasattr(self.model, "generate_content_async") else None,
+            context_id=self.browser_contexts.get(context, context) if context else None,
+        )
     
-    async def handle_function_call(self, session: ClientSession, function_call) -> str:
-        """Handle a function call from Gemini."""
+    async def _summarize(self, transcript: str) -> str:
+        """Ask Gemini for a short summary of earlier turns (used when compacting history)."""
+        response = await self.model.generate_content_async(
+            "Summarize this conversation between a user and a web browsing assistant in a few "
+            "short paragraphs. Keep the URLs visited, the facts found and any open questions.\n\n"
+            + transcript
+        )
+        return response.text
+    
+    async def handle_function_call(
+        self,
+        session: ClientSession,
+        function_call,
+        attachments: Optional[ImageAttachments] = None,
+        progress: Optional[Callable[[str], None]] = None,
+        scope: str = "",
+    ) -> str:
+        """Handle a function call from Gemini.
+        
+        Images in the result are queued on ``attachments`` (when given) so they
+        can be sent with the function responses; otherwise they are replaced
+        by a placeholder.  Tools that report progress (fetch_pages) pass it
+        to ``progress``.  Truncated results can only be paged through with
+        ``get_more`` in the same ``scope`` (the conversation id).
+        """
         function_name = function_call.name
         function_args = dict(function_call.args) if function_call.args else {}
+        started = time.perf_counter()
         
+        with tracer.span("tool.handle", {"tool.name": function_name}) as span:
+            if function_name == GET_MORE_TOOL.name:
+                # Paging through a truncated result is answered locally
+                result = self.result_shaper.get_more(function_args.get("handle", ""), function_args.get("offset", 0), scope)
+            elif function_name == FETCH_PAGES_TOOL.name:
+                # Budgeted page by page, so not shaped again
+                result = await self.fetch_pages(session, [str(url) for url in function_args.get("urls") or []], progress, scope)
+            else:
+                raw = await self._handle_function_call(session, function_name, function_args, attachments)
+                truncated = self.result_shaper.truncated
+                result = self.result_shaper.shape(function_name, raw, scope=scope)
+                span.set_attribute("result.raw_chars", len(raw))
+                if self.result_shaper.truncated > truncated:
+                    self.console.print(f"[dim]✂️  Trimmed {function_name} result from {len(raw):,} to {len(result):,} characters[/dim]")
+            span.set_attribute("result.chars", len(result))
+            self.metrics.function_call_seconds.observe(time.perf_counter() - started, function_name)
+            return result
+    
+    async def fetch_pages(self, session: ClientSession, urls: List[str], progress: Optional[Callable[[str], None]] = None, scope: str = "") -> str:
+        """Read ``urls`` concurrently over pooled sessions and merge them into one budgeted result."""
+        urls = list(dict.fromkeys(urls))
+        if not urls:
+            return "No URLs given."
+        context_id = self.pool.context_of(session) if self.pool is not None else None
+        
+        async def fetch(page_session: ClientSession, url: str) -> str:
+            navigated = await self.call_tool(page_session, "browserbase_navigate", {"url": url})
+            if navigated.isError:
+                raise RuntimeError(self._result_text(navigated))
+            return self._result_text(await self.call_tool(page_session, "browserbase_get_text", {}))
+        
+        self.console.print(f"[yellow]🌐 Fetching {len(urls)} pages[/yellow]")
+        previous_page = self._session_pages.get(session)
+        pages = await fetch_pages(
+            urls,
+            fetch,
+            session,
+            borrow=(lambda: self.pool.try_acquire(context_id)) if self.pool is not None else None,
+            max_workers=self.fetch_pages_workers,
+            progress=progress,
+        )
+        if self._session_pages.get(session) != previous_page:
+            # The conversation's own browser fetched pages too: put it back where Gemini left it
+            if previous_page is None:
+                self._session_pages.pop(session, None)
+            else:
+                try:
+                    await self.call_tool(session, "browserbase_navigate", {"url": previous_page})
+                except Exception as e:
+                    self.console.print(f"[red]❌ Could not return to {previous_page}: {e}[/red]")
+        return merge_pages(pages, self.result_shaper, self.result_shaper.policy_for(FETCH_PAGES_TOOL.name).max_chars, scope)
+    
+    @staticmethod
+    def _result_text(result) -> str:
+        """Text content of an MCP tool result."""
+        return "\n".join(content.text for content in result.content if hasattr(content, "text"))
+    
+    async def _handle_function_call(self, session: ClientSession, function_name: str, function_args: Dict[str, Any], attachments: Optional[ImageAttachments] = None) -> str:
+        """Call the MCP tool behind a Gemini function call and format the result as text."""
         try:
             # Call the MCP tool
             result = await self.call_tool(session, function_name, function_args)
@@ -157,8 +543,10 @@ class MCPSurfClient:
                         content_parts.append(content.text)
                     elif hasattr(content, 'data') and hasattr(content, 'mimeType'):
                         # Handle binary data (like images)
-                        if content.mimeType.startswith('image/'):
-                            # For images, we'll describe them since we can't directly display
+                        if content.mimeType.startswith('image/') and attachments is not None:
+                            # Images go to Gemini as inline parts of the next message
+                            content_parts.append(attachments.add(content.data, content.mimeType))
+                        elif content.mimeType.startswith('image/'):
                             content_parts.append(f"[Image captured: {content.mimeType}]")
                         else:
                             content_parts.append(f"[Binary data: {content.mimeType}]")
@@ -170,50 +558,279 @@ class MCPSurfClient:
         except Exception as e:
             return f"Error executing {function_name}: {str(e)}"
     
-    async def chat(self, message: str) -> str:
-        """Send a message to Gemini with access to MCP tools."""
-        async def _chat_with_session(session: ClientSession) -> str:
+    async def chat(self, message: str, conversation: Optional[Conversation] = None) -> str:
+        """Send a message to Gemini with access to MCP tools.
+        
+        The turn continues ``conversation`` if given; otherwise it starts
+        from an empty history.
+        """
+        conversation = conversation or self.new_conversation()
+        await self.start()
+        async with conversation.lock:
+            async with self.pool.acquire(conversation.context_id) as session:
+                return await self._chat_with_session(session, message, conversation)
+    
+    async def chat_stream(self, message: str, conversation: Optional[Conversation] = None) -> AsyncIterator[ChatEvent]:
+        """Like chat(), but yield text chunks and tool progress as they happen."""
+        conversation = conversation or self.new_conversation()
+        await self.start()
+        async with conversation.lock:
+            async with self.pool.acquire(conversation.context_id) as session:
+                async for event in self._stream_with_session(session, message, conversation):
+                    yield event
+    
+    @staticmethod
+    def _function_calls(response) -> List[Any]:
+        """Return every function call requested in a Gemini response."""
+        parts = response.candidates[0].content.parts if response.candidates else []
+        return [part.function_call for part in parts if getattr(part, 'function_call', None)]
+    
+    @staticmethod
+    def _response_text(response) -> str:
+        """Join the text parts of a Gemini response (which may also hold function calls)."""
+        parts = response.candidates[0].content.parts if response.candidates else []
+        return "".join(part.text for part in parts if getattr(part, 'text', None))
+    
+    async def _chat_with_session(self, session: ClientSession, message: str, conversation: Optional[Conversation] = None) -> str:
+        """Run one chat turn against a borrowed MCP session and return the full reply."""
+        chunks = []
+        async for event in self._stream_with_session(session, message, conversation):
+            if event.type in ("text", "error"):
+                chunks.append(event.text)
+        return "".join(chunks)
+    
+    async def _run_function_calls(self, session: ClientSession, function_calls: List[Any], attachments: Optional[ImageAttachments] = None, scope: str = "") -> AsyncIterator[Tuple[int, str, Optional[float]]]:
+        """Run function calls, yielding (index, result, seconds) as each finishes.
+        
+        All calls share one stateful browser, so calls that can change it
+        (navigate, click, type, fetch_pages, unknown tools) run one at a time
+        in the order Gemini gave them.  Read-only calls between two of them run
+        concurrently, after the earlier one and before the later one.
+        Progress reported by a call while it runs is yielded as
+        (index, message, None).
+        """
+        updates: asyncio.Queue = asyncio.Queue()
+        
+        async def run(index: int, function_call, after: List["asyncio.Future"]) -> None:
+            if after:
+                # Only for ordering: failed calls report their own errors
+                await asyncio.wait(after)
+            started = time.perf_counter()
             try:
-                # Create Gemini tools from MCP tools
+                result = await self.handle_function_call(
+                    session, function_call, attachments, progress=lambda message: updates.put_nowait((index, message, None)), scope=scope
+                )
+            except Exception as e:
+                updates.put_nowait(e)
+            else:
+                updates.put_nowait((index, result, time.perf_counter() - started))
+        
+        tasks: List[asyncio.Future] = []
+        barrier: List[asyncio.Future] = []  # the last call that may change the browser
+        reads: List[asyncio.Future] = []  # read-only calls started since then
+        for index, function_call in enumerate(function_calls):
+            if function_call.name in READ_ONLY_TOOLS or function_call.name == GET_MORE_TOOL.name:
+                task = asyncio.ensure_future(run(index, function_call, barrier))
+                reads.append(task)
+            else:
+                task = asyncio.ensure_future(run(index, function_call, barrier + reads))
+                barrier, reads = [task], []
+            tasks.append(task)
+        try:
+            remaining = len(tasks)
+            while remaining:
+                update = await updates.get()
+                if isinstance(update, Exception):
+                    raise update
+                if update[2] is not None:
+                    remaining -= 1
+                yield update
+        finally:
+            for task in tasks:
+                task.cancel()
+            # Let cancelled calls tell the server before the session goes back to the pool
+            await asyncio.gather(*tasks, return_exceptions=True)
+    
+    async def _stream_with_session(self, session: ClientSession, message: str, conversation: Optional[Conversation] = None) -> AsyncIterator[ChatEvent]:
+        """Run one chat turn against a borrowed MCP session, streaming events.
+        
+        All Gemini round trips use the SDK's async streaming API so that
+        concurrent turns and MCP I/O keep making progress while Gemini thinks.
+        Tool calls are executed until Gemini answers without any, up to
+        max_tool_steps rounds; the read-only calls of one model turn run
+        concurrently, the others in order, and their results go back in a
+        single message.
+        
+        The turn starts from the history of ``conversation`` (compacted first
+        if it is over budget) and its history is kept when the turn ends.
+        """
+        conversation = conversation or self.new_conversation()
+        started = time.perf_counter()
+        first_token_at: Optional[float] = None
+        outcome = "ok"
+        chat = None
+        with tracer.span("chat.turn", {"chat.message.chars": len(message)}) as turn_span, turn_deadline(self.turn_timeout):
+            try:
+                # Gemini tools are built once per tool catalog version
+                await self._ensure_tools(session)
                 tools = self.create_tool_functions_for_gemini()
+                await self._restore_page(session, conversation)
+                
+                if await conversation.compact_if_needed():
+                    self.console.print("[dim]🗜️  Compacted earlier turns of the conversation[/dim]")
+                    turn_span.set_attribute("chat.compacted", True)
                 
-                # Create a chat session with tools
+                # Continue the conversation in a chat session with tools
                 chat = self.model.start_chat(
+                    history=conversation.history,
                     enable_automatic_function_calling=False  # We'll handle function calls manually
                 )
+                attachments = conversation.attachments
                 
-                # Send the message
-                response = chat.send_message(
-                    message,
-                    tools=tools
-                )
-                
-                # Handle function calls if any
-                if response.candidates[0].content.parts:
-                    for part in response.candidates[0].content.parts:
-                        if hasattr(part, 'function_call') and part.function_call:
-                            # Execute the function call
-                            function_result = await self.handle_function_call(session, part.function_call)
-                            
-                            # Send the result back to Gemini
-                            response = chat.send_message([
-                                {
-                                    "function_response": {
-                                        "name": part.function_call.name,
-                                        "response": {"result": function_result}
-                                    }
-                                }
-                            ])
-                
-                return response.text
-                
+                content: Any = message
+                content_chars = len(message)
+                for step in range(self.max_tool_steps + 1):
+                    turn_span.set_attribute("chat.steps", step + 1)
+                    with tracer.span("gemini.send_message", {"gemini.step": step}, activate=False) as span:
+                        # Reserve the expected prompt size against the TPM quota; corrected below
+                        estimated_tokens = conversation.tokens + estimate_tokens(content_chars)
+                        timeout = call_timeout(self.gemini_timeout)
+                        request_started = time.perf_counter()
+                        response = await asyncio.wait_for(with_retries(
+                            lambda: chat.send_message_async(content, tools=tools, stream=True),
+                            limiter=self.gemini_limiter,
+                            cost=estimated_tokens,
+                            max_attempts=self.max_attempts,
+                        ), timeout)
+                        if timeout is not None:
+                            timeout -= time.perf_counter() - request_started
+                        async for chunk in iterate_with_timeout(response, timeout):
+                            text = self._response_text(chunk)
+                            if text:
+                                if first_token_at is None:
+                                    first_token_at = time.perf_counter()
+                                yield ChatEvent("text", text=text)
+                        
+                        self.metrics.gemini_request_seconds.observe(time.perf_counter() - request_started)
+                        function_calls = self._function_calls(response)
+                        usage = getattr(response, "usage_metadata", None)
+                        conversation.record_usage(usage)
+                        if usage is not None:
+                            self.metrics.gemini_tokens.inc("prompt", amount=usage.prompt_token_count)
+                            self.metrics.gemini_tokens.inc("output", amount=usage.candidates_token_count)
+                        if usage is not None and usage.total_token_count:
+                            self.gemini_limiter.settle(usage.total_token_count - estimated_tokens)
+                        if tracer.enabled:
+                            span.set_attribute("gemini.function_calls", len(function_calls))
+                            if usage is not None:
+                                span.set_attributes({
+                                    "gemini.prompt_tokens": usage.prompt_token_count,
+                                    "gemini.output_tokens": usage.candidates_token_count,
+                                })
+                    if not function_calls:
+                        break
+                    if step == self.max_tool_steps:
+                        yield ChatEvent("text", text=f"\n\n⚠️ Stopped after {self.max_tool_steps} tool steps without a final answer.")
+                        break
+                    
+                    for function_call in function_calls:
+                        yield ChatEvent("tool_call", tool_name=function_call.name)
+                    results: List[str] = [""] * len(function_calls)
+                    async for index, result, elapsed in self._run_function_calls(session, function_calls, attachments, conversation.id):
+                        if elapsed is None:
+                            yield ChatEvent("tool_progress", text=result, tool_name=function_calls[index].name)
+                            continue
+                        results[index] = result
+                        yield ChatEvent("tool_result", tool_name=function_calls[index].name, elapsed=elapsed)
+                    
+                    # Send all results (and any new screenshots) back to Gemini in a single message
+                    content = [
+                        {
+                            "function_response": {
+                                "name": function_call.name,
+                                "response": {"result": result}
+                            }
+                        }
+                        for function_call, result in zip(function_calls, results)
+                    ] + attachments.take_parts()
+                    content_chars = sum(len(result) for result in results)
+            
+            except TimeoutError as e:
+                # Gemini stalled, or the turn used up its CHAT_TURN_TIMEOUT budget
+                turn_span.set_attribute("error", "timeout")
+                outcome = "timeout"
+                yield ChatEvent("error", text=str(e) or "Gemini did not respond in time")
+            except asyncio.CancelledError:
+                self.metrics.chat_turns.inc("cancelled")
+                raise
             except Exception as e:
-                return f"Error processing message: {str(e)}"
+                turn_span.set_attribute("error", str(e))
+                outcome = "error"
+                yield ChatEvent("error", text=f"Error processing message: {str(e)}")
+            
+            if self._session_owners.get(session) == conversation.id:
+                conversation.page_url = self._session_pages.get(session, conversation.page_url)
+            if chat is not None:
+                try:
+                    conversation.commit(chat.history)
+                except Exception:
+                    # An interrupted stream leaves no usable history; keep the previous one
+                    pass
+
+        self.metrics.chat_turns.inc(outcome)
+        self.metrics.chat_turn_seconds.observe(time.perf_counter() - started)
+        yield ChatEvent(
+            "done",
+            elapsed=time.perf_counter() - started,
+            time_to_first_token=(first_token_at - started) if first_token_at is not None else None,
+        )
+    
+    async def _restore_page(self, session: ClientSession, conversation: Conversation) -> None:
+        """Put the conversation's page back in a pooled browser before its turn.
         
-        return await self._execute_with_mcp(_chat_with_session)
+        Sessions are not pinned to conversations, so a follow-up turn may land
+        on a browser that another conversation (or a fetch_pages worker) has
+        navigated since; it is sent back to the conversation's last page, so
+        reading tools see what the model saw in earlier turns.
+        """
+        if (
+            self._session_owners.get(session) == conversation.id
+            and self._session_pages.get(session) == conversation.page_url
+        ):
+            return
+        self._session_owners[session] = conversation.id
+        self._session_pages.pop(session, None)
+        if conversation.page_url:
+            self.console.print(f"[dim]↩️  Returning to {conversation.page_url}[/dim]")
+            await self.call_tool(session, "browserbase_navigate", {"url": conversation.page_url})
     
-    async def run_interactive(self) -> None:
-        """Run an interactive chat session."""
+    async def _render_stream(self, events: AsyncIterator[ChatEvent]) -> None:
+        """Render a streamed chat turn incrementally in a Gemini panel."""
+        def panel(text: str) -> Panel:
+            return Panel(
+                Markdown(text) if text else "[yellow]🤖 Gemini is thinking...[/yellow]",
+                title="[bold blue]Gemini[/bold blue]",
+                border_style="blue"
+            )
+        
+        text = ""
+        with Live(panel(text), console=self.console, refresh_per_second=12) as live:
+            async for event in events:
+                if event.type == "text":
+                    text += event.text
+                    live.update(panel(text))
+                elif event.type == "error":
+                    self.console.print(f"[red]❌ {event.text}[/red]")
+                elif event.type == "tool_progress":
+                    self.console.print(f"[dim]   {event.text}[/dim]")
+                elif event.type == "tool_result":
+                    self.console.print(f"[green]✅ {event.tool_name}[/green] [dim]({event.elapsed:.1f}s)[/dim]")
+                elif event.type == "done":
+                    ttft = f"{event.time_to_first_token:.2f}s" if event.time_to_first_token is not None else "n/a"
+                    self.console.print(f"[dim]⏱️  first token {ttft} · total {event.elapsed:.2f}s[/dim]")
+    
+    def print_welcome(self) -> None:
+        """Show the welcome panel of the interactive session."""
         self.console.print(Panel(
             "[bold cyan]🌐 MCP Surf Demo - Gemini + Browserbase[/bold cyan]\n\n"
             "Ask me to browse websites, take screenshots, or analyze web content!\n\n"
@@ -222,10 +839,15 @@ class MCPSurfClient:
             "• Take a screenshot of the current page\n"
             "• Navigate to Google and search for 'Python MCP'\n"
             "• Extract all links from this webpage\n\n"
-            "[dim]Type 'quit' to exit[/dim]",
+            "[dim]Type 'new' to start a new conversation, 'quit' to exit[/dim]",
             title="Welcome",
             border_style="cyan"
         ))
+    
+    async def run_interactive(self, welcome: bool = True) -> None:
+        """Run an interactive chat session."""
+        if welcome:
+            self.print_welcome()
         
         while True:
             try:
@@ -235,41 +857,122 @@ class MCPSurfClient:
                 if user_input.lower() in ['quit', 'exit', 'bye']:
                     break
                 
-                # Process the message
-                self.console.print("[yellow]🤖 Gemini is thinking...[/yellow]")
-                response = await self.chat(user_input)
+                if user_input.lower() == 'new':
+                    self.conversation.reset()
+                    self.console.print("[cyan]🧹 Started a new conversation[/cyan]")
+                    continue
                 
-                # Display the response
-                self.console.print(Panel(
-                    Markdown(response),
-                    title="[bold blue]Gemini[/bold blue]",
-                    border_style="blue"
-                ))
+                # Process the message, rendering the reply as it streams in; Ctrl-C cancels just this turn
+                turn = asyncio.ensure_future(self._render_stream(self.chat_stream(user_input, self.conversation)))
+                with cancel_on_interrupt(turn):
+                    try:
+                        await turn
+                    except asyncio.CancelledError:
+                        if asyncio.current_task().cancelling():
+                            raise
+                        self.console.print("[yellow]⏹️  Cancelled; the conversation continues from your previous message[/yellow]")
                 
             except KeyboardInterrupt:
                 break
             except Exception as e:
                 self.console.print(f"[red]❌ Error: {e}[/red]")
+        
+        if self.speculator is not None and self.speculator.started:
+            stats = self.speculator.stats()
+            self.console.print(
+                f"[dim]🔮 Prefetch: {stats['hits']}/{stats['started']} used "
+                f"({stats['hit_rate']:.0%}), {stats['time_saved_s']:.1f}s saved[/dim]"
+            )
 
 
 async def main():
-    """Main entry point."""
-    client = MCPSurfClient()
+    """Main entry point.
+    
+    The MCP server is spawned first, so that npx package resolution, Node
+    start-up and the MCP handshake overlap Gemini setup and the welcome panel.
+    The connection test and then the chat loop use that same warm server.
+    """
+    started = time.perf_counter()
+    client = MCPSurfClient(setup_gemini=False)
+    
+    async def start_mcp() -> float:
+        await client.start()
+        return time.perf_counter() - started
     
+    mcp_startup = asyncio.create_task(start_mcp())
     try:
+        # The google-generativeai import is slow; run it off the event loop while the server starts
+        await asyncio.to_thread(client.setup_gemini)
+        gemini_ready = time.perf_counter() - started
+        client.print_welcome()
+        
+        try:
+            mcp_ready = await mcp_startup
+        except Exception as e:
+            client.console.print(f"[red]❌ Failed to start MCP server: {e}[/red]")
+            return
+        
         # Test MCP server connection first
         if not await client._test_mcp_connection():
             client.console.print("[red]❌ Failed to connect to MCP server. Please check your configuration.[/red]")
             return
+        command, _ = server_command()
+        client.console.print(
+            f"[dim]⏱️  Startup: Gemini ready in {gemini_ready:.2f}s, MCP server ({command}) ready in "
+            f"{mcp_ready:.2f}s, total {time.perf_counter() - started:.2f}s[/dim]"
+        )
         
         # Run interactive session
-        await client.run_interactive()
+        await client.run_interactive(welcome=False)
         
     except KeyboardInterrupt:
         client.console.print("\n[yellow]👋 Goodbye![/yellow]")
     except Exception as e:
         client.console.print(f"[red]❌ Fatal error: {e}[/red]")
+    finally:
+        # Let a server that is still starting come up before shutting it down
+        await asyncio.gather(mcp_startup, return_exceptions=True)
+        await client.aclose()
 
 
-if __name__ == "__main__":
-    asyncio.run(main())
+async def batch_main(args: argparse.Namespace) -> None:
+    """Run a JSONL file of prompts without the interactive UI."""
+    # Let every concurrent item get its own MCP server unless configured otherwise
+    os.environ.setdefault("MCP_POOL_MAX_SIZE", str(args.concurrency))
+    client = MCPSurfClient()
+    
+    try:
+        summary = await run_batch(
+            client,
+            Path(args.input),
+            Path(args.output),
+            concurrency=args.concurrency,
+            timeout=args.timeout,
+            console=client.console,
+        )
+        client.console.print(
+            f"[cyan]📦 Batch finished in {summary.elapsed:.1f}s: "
+            f"{summary.succeeded} ok, {summary.failed} failed, "
+            f"{summary.timed_out} timed out, {summary.skipped} already done[/cyan]"
+        )
+    finally:
+        await client.aclose()
+
+
+async def serve_main(args: argparse.Namespace) -> None:
+    """Serve the client over HTTP until interrupted."""
+    from server import ChatServer
+    
+    client = MCPSurfClient()
+    try:
+        server = ChatServer(
+            client,
+            host=args.host,
+            port=args.port,
+            max_in_flight=args.max_in_flight,
+            max_queue=args.max_queue,
+            drain_timeout=args.drain_timeout,
+        )
+        await server.serve_forever()
+    finally:
+        await client.aclose()
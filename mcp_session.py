@@ -0,0 +1,701 @@
+"""
+Long-lived MCP server sessions.
+
+Spawning ``npx @browserbasehq/mcp`` and running the MCP handshake costs several
+seconds, and tearing the process down throws away the remote browser state.
+The classes in this module keep server processes (and their ``ClientSession``)
+alive across many tool calls and transparently respawn them if they die.
+"""
+
+import asyncio
+import functools
+import json
+import os
+import shlex
+import shutil
+import subprocess
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple, TypeVar, Union
+
+import anyio
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.session import MessageHandlerFnT
+from mcp.client.stdio import stdio_client
+from mcp.types import (
+    CallToolResult,
+    CancelledNotification,
+    CancelledNotificationParams,
+    ClientNotification,
+    ErrorData,
+    JSONRPCError,
+)
+
+from tracing import tracer
+
+T = TypeVar("T")
+
+# JSON-RPC error code used by newer MCP SDKs when the transport goes away.
+CONNECTION_CLOSED = -32000
+
+DEFAULT_SERVER_COMMAND = "npx"
+DEFAULT_SERVER_ARGS = ["@browserbasehq/mcp"]
+
+
+def server_command() -> Tuple[str, List[str]]:
+    """The MCP server command line.
+
+    Defaults to ``npx @browserbasehq/mcp``; with ``MCP_SERVER_USE_NODE=1`` the
+    package's entry script is run with ``node`` directly when it is installed,
+    skipping npx package resolution.  ``MCP_SERVER_COMMAND`` and
+    ``MCP_SERVER_ARGS`` (shell-quoted) point the client at another server,
+    such as the offline stand-in in ``offline/mcp_server.py``.
+    """
+    command = os.getenv("MCP_SERVER_COMMAND")
+    if not command:
+        if os.getenv("MCP_SERVER_USE_NODE", "0") == "1" and shutil.which("node"):
+            entry = resolve_package_bin(DEFAULT_SERVER_ARGS[0])
+            if entry is not None:
+                return "node", [str(entry)]
+        return DEFAULT_SERVER_COMMAND, list(DEFAULT_SERVER_ARGS)
+    return command, shlex.split(os.getenv("MCP_SERVER_ARGS", ""))
+
+
+def _package_dirs(package: str, start: Path) -> List[Path]:
+    """Where npx would find ``package``: local node_modules, the npx cache, the global root."""
+    candidates = [directory / "node_modules" / package for directory in (start, *start.parents)]
+    npx_cache = Path(os.getenv("npm_config_cache", Path.home() / ".npm")) / "_npx"
+    if npx_cache.is_dir():
+        cached = npx_cache.glob(f"*/node_modules/{package}")
+        candidates += sorted(cached, key=lambda path: path.stat().st_mtime, reverse=True)
+    if shutil.which("npm"):
+        try:
+            root = subprocess.run(["npm", "root", "-g"], capture_output=True, text=True, timeout=10).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            root = ""
+        if root:
+            candidates.append(Path(root) / package)
+    return candidates
+
+
+@functools.lru_cache(maxsize=None)
+def resolve_package_bin(package: str, start: Optional[Path] = None) -> Optional[Path]:
+    """Entry script of an installed npm package's executable, or None if not installed."""
+    for directory in _package_dirs(package, (start or Path.cwd()).resolve()):
+        manifest = directory / "package.json"
+        if not manifest.is_file():
+            continue
+        try:
+            bin_field = json.loads(manifest.read_text()).get("bin")
+        except (OSError, ValueError):
+            continue
+        if isinstance(bin_field, dict):
+            bin_field = next(iter(bin_field.values()), None)
+        if isinstance(bin_field, str) and (directory / bin_field).is_file():
+            return directory / bin_field
+    return None
+
+
+def uses_browserbase_server() -> bool:
+    """Whether the configured server is the real Browserbase MCP server."""
+    return not os.getenv("MCP_SERVER_COMMAND")
+
+
+def parse_browser_contexts(value: str) -> Dict[str, str]:
+    """Parse ``BROWSERBASE_CONTEXT_IDS``: comma-separated ``name=context_id`` entries.
+
+    A bare ``context_id`` is registered under its own id.
+    """
+    contexts: Dict[str, str] = {}
+    for entry in value.split(","):
+        name, _, context_id = entry.strip().partition("=")
+        if name:
+            contexts[name.strip()] = context_id.strip() or name.strip()
+    return contexts
+
+
+async def call_tool_with_timeout(
+    session: ClientSession, name: str, arguments: Dict[str, Any], timeout: Optional[float] = None
+) -> CallToolResult:
+    """``session.call_tool`` that gives up after ``timeout`` seconds.
+
+    If the call times out or the caller is cancelled, the server is sent a
+    ``notifications/cancelled`` for the request, so it stops working on it
+    (a hung page load, say) and the session stays usable for the next call.
+    """
+    # The id send_request() will use: it is taken before the request's first await.  It is
+    # private to the SDK; without it the call is still abandoned, only the server is not told.
+    request_id = getattr(session, "_request_id", None)
+    try:
+        async with asyncio.timeout(timeout):
+            return await session.call_tool(name, arguments)
+    except TimeoutError as e:
+        await _send_cancelled(session, request_id, f"Timed out after {timeout:.1f}s")
+        raise TimeoutError(f"{name} timed out after {timeout:.1f}s") from e
+    except asyncio.CancelledError:
+        await _send_cancelled(session, request_id, "Cancelled by the client")
+        raise
+
+
+async def _send_cancelled(session: ClientSession, request_id: Optional[int], reason: str) -> None:
+    if not isinstance(request_id, int):
+        return
+    try:
+        await session.send_notification(ClientNotification(CancelledNotification(
+            method="notifications/cancelled",
+            params=CancelledNotificationParams(requestId=request_id, reason=reason),
+        )))
+    except Exception:
+        # The server is gone; the pool reconnects on the next checkout
+        pass
+
+
+class MCPConnectionLost(ConnectionError):
+    """Raised when the MCP server process exits while a session is in use."""
+
+
+class MCPSessionManager:
+    """Owns a single MCP server subprocess and its initialized ``ClientSession``.
+
+    The stdio transport and ``ClientSession`` are anyio context managers that
+    must be entered and exited from the same task, so they live inside a
+    dedicated background task for the whole lifetime of the connection.
+    Callers borrow the session through :meth:`session` or :meth:`run`; if the
+    subprocess has died in the meantime a new one is started first.
+
+    Usage::
+
+        async with MCPSessionManager(server_params) as manager:
+            result = await manager.run(lambda s: s.call_tool("browserbase_get_text", {}))
+    """
+
+    def __init__(
+        self,
+        server_params: StdioServerParameters,
+        message_handler: Optional[MessageHandlerFnT] = None,
+        on_reconnect: Optional[Callable[[], None]] = None,
+    ):
+        self.server_params = server_params
+        self.message_handler = message_handler
+        self.on_reconnect = on_reconnect
+        self.reconnects = 0
+        self.started_at: Optional[float] = None
+        self.server_info: Any = None
+
+        self._session: Optional[ClientSession] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing: Optional[asyncio.Event] = None
+        self._lost: Optional[asyncio.Event] = None
+        self._start_lock = asyncio.Lock()
+
+    @property
+    def is_alive(self) -> bool:
+        """Whether the server process is running and the session is usable."""
+        return (
+            self._session is not None
+            and self._task is not None
+            and not self._task.done()
+            and not self._lost.is_set()
+        )
+
+    async def start(self) -> ClientSession:
+        """Start the server (if needed) and return the initialized session."""
+        async with self._start_lock:
+            if self.is_alive:
+                return self._session
+
+            if self._task is not None:
+                # The previous process died; reap it before respawning.
+                await self._stop_task()
+                self.reconnects += 1
+                if self.on_reconnect is not None:
+                    self.on_reconnect()
+
+            with tracer.span("mcp.spawn", {"mcp.command": self.server_params.command, "mcp.reconnect": self.reconnects > 0}):
+                loop = asyncio.get_running_loop()
+                ready: asyncio.Future = loop.create_future()
+                self._closing = asyncio.Event()
+                self._lost = asyncio.Event()
+                self._task = asyncio.create_task(self._run_connection(ready))
+                self._session = await ready
+            self.started_at = time.monotonic()
+            return self._session
+
+    async def aclose(self) -> None:
+        """Shut down the server process."""
+        async with self._start_lock:
+            await self._stop_task()
+
+    async def __aenter__(self) -> "MCPSessionManager":
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.aclose()
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[ClientSession]:
+        """Borrow the live session, reconnecting first if the server died."""
+        session = await self.start()
+        try:
+            yield session
+        except Exception as e:
+            if self._lost is not None and self._lost.is_set():
+                raise MCPConnectionLost("MCP server process exited during the call") from e
+            raise
+
+    async def run(self, func: Callable[[ClientSession], Awaitable[T]]) -> T:
+        """Execute ``func`` with the live session."""
+        async with self.session() as session:
+            return await func(session)
+
+    async def _stop_task(self) -> None:
+        if self._task is None:
+            return
+        self._closing.set()
+        try:
+            await self._task
+        except Exception:
+            pass
+        self._task = None
+        self._session = None
+
+    async def _run_connection(self, ready: asyncio.Future) -> None:
+        """Own the transport and session until asked to close or the server exits."""
+        try:
+            async with stdio_client(self.server_params) as (read_stream, write_stream):
+                relay_send, relay_recv = anyio.create_memory_object_stream(0)
+                async with anyio.create_task_group() as tg:
+                    async with ClientSession(relay_recv, write_stream, message_handler=self.message_handler) as session:
+                        tg.start_soon(self._relay, read_stream, relay_send, session)
+                        with tracer.span("mcp.initialize", activate=False) as span:
+                            init_result = await session.initialize()
+                            span.set_attribute("mcp.server.version", init_result.serverInfo.version)
+                        self.server_info = init_result.serverInfo
+                        ready.set_result(session)
+
+                        closing = asyncio.ensure_future(self._closing.wait())
+                        lost = asyncio.ensure_future(self._lost.wait())
+                        try:
+                            await asyncio.wait({closing, lost}, return_when=asyncio.FIRST_COMPLETED)
+                        finally:
+                            closing.cancel()
+                            lost.cancel()
+                    tg.cancel_scope.cancel()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+        finally:
+            self._lost.set()
+            if not ready.done():
+                ready.set_exception(MCPConnectionLost("MCP server exited during startup"))
+
+    async def _relay(self, read_stream, relay_send, session: ClientSession) -> None:
+        """Forward server messages to the session and notice when the process exits.
+
+        When stdout closes, every request still waiting on a response is failed
+        with ``CONNECTION_CLOSED`` so that callers don't hang forever.
+        """
+        try:
+            async with relay_send:
+                async for message in read_stream:
+                    await relay_send.send(message)
+        except (anyio.ClosedResourceError, anyio.BrokenResourceError):
+            pass
+        finally:
+            self._lost.set()
+            for request_id, stream in list(session._response_streams.items()):
+                try:
+                    stream.send_nowait(JSONRPCError(
+                        jsonrpc="2.0",
+                        id=request_id,
+                        error=ErrorData(code=CONNECTION_CLOSED, message="MCP server process exited"),
+                    ))
+                except (anyio.WouldBlock, anyio.ClosedResourceError, anyio.BrokenResourceError):
+                    pass
+
+
+class LatencyStats:
+    """Running latency summary with percentiles over the most recent samples."""
+
+    def __init__(self, window: int = 1024):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._recent: Deque[float] = deque(maxlen=window)
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self._recent.append(seconds)
+
+    def percentile(self, pct: float) -> float:
+        if not self._recent:
+            return 0.0
+        ordered = sorted(self._recent)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean_ms": (self.total / self.count * 1000) if self.count else 0.0,
+            "p50_ms": self.percentile(50) * 1000,
+            "p95_ms": self.percentile(95) * 1000,
+            "max_ms": self.max * 1000,
+        }
+
+
+@dataclass
+class PoolStats:
+    """Counters and latency distributions for sizing an :class:`MCPSessionPool`."""
+
+    checkouts: int = 0
+    queued_checkouts: int = 0
+    spawned: int = 0
+    evicted: int = 0
+    health_check_failures: int = 0
+    affinity_hits: int = 0
+    affinity_misses: int = 0
+    rebinds: int = 0
+    reconnects: int = 0
+    queue_wait: LatencyStats = field(default_factory=LatencyStats)
+    checkout_latency: LatencyStats = field(default_factory=LatencyStats)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "checkouts": self.checkouts,
+            "queued_checkouts": self.queued_checkouts,
+            "spawned": self.spawned,
+            "evicted": self.evicted,
+            "health_check_failures": self.health_check_failures,
+            "affinity_hits": self.affinity_hits,
+            "affinity_misses": self.affinity_misses,
+            "rebinds": self.rebinds,
+            "reconnects": self.reconnects,
+            "queue_wait": self.queue_wait.summary(),
+            "checkout_latency": self.checkout_latency.summary(),
+        }
+
+
+@dataclass(eq=False)
+class _PooledSession:
+    manager: MCPSessionManager
+    last_used: float
+    last_checked: float
+    context_id: Optional[str] = None
+
+
+class MCPSessionPool:
+    """A pool of warm MCP server processes with checkout/checkin semantics.
+
+    ``min_size`` servers are spawned by :meth:`start` and kept warm; up to
+    ``max_size`` are spawned on demand when every session is checked out, and
+    callers beyond that queue until one is checked back in.  Sessions idle for
+    longer than ``idle_timeout`` are evicted down to ``min_size``, and sessions
+    that have not been used for ``health_check_interval`` seconds are pinged
+    before being handed out.  Idle sessions are reused LIFO, so a single
+    sequential user keeps getting the same (warm) browser.
+
+    Each server can be bound to a Browserbase context (a browser profile with
+    its own cookies and cache).  ``acquire(context_id=...)`` only hands out
+    sessions bound to that context, preferring a warm idle one; otherwise it
+    spawns a new server for the context, retiring an idle server of another
+    context if the pool is full.  ``server_params`` may be a callable taking
+    the context id; plain parameters get ``BROWSERBASE_CONTEXT_ID`` set.
+
+    Usage::
+
+        async with MCPSessionPool(server_params, min_size=2, max_size=8) as pool:
+            async with pool.acquire() as session:
+                await session.call_tool("browserbase_navigate", {"url": url})
+    """
+
+    def __init__(
+        self,
+        server_params: Union[StdioServerParameters, Callable[[Optional[str]], StdioServerParameters]],
+        min_size: int = 1,
+        max_size: int = 4,
+        idle_timeout: float = 300.0,
+        health_check_interval: float = 30.0,
+        health_check_timeout: float = 5.0,
+        message_handler: Optional[MessageHandlerFnT] = None,
+    ):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(f"Invalid pool size: min_size={min_size}, max_size={max_size}")
+
+        self._server_params = server_params
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.health_check_timeout = health_check_timeout
+        self.message_handler = message_handler
+        self.stats = PoolStats()
+        self.server_info: Any = None
+
+        self._idle: List[_PooledSession] = []
+        self._in_use: Set[_PooledSession] = set()
+        self._spawning = 0
+        self._condition = asyncio.Condition()
+        self._reaper: Optional[asyncio.Task] = None
+        self._closed = False
+
+    @property
+    def size(self) -> int:
+        """Number of server processes currently owned by the pool."""
+        return len(self._idle) + len(self._in_use) + self._spawning
+
+    @property
+    def server_version(self) -> Optional[str]:
+        """Version reported by the server during the most recent handshake."""
+        return self.server_info.version if self.server_info is not None else None
+
+    @property
+    def available(self) -> int:
+        """Number of idle sessions ready to be checked out."""
+        return len(self._idle)
+
+    async def start(self) -> None:
+        """Pre-spawn ``min_size`` sessions and start the idle reaper."""
+        self._closed = False
+        missing = self.min_size - self.size
+        if missing > 0:
+            async with self._condition:
+                self._spawning += missing
+            results = await asyncio.gather(
+                *(self._spawn() for _ in range(missing)), return_exceptions=True
+            )
+            async with self._condition:
+                self._spawning -= missing
+                for result in results:
+                    if isinstance(result, _PooledSession):
+                        self._idle.append(result)
+                self._condition.notify_all()
+            errors = [r for r in results if isinstance(r, BaseException)]
+            if errors and len(errors) == len(results):
+                raise errors[0]
+        if self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.create_task(self._reap_forever())
+
+    async def aclose(self) -> None:
+        """Shut down every server process owned by the pool."""
+        self._closed = True
+        if self._reaper is not None:
+            self._reaper.cancel()
+            try:
+                await self._reaper
+            except asyncio.CancelledError:
+                pass
+            self._reaper = None
+        async with self._condition:
+            entries = self._idle + list(self._in_use)
+            self._idle.clear()
+            self._in_use.clear()
+            self._condition.notify_all()
+        await asyncio.gather(*(entry.manager.aclose() for entry in entries), return_exceptions=True)
+
+    async def __aenter__(self) -> "MCPSessionPool":
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.aclose()
+
+    @asynccontextmanager
+    async def acquire(self, context_id: Optional[str] = None) -> AsyncIterator[ClientSession]:
+        """Check out a session (bound to ``context_id``) for the ``async with`` block."""
+        with tracer.span("mcp.pool.checkout", {"pool.size": self.size, "pool.available": self.available}):
+            entry = await self._checkout(context_id)
+        try:
+            async with entry.manager.session() as session:
+                yield session
+        finally:
+            await self._checkin(entry)
+
+    @asynccontextmanager
+    async def try_acquire(self, context_id: Optional[str] = None) -> AsyncIterator[Optional[ClientSession]]:
+        """Like acquire(), but yield None instead of waiting when the pool is exhausted.
+
+        An idle session is reused and a new one spawned if there is room;
+        sessions of other contexts are never replaced.
+        """
+        entry = await self._checkout(context_id, wait=False)
+        if entry is None:
+            yield None
+            return
+        try:
+            async with entry.manager.session() as session:
+                yield session
+        finally:
+            await self._checkin(entry)
+
+    def context_of(self, session: ClientSession) -> Optional[str]:
+        """Browserbase context of a checked-out session."""
+        for entry in self._in_use:
+            if entry.manager._session is session:
+                return entry.context_id
+        return None
+
+    async def run(self, func: Callable[[ClientSession], Awaitable[T]]) -> T:
+        """Execute ``func`` with a pooled session."""
+        async with self.acquire() as session:
+            return await func(session)
+
+    def _pop_idle(self, context_id: Optional[str]) -> Optional[_PooledSession]:
+        """Most recently used idle session bound to ``context_id``, if any."""
+        for i in range(len(self._idle) - 1, -1, -1):
+            if self._idle[i].context_id == context_id:
+                return self._idle.pop(i)
+        return None
+
+    async def _checkout(self, context_id: Optional[str] = None, wait: bool = True) -> Optional[_PooledSession]:
+        if self._closed:
+            raise RuntimeError("MCP session pool is closed")
+
+        started = time.monotonic()
+        entry: Optional[_PooledSession] = None
+        retired: Optional[_PooledSession] = None
+        queued = False
+        async with self._condition:
+            while True:
+                entry = self._pop_idle(context_id)
+                if entry is not None:
+                    break
+                if self.size < self.max_size:
+                    self._spawning += 1
+                    break
+                if not wait:
+                    return None
+                if self._idle:
+                    # Full, but an idle server is bound to another context:
+                    # replace the least recently used one
+                    retired = self._idle.pop(0)
+                    self._spawning += 1
+                    break
+                queued = True
+                await self._condition.wait()
+                if self._closed:
+                    raise RuntimeError("MCP session pool is closed")
+        wait_time = time.monotonic() - started
+
+        if context_id is not None:
+            if entry is not None:
+                self.stats.affinity_hits += 1
+            else:
+                self.stats.affinity_misses += 1
+        if retired is not None:
+            self.stats.rebinds += 1
+            self.stats.evicted += 1
+            await retired.manager.aclose()
+
+        if entry is None:
+            try:
+                entry = await self._spawn(context_id)
+            finally:
+                async with self._condition:
+                    self._spawning -= 1
+                    self._condition.notify()
+        elif not await self._is_healthy(entry):
+            try:
+                await entry.manager.start()
+            except BaseException:
+                # The entry left the idle list, so its slot is already free: shut
+                # the server down and let a waiter spawn a replacement
+                self.stats.evicted += 1
+                await entry.manager.aclose()
+                async with self._condition:
+                    self._condition.notify()
+                raise
+
+        async with self._condition:
+            self._in_use.add(entry)
+
+        self.stats.checkouts += 1
+        if queued:
+            self.stats.queued_checkouts += 1
+        self.stats.queue_wait.observe(wait_time)
+        self.stats.checkout_latency.observe(time.monotonic() - started)
+        return entry
+
+    async def _checkin(self, entry: _PooledSession) -> None:
+        entry.last_used = time.monotonic()
+        async with self._condition:
+            self._in_use.discard(entry)
+            if self._closed:
+                alive = False
+            else:
+                alive = entry.manager.is_alive
+                if alive:
+                    self._idle.append(entry)
+            self._condition.notify()
+        if not alive:
+            await entry.manager.aclose()
+
+    async def _spawn(self, context_id: Optional[str] = None) -> _PooledSession:
+        if callable(self._server_params):
+            params = self._server_params(context_id)
+        elif context_id is not None:
+            params = self._server_params.model_copy(update={
+                "env": {**(self._server_params.env or {}), "BROWSERBASE_CONTEXT_ID": context_id},
+            })
+        else:
+            params = self._server_params
+        manager = MCPSessionManager(params, message_handler=self.message_handler, on_reconnect=self._record_reconnect)
+        await manager.start()
+        self.server_info = manager.server_info
+        self.stats.spawned += 1
+        now = time.monotonic()
+        return _PooledSession(manager=manager, last_used=now, last_checked=now, context_id=context_id)
+
+    def _record_reconnect(self) -> None:
+        self.stats.reconnects += 1
+
+    async def _is_healthy(self, entry: _PooledSession) -> bool:
+        """Ping sessions that have been idle for a while; cheap otherwise."""
+        if not entry.manager.is_alive:
+            self.stats.health_check_failures += 1
+            return False
+        now = time.monotonic()
+        if now - entry.last_checked < self.health_check_interval:
+            return True
+        try:
+            async with entry.manager.session() as session:
+                await asyncio.wait_for(session.send_ping(), self.health_check_timeout)
+        except Exception:
+            self.stats.health_check_failures += 1
+            await entry.manager.aclose()
+            return False
+        entry.last_checked = time.monotonic()
+        return True
+
+    async def _reap_forever(self) -> None:
+        interval = max(1.0, min(self.idle_timeout, self.health_check_interval) / 2)
+        while True:
+            await asyncio.sleep(interval)
+            await self._reap()
+
+    async def _reap(self) -> None:
+        """Evict sessions idle past ``idle_timeout`` and drop dead ones."""
+        now = time.monotonic()
+        evicted: List[_PooledSession] = []
+        async with self._condition:
+            # Oldest idle sessions sit at the bottom of the LIFO stack.
+            for entry in list(self._idle):
+                dead = not entry.manager.is_alive
+                expired = now - entry.last_used > self.idle_timeout and self.size - len(evicted) > self.min_size
+                if dead or expired:
+                    self._idle.remove(entry)
+                    evicted.append(entry)
+        for entry in evicted:
+            self.stats.evicted += 1
+            await entry.manager.aclose()
+        if self.size < self.min_size and not self._closed:
+            try:
+                await self.start()
+            except Exception:
+                pass
@@ -0,0 +1,225 @@
+"""
+In-process metrics: counters and histograms exported as Prometheus text.
+
+Recording a sample is a dict lookup and an addition, cheap enough to do on
+every tool call (``benchmarks/metrics_overhead.py`` measures it).  Numbers that
+other components already keep (session pool, result cache, tool catalog, rate
+limiters) are not counted twice: collectors read them when the registry is
+rendered.
+
+``server.py`` serves :meth:`MetricsRegistry.render_prometheus` at
+``GET /metrics``.  Set ``MCP_SURF_METRICS_FILE`` to also append a JSON
+snapshot to a file every ``MCP_SURF_METRICS_INTERVAL`` seconds.
+
+Usage::
+
+    tool_calls = registry.counter("tool_calls_total", "Tool calls", ("tool", "result"))
+    tool_calls.inc("browserbase_get_text", "ok")
+    latency = registry.histogram("tool_call_seconds", "Tool call latency", ("tool",))
+    latency.observe(0.42, "browserbase_get_text")
+"""
+
+import asyncio
+import bisect
+import json
+import math
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Seconds; covers cached reads (milliseconds) up to slow page loads and long turns
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+Labels = Tuple[str, ...]
+
+
+@dataclass
+class MetricFamily:
+    """All samples of one metric, as rendered."""
+
+    name: str
+    kind: str  # "counter", "gauge" or "histogram"
+    help: str
+    samples: List[Tuple[str, Dict[str, str], float]] = field(default_factory=list)
+
+    @classmethod
+    def single(cls, name: str, kind: str, help: str, value: float, **labels: str) -> "MetricFamily":
+        return cls(name, kind, help, [(name, labels, value)])
+
+
+class Counter:
+    """Monotonic count, one series per combination of label values."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def collect(self) -> MetricFamily:
+        return MetricFamily(self.name, self.kind, self.help, [
+            (self.name, dict(zip(self.labelnames, labels)), value) for labels, value in self._values.items()
+        ])
+
+
+class Histogram:
+    """Distribution over fixed buckets, one series per combination of label values."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per series: a count per bucket (the last one is +Inf), then the sum
+        self._series: Dict[Labels, List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return sum(series[:-1]) if series else 0
+
+    def collect(self) -> MetricFamily:
+        family = MetricFamily(self.name, self.kind, self.help)
+        for labels, series in self._series.items():
+            names = dict(zip(self.labelnames, labels))
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), series):
+                cumulative += count
+                family.samples.append((f"{self.name}_bucket", {**names, "le": _format_value(bound)}, cumulative))
+            family.samples.append((f"{self.name}_count", names, cumulative))
+            family.samples.append((f"{self.name}_sum", names, series[-1]))
+        return family
+
+
+Collector = Callable[[], Iterable[MetricFamily]]
+
+
+class MetricsRegistry:
+    """Instruments plus collectors, rendered together."""
+
+    def __init__(self):
+        self._instruments: List[Any] = []
+        self._collectors: List[Collector] = []
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        counter = Counter(name, help, labelnames)
+        self._instruments.append(counter)
+        return counter
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        histogram = Histogram(name, help, labelnames, buckets)
+        self._instruments.append(histogram)
+        return histogram
+
+    def register_collector(self, collector: Collector) -> None:
+        """Add a function that reports metrics kept elsewhere at render time."""
+        self._collectors.append(collector)
+
+    def collect(self) -> List[MetricFamily]:
+        families = [instrument.collect() for instrument in self._instruments]
+        for collector in self._collectors:
+            try:
+                families.extend(collector())
+            except Exception:
+                # A broken collector must not take the metrics endpoint down with it
+                continue
+        return families
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for family in self.collect():
+            lines.append(f"# HELP {family.name} {_escape_help(family.help)}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for name, labels, value in family.samples:
+                label_text = ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels.items())
+                lines.append(f"{name}{{{label_text}}} {_format_value(value)}" if label_text else f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, Any]:
+        """All samples as JSON-serializable data."""
+        return {
+            "timestamp": time.time(),
+            "metrics": {
+                family.name: [{"name": name, "labels": labels, "value": value} for name, labels, value in family.samples]
+                for family in self.collect()
+            },
+        }
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _escape_label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class ClientMetrics:
+    """The instruments updated by ``MCPSurfClient``."""
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None):
+        self.registry = registry or MetricsRegistry()
+        registry = self.registry
+        self.chat_turns = registry.counter("mcp_surf_chat_turns_total", "Chat turns by outcome", ("outcome",))
+        self.chat_turn_seconds = registry.histogram("mcp_surf_chat_turn_seconds", "Duration of chat turns")
+        self.gemini_request_seconds = registry.histogram(
+            "mcp_surf_gemini_request_seconds", "Gemini requests, until the streamed response is complete"
+        )
+        self.gemini_tokens = registry.counter("mcp_surf_gemini_tokens_total", "Gemini tokens by direction", ("direction",))
+        self.tool_calls = registry.counter(
+            "mcp_surf_tool_calls_total", "MCP tool calls by tool and result (ok, error, timeout, cancelled, exception, cached, prefetched)",
+            ("tool", "result"),
+        )
+        self.tool_call_seconds = registry.histogram("mcp_surf_tool_call_seconds", "Latency of MCP tool calls", ("tool",))
+        self.function_call_seconds = registry.histogram(
+            "mcp_surf_function_call_seconds", "Gemini function calls handled, including result shaping", ("tool",)
+        )
+
+
+async def dump_periodically(registry: MetricsRegistry, path: str, interval: float = 60.0) -> None:
+    """Append a JSON snapshot to ``path`` every ``interval`` seconds (and once more when cancelled)."""
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            _append_snapshot(registry, path)
+    finally:
+        _append_snapshot(registry, path)
+
+
+def _append_snapshot(registry: MetricsRegistry, path: str) -> None:
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(registry.snapshot(), default=str) + "\n")
+
+
+def dump_settings_from_env() -> Optional[Tuple[str, float]]:
+    """(path, interval) of the periodic JSON dump, if ``MCP_SURF_METRICS_FILE`` is set."""
+    path = os.getenv("MCP_SURF_METRICS_FILE")
+    if not path:
+        return None
+    return path, float(os.getenv("MCP_SURF_METRICS_INTERVAL", "60"))
@@ -0,0 +1,6 @@
+"""
+Offline stand-ins for the Browserbase MCP server and the Gemini API.
+
+- ``offline/mcp_server.py``: stdio MCP server serving local HTML fixtures
+- ``offline/gemini.py``: scripted ``GenerativeModel`` replacement
+"""
@@ -0,0 +1,147 @@
+"""
+Scripted stand-in for ``google.generativeai.GenerativeModel``.
+
+Every chat started from a :class:`ScriptedModel` replays the same list of
+model responses, one per ``send_message_async`` call, so the client's tool
+loop runs deterministically without an API key:
+
+    GEMINI_SCRIPT=offline/scripts/browse_example.json python main.py
+
+A script is a JSON list of responses (or an object with ``responses`` plus
+optional ``latency_ms`` and ``chunk_delay_ms``).  Each response is either a
+string or a list of parts such as ``{"text": "..."}`` or
+``{"function_call": {"name": "browserbase_navigate", "args": {"url": "..."}}}``.
+Once the script runs out, the model answers ``"Done."``.
+"""
+
+import asyncio
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Union
+
+import google.generativeai as genai
+from google.generativeai.types import content_types, generation_types
+
+ScriptResponse = Union[str, List[Dict[str, Any]]]
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _content_text(content: genai.protos.Content) -> str:
+    return " ".join(
+        part.text if part.text else type(part).to_json(part) for part in content.parts
+    )
+
+
+class ScriptedResponse:
+    """A finished response that can also be consumed as a stream of chunks."""
+
+    def __init__(self, parts: List[Dict[str, Any]], prompt_tokens: int, chunk_delay: float = 0.0):
+        self.chunk_delay = chunk_delay
+        output_tokens = sum(_estimate_tokens(part.get("text", json.dumps(part))) for part in parts)
+        self._response = self._build(parts, prompt_tokens, output_tokens)
+        self._chunks = [self._build(chunk, 0, 0) for chunk in self._split(parts)]
+
+    @staticmethod
+    def _build(parts, prompt_tokens: int, output_tokens: int) -> generation_types.GenerateContentResponse:
+        proto = genai.protos.GenerateContentResponse(
+            candidates=[{"content": {"role": "model", "parts": parts}, "finish_reason": "STOP"}],
+            usage_metadata={
+                "prompt_token_count": prompt_tokens,
+                "candidates_token_count": output_tokens,
+                "total_token_count": prompt_tokens + output_tokens,
+            },
+        )
+        return generation_types.GenerateContentResponse.from_response(proto)
+
+    @staticmethod
+    def _split(parts: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """Split text parts into a few word-group chunks, like a real stream."""
+        chunks = []
+        for part in parts:
+            if "text" in part:
+                words = part["text"].split(" ")
+                for i in range(0, len(words), 8):
+                    tail = " " if i + 8 < len(words) else ""
+                    chunks.append([{"text": " ".join(words[i:i + 8]) + tail}])
+            else:
+                chunks.append([part])
+        return chunks
+
+    @property
+    def candidates(self):
+        return self._response.candidates
+
+    @property
+    def parts(self):
+        return self._response.parts
+
+    @property
+    def text(self) -> str:
+        return self._response.text
+
+    @property
+    def usage_metadata(self):
+        return self._response.usage_metadata
+
+    async def __aiter__(self):
+        for chunk in self._chunks:
+            if self.chunk_delay:
+                await asyncio.sleep(self.chunk_delay)
+            yield chunk
+
+
+class ScriptedChat:
+    """Chat session that answers each message with the next scripted response."""
+
+    def __init__(self, model: "ScriptedModel", history=None):
+        self.model = model
+        self.history: List[genai.protos.Content] = list(content_types.to_contents(history or []))
+        self._step = 0
+
+    async def send_message_async(self, content, *, stream: bool = False, **kwargs) -> ScriptedResponse:
+        content = content_types.to_content(content)
+        if not content.role:
+            content.role = "user"
+        self.history.append(content)
+
+        if self._step < len(self.model.responses):
+            parts = self.model.responses[self._step]
+        else:
+            parts = [{"text": "Done."}]
+        self._step += 1
+
+        if self.model.latency:
+            await asyncio.sleep(self.model.latency)
+        prompt_tokens = sum(_estimate_tokens(_content_text(c)) for c in self.history)
+        response = ScriptedResponse(parts, prompt_tokens, self.model.chunk_delay if stream else 0.0)
+        self.history.append(response.candidates[0].content)
+        return response
+
+
+class ScriptedModel:
+    """Drop-in replacement for ``genai.GenerativeModel`` in MCPSurfClient."""
+
+    def __init__(self, responses: List[ScriptResponse], latency: float = 0.0, chunk_delay: float = 0.0):
+        self.responses = [
+            [{"text": response}] if isinstance(response, str) else response
+            for response in responses
+        ]
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+
+    @classmethod
+    def from_file(cls, path: Union[str, Path]) -> "ScriptedModel":
+        script = json.loads(Path(path).read_text())
+        if isinstance(script, list):
+            return cls(script)
+        return cls(
+            script["responses"],
+            latency=script.get("latency_ms", 0) / 1000,
+            chunk_delay=script.get("chunk_delay_ms", 0) / 1000,
+        )
+
+    def start_chat(self, history=None, **kwargs) -> ScriptedChat:
+        return ScriptedChat(self, history)
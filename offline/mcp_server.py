@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Offline stand-in for the Browserbase MCP server.
+
+Implements the browsing tools used by this project over stdio, against local
+HTML fixtures instead of a remote browser, so that tests and benchmarks can
+run without Browserbase credentials, Node.js or network access:
+
+    MCP_SERVER_COMMAND=python MCP_SERVER_ARGS="offline/mcp_server.py" python main.py
+
+URLs map to fixture files by host and path (``https://shop.example/products/1``
+-> ``shop.example_products_1.html``, ``https://example.com/`` ->
+``example.com.html``); unknown URLs render a small "not found" page.
+
+Injected latency is configured through the environment:
+
+- ``STANDIN_LATENCY_MS``: delay added to every tool call (default: 0)
+- ``STANDIN_STARTUP_MS``: delay before the server starts answering (default: 0)
+- ``STANDIN_HANG_HOSTS``: comma-separated hosts whose page loads never finish
+  (until the client cancels the request), like a hung page in a remote browser
+- ``STANDIN_FIXTURES``: fixture directory (default: ``offline/fixtures``)
+"""
+
+import asyncio
+import hashlib
+import os
+import struct
+import time
+import zlib
+from html.parser import HTMLParser
+from importlib.metadata import version
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+from mcp.server.fastmcp import FastMCP, Image
+from mcp.shared.session import RequestResponder
+
+FIXTURES_DIR = Path(os.getenv("STANDIN_FIXTURES", Path(__file__).parent / "fixtures"))
+LATENCY = float(os.getenv("STANDIN_LATENCY_MS", "0")) / 1000
+STARTUP_DELAY = float(os.getenv("STANDIN_STARTUP_MS", "0")) / 1000
+HANG_HOSTS = {host.strip() for host in os.getenv("STANDIN_HANG_HOSTS", "").split(",") if host.strip()}
+
+NOT_FOUND_HTML = "<html><head><title>Not Found</title></head><body><h1>404</h1><p>No fixture for {url}</p></body></html>"
+
+
+class _TextExtractor(HTMLParser):
+    """Collect visible text, skipping script and style elements."""
+
+    def __init__(self):
+        super().__init__()
+        self.chunks: List[str] = []
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("script", "style"):
+            self._skip += 1
+
+    def handle_endtag(self, tag):
+        if tag in ("script", "style") and self._skip:
+            self._skip -= 1
+
+    def handle_data(self, data):
+        if not self._skip and data.strip():
+            self.chunks.append(data.strip())
+
+
+def fixture_for(url: str) -> str:
+    """Return the HTML fixture for a URL."""
+    parsed = urlparse(url)
+    path = parsed.path.strip("/").replace("/", "_")
+    candidates = [f"{parsed.netloc}_{path}.html" if path else None, f"{parsed.netloc}.html"]
+    for name in candidates:
+        if name and (FIXTURES_DIR / name).exists():
+            return (FIXTURES_DIR / name).read_text()
+    return NOT_FOUND_HTML.format(url=url)
+
+
+def html_to_text(html: str) -> str:
+    extractor = _TextExtractor()
+    extractor.feed(html)
+    return "\n".join(extractor.chunks)
+
+
+def render_png(seed: str, width: int = 640, height: int = 400) -> bytes:
+    """A deterministic solid-color PNG standing in for a page screenshot."""
+    r, g, b = hashlib.sha256(seed.encode()).digest()[:3]
+    row = b"\x00" + bytes((r, g, b)) * width
+    raw = zlib.compress(row * height)
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", raw) + chunk(b"IEND", b"")
+
+
+class Browser:
+    """The state a remote browser would hold: the current page."""
+
+    def __init__(self):
+        self.url: Optional[str] = None
+        self.html = ""
+        self.session_id: Optional[str] = None
+        self.typed: Dict[str, str] = {}
+
+
+# mcp releases (major, minor) whose RequestResponder.__exit__ is replaced below
+PATCHED_MCP_VERSIONS = {(1, 9)}
+# Private RequestResponder attributes the replacement relies on
+_RESPONDER_ATTRIBUTES = {"_completed", "_on_complete", "_entered", "_cancel_scope"}
+
+
+def _end_cancelled_requests_quietly() -> None:
+    """Let ``notifications/cancelled`` end one request, not the whole server.
+
+    In mcp 1.9 ``RequestResponder.__exit__`` drops the result of its
+    cancel scope's ``__exit__``, so the cancellation escapes the request and
+    stops the server's task group.  The Browserbase server (TypeScript SDK)
+    just aborts the request, which is what the client relies on.
+
+    The replacement uses private attributes of that release, so it is only
+    applied to the versions in ``PATCHED_MCP_VERSIONS`` and fails loudly if
+    they are missing rather than breaking cancellation silently.
+    """
+    missing = _RESPONDER_ATTRIBUTES - set(RequestResponder.__init__.__code__.co_names)
+    if missing:
+        raise RuntimeError(
+            f"mcp {version('mcp')}: RequestResponder has no {', '.join(sorted(missing))}; "
+            "update _end_cancelled_requests_quietly() for this release"
+        )
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            if self._completed:
+                self._on_complete(self)
+        finally:
+            self._entered = False
+            swallowed = self._cancel_scope.__exit__(exc_type, exc_val, exc_tb)
+        return swallowed
+
+    RequestResponder.__exit__ = __exit__
+
+
+if tuple(int(part) for part in version("mcp").split(".")[:2]) in PATCHED_MCP_VERSIONS:
+    _end_cancelled_requests_quietly()
+
+mcp = FastMCP("browserbase-standin", log_level="WARNING")
+browser = Browser()
+
+
+async def _delay() -> None:
+    if LATENCY:
+        await asyncio.sleep(LATENCY)
+
+
+def _require_page() -> None:
+    if browser.url is None:
+        raise ValueError("No page loaded; call browserbase_navigate first")
+
+
+@mcp.tool()
+async def browserbase_session_create(sessionId: str = "") -> str:
+    """Create or reuse a browser session."""
+    await _delay()
+    browser.session_id = sessionId or f"standin-{os.getpid()}"
+    context_id = os.getenv("BROWSERBASE_CONTEXT_ID")
+    if context_id:
+        return f"Created session {browser.session_id} in context {context_id}"
+    return f"Created session {browser.session_id}"
+
+
+@mcp.tool()
+async def browserbase_session_close(sessionId: str = "") -> str:
+    """Close the current browser session."""
+    await _delay()
+    browser.__init__()
+    return "Session closed"
+
+
+@mcp.tool()
+async def browserbase_navigate(url: str) -> str:
+    """Navigate to a URL."""
+    await _delay()
+    if urlparse(url).hostname in HANG_HOSTS:
+        # Cancelled through notifications/cancelled; the current page stays loaded
+        await asyncio.Event().wait()
+    browser.url = url
+    browser.html = fixture_for(url)
+    return f"Navigated to {url}"
+
+
+@mcp.tool()
+async def browserbase_get_text(selector: str = "") -> str:
+    """Extract the text content of the current page."""
+    await _delay()
+    _require_page()
+    return html_to_text(browser.html)
+
+
+@mcp.tool()
+async def browserbase_get_html(selector: str = "") -> str:
+    """Return the HTML of the current page."""
+    await _delay()
+    _require_page()
+    return browser.html
+
+
+@mcp.tool()
+async def browserbase_take_screenshot(name: str = "") -> Image:
+    """Take a screenshot of the current page."""
+    await _delay()
+    _require_page()
+    return Image(data=render_png(browser.url), format="png")
+
+
+@mcp.tool()
+async def browserbase_click(selector: str) -> str:
+    """Click an element on the current page."""
+    await _delay()
+    _require_page()
+    return f"Clicked {selector}"
+
+
+@mcp.tool()
+async def browserbase_type(selector: str, text: str) -> str:
+    """Type text into an element on the current page."""
+    await _delay()
+    _require_page()
+    browser.typed[selector] = text
+    return f"Typed into {selector}"
+
+
+if __name__ == "__main__":
+    if STARTUP_DELAY:
+        time.sleep(STARTUP_DELAY)
+    mcp.run()
@@ -0,0 +1,268 @@
+"""
+Client-side rate limiting and retries for Gemini and Browserbase.
+
+Each upstream gets a :class:`RateLimiter` with optional requests-per-minute
+and tokens-per-minute buckets.  Callers wait in a priority queue, so an
+interactive turn that arrives while batch work is queued goes first
+(see :func:`request_priority`).  :func:`with_retries` retries rate limited
+and temporarily unavailable calls with jittered exponential backoff, using
+the server's own retry delay when it gives one; a 429 also pauses the whole
+limiter so that every caller of that upstream backs off together.
+
+With limits set just below the quota, throughput stays at the quota ceiling
+and requests wait instead of failing.
+"""
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import random
+import re
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class Priority:
+    """Queue priorities; lower values are served first."""
+
+    INTERACTIVE = 0
+    BATCH = 10
+
+
+_priority: contextvars.ContextVar[int] = contextvars.ContextVar("request_priority", default=Priority.INTERACTIVE)
+
+
+@contextmanager
+def request_priority(priority: int) -> Iterator[None]:
+    """Run the enclosed calls (and tasks started from them) at ``priority``."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class TokenBucket:
+    """Continuously refilling bucket holding up to one minute of quota."""
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self, cost: float) -> float:
+        """Seconds until ``cost`` can be taken (0 if it can be taken now)."""
+        self._refill()
+        # A single request larger than the bucket may run on a full bucket
+        need = min(cost, self.capacity)
+        return 0.0 if self.level >= need else (need - self.level) / self.rate
+
+    def take(self, cost: float) -> None:
+        """Remove ``cost``; the level may go negative, delaying later callers."""
+        self._refill()
+        self.level -= cost
+
+
+class RateLimiter:
+    """Admit calls to one upstream within its RPM/TPM, highest priority first.
+
+    Usage::
+
+        await limiter.acquire(cost=estimated_tokens)
+        response = await call()
+        limiter.settle(actual_tokens - estimated_tokens)
+    """
+
+    def __init__(self, name: str, rpm: Optional[float] = None, tpm: Optional[float] = None):
+        self.name = name
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self._waiters: List[Tuple[int, int, float, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._pump: Optional[asyncio.Task] = None
+        self._paused_until = 0.0
+
+        self.granted = 0
+        self.throttled = 0
+        self.wait_time = 0.0
+
+    def _delay(self, cost: float) -> float:
+        delay = max(0.0, self._paused_until - time.monotonic())
+        if self.requests is not None:
+            delay = max(delay, self.requests.delay(1))
+        if self.tokens is not None:
+            delay = max(delay, self.tokens.delay(cost))
+        return delay
+
+    async def acquire(self, cost: float = 1, priority: Optional[int] = None) -> None:
+        """Wait until the call may be made."""
+        if not self._waiters and self._delay(cost) == 0:
+            self._take(cost)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        priority = _priority.get() if priority is None else priority
+        heapq.heappush(self._waiters, (priority, next(self._sequence), cost, future))
+        self._wakeup.set()
+        if self._pump is None or self._pump.done():
+            self._pump = asyncio.create_task(self._run_pump())
+        started = time.monotonic()
+        await future
+        self.wait_time += time.monotonic() - started
+
+    def settle(self, extra_tokens: float) -> None:
+        """Correct the token estimate made at acquire() once the real count is known."""
+        if self.tokens is not None and extra_tokens:
+            self.tokens.take(extra_tokens)
+
+    def pause(self, seconds: float) -> None:
+        """Hold every caller for ``seconds`` (after the upstream rate limited us)."""
+        self.throttled += 1
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "granted": self.granted,
+            "waiting": len(self._waiters),
+            "throttled": self.throttled,
+            "wait_time_s": round(self.wait_time, 3),
+        }
+
+    def _take(self, cost: float) -> None:
+        if self.requests is not None:
+            self.requests.take(1)
+        if self.tokens is not None:
+            self.tokens.take(cost)
+        self.granted += 1
+
+    async def _run_pump(self) -> None:
+        """Grant waiters in priority order as the buckets refill."""
+        while self._waiters:
+            _, _, cost, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            delay = self._delay(cost)
+            if delay > 0:
+                # Wake early if a more urgent caller arrives
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            heapq.heappop(self._waiters)
+            self._take(cost)
+            future.set_result(None)
+
+
+_RATE_LIMITED = re.compile(r"\b(429|503)\b|rate.?limit|too many requests|resource.?exhausted|quota", re.IGNORECASE)
+_RETRY_DELAY = re.compile(r"retry(?:[ _-]?(?:in|after|delay))\D{0,20}?(\d+(?:\.\d+)?)\s*(ms|s)?", re.IGNORECASE)
+RETRYABLE_STATUS = {429, 503}
+
+# A Browserbase API error as the MCP server passes it on in an error result: the API
+# client's message starts with the HTTP status ("429 {...}"), at most behind the
+# server's own prefix naming the Browserbase session it failed to get.  Anything else
+# in an error result (page text, target-site errors) is never read as a rate limit.
+_BROWSERBASE_STATUS = re.compile(
+    r"^(?:Error:\s*)?"
+    r"(?:(?:Failed to|Error|Could not)\b[^:\n]{0,80}\b(?:Browserbase|session)\b[^:\n]{0,40}:\s*)?"
+    r"(?:Error:\s*)?(?P<status>\d{3})\b",
+    re.IGNORECASE,
+)
+
+
+class RateLimitedError(Exception):
+    """An upstream reported a rate limit inside an otherwise normal response.
+
+    MCP servers return upstream errors as tool results with ``isError`` set;
+    raising this lets :func:`with_retries` retry them.  ``result`` is the
+    original response, to fall back on when retries run out.  Only results
+    that :func:`is_browserbase_rate_limit` recognizes are raised as this.
+    """
+
+    def __init__(self, message: str, result: Any = None):
+        super().__init__(message)
+        self.result = result
+
+
+def is_browserbase_rate_limit(text: str) -> bool:
+    """Whether an MCP error result is Browserbase itself answering 429 or 503.
+
+    Only the start of the error is looked at, where the server puts the
+    Browserbase API status; a target site's 503 or a page mentioning quotas
+    further in is a normal tool error.
+    """
+    match = _BROWSERBASE_STATUS.match(text.lstrip())
+    return match is not None and int(match.group("status")) in RETRYABLE_STATUS
+
+
+def retry_hint(error: BaseException) -> Optional[float]:
+    """Seconds to wait before retrying ``error``; 0.0 if retryable without a hint, None if not retryable."""
+    status = getattr(error, "code", None) or getattr(error, "status_code", None)
+    if not (isinstance(status, int) and status in RETRYABLE_STATUS) and not _RATE_LIMITED.search(str(error)):
+        return None
+
+    # google.api_core errors carry a RetryInfo detail
+    for detail in getattr(error, "details", None) or ():
+        retry_delay = getattr(detail, "retry_delay", None)
+        if retry_delay is not None and getattr(retry_delay, "seconds", None) is not None:
+            return retry_delay.seconds + getattr(retry_delay, "nanos", 0) / 1e9
+
+    response = getattr(error, "response", None)
+    retry_after = getattr(response, "headers", {}).get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+
+    match = _RETRY_DELAY.search(str(error))
+    if match:
+        value = float(match.group(1))
+        return value / 1000 if (match.group(2) or "").lower() == "ms" else value
+    return 0.0
+
+
+def backoff_delay(attempt: int, base: float = 1.0, maximum: float = 60.0) -> float:
+    """Full-jitter exponential backoff for the given (zero-based) attempt."""
+    return random.uniform(0, min(maximum, base * 2 ** attempt))
+
+
+async def with_retries(
+    func: Callable[[], Awaitable[T]],
+    limiter: Optional[RateLimiter] = None,
+    cost: float = 1,
+    max_attempts: int = 5,
+    base_delay: float = 1.0,
+    max_delay: float = 60.0,
+) -> T:
+    """Call ``func`` through ``limiter``, retrying rate limited or unavailable errors."""
+    attempt = 0
+    while True:
+        if limiter is not None:
+            await limiter.acquire(cost)
+        try:
+            return await func()
+        except Exception as e:
+            hint = retry_hint(e)
+            attempt += 1
+            if hint is None or attempt >= max_attempts:
+                raise
+            delay = min(max_delay, hint) if hint > 0 else backoff_delay(attempt - 1, base_delay, max_delay)
+            if limiter is not None:
+                # The next acquire() waits out the pause, together with every other caller
+                limiter.pause(delay)
+            else:
+                await asyncio.sleep(delay)
@@ -0,0 +1,265 @@
+"""
+Response cache for idempotent browsing tools.
+
+Reading the same page over and over (``browserbase_get_text``, extraction
+tools) costs a remote browser round trip each time.  ``ToolResultCache`` keys
+results on (tool name, canonicalized arguments, URL the session's browser is
+on, Browserbase context) and keeps them in a bounded in-memory LRU,
+optionally backed by SQLite.  The context is part of the key because the
+same URL shows different pages to different logged-in profiles.
+
+Only tools with a :class:`CachePolicy` are cached.  Other tools in
+:data:`READ_ONLY_TOOLS` (screenshots, ``get_html``) are not cached but leave
+the page alone.  Anything else is treated as side-effecting: after a click, a
+form fill or any unknown tool the page may have changed, so the session's URL
+is forgotten and nothing is cached for it until the next navigation.
+
+Cacheable calls that are already in flight are not repeated either:
+:class:`SingleFlight` lets concurrent identical calls (same key) share the
+one running MCP request and its result.
+"""
+
+import asyncio
+import json
+import sqlite3
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+
+from mcp.types import CallToolResult
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """How long results of a read-only tool stay fresh."""
+
+    ttl: float
+
+
+DEFAULT_POLICIES: Dict[str, CachePolicy] = {
+    "browserbase_get_text": CachePolicy(ttl=300.0),
+    "browserbase_extract": CachePolicy(ttl=300.0),
+    "browserbase_stagehand_extract": CachePolicy(ttl=300.0),
+}
+
+# Tools that move the browser to the URL given in their arguments.
+NAVIGATION_TOOLS = {"browserbase_navigate"}
+
+# Tools that never change the page (shared with speculation.py and main.py).
+READ_ONLY_TOOLS = {
+    "browserbase_get_text",
+    "browserbase_get_html",
+    "browserbase_extract",
+    "browserbase_stagehand_extract",
+    "browserbase_screenshot",
+    "browserbase_take_screenshot",
+}
+
+CacheKey = Tuple[str, str, str, str]
+
+T = TypeVar("T")
+
+
+class ToolResultCache:
+    """LRU cache of ``CallToolResult`` objects with per-tool TTLs.
+
+    Usage::
+
+        key = cache.key_for(session, tool_name, arguments, context_id)
+        result = cache.get(key) if key else None
+        if result is None:
+            result = await session.call_tool(tool_name, arguments)
+            cache.record_call(session, tool_name, arguments, result)
+            if key:
+                cache.put(key, result)
+    """
+
+    def __init__(
+        self,
+        policies: Optional[Dict[str, CachePolicy]] = None,
+        max_bytes: int = 64 * 1024 * 1024,
+        db_path: Optional[Path] = None,
+    ):
+        self.policies = DEFAULT_POLICIES if policies is None else policies
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+
+        self._entries: "OrderedDict[CacheKey, Tuple[float, CallToolResult, int]]" = OrderedDict()
+        self._bytes = 0
+        self._urls: "weakref.WeakKeyDictionary[Any, str]" = weakref.WeakKeyDictionary()
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path is not None:
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(db_path))
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results "
+                "(key TEXT PRIMARY KEY, expires_at REAL NOT NULL, value TEXT NOT NULL)"
+            )
+            self._db.commit()
+
+    def is_cacheable(self, tool_name: str) -> bool:
+        return tool_name in self.policies
+
+    def current_url(self, session: Any) -> Optional[str]:
+        """The URL the session's browser is known to be on, if any."""
+        return self._urls.get(session)
+
+    def key_for(
+        self, session: Any, tool_name: str, arguments: Dict[str, Any], context_id: Optional[str] = None
+    ) -> Optional[CacheKey]:
+        """Cache key for this call on a session bound to ``context_id``, or ``None`` if it must not be cached."""
+        if not self.is_cacheable(tool_name):
+            return None
+        url = self.current_url(session)
+        if url is None:
+            return None
+        canonical = json.dumps(arguments or {}, sort_keys=True, separators=(",", ":"), default=str)
+        return (tool_name, canonical, url, context_id or "")
+
+    def record_call(
+        self, session: Any, tool_name: str, arguments: Dict[str, Any], result: Optional[CallToolResult] = None
+    ) -> None:
+        """Track the session's page after a tool call went to the server and returned ``result``.
+
+        A navigation that failed leaves the browser on an unknown page, so the URL is forgotten.
+        """
+        if tool_name in NAVIGATION_TOOLS:
+            if arguments.get("url") and not getattr(result, "isError", False):
+                self._urls[session] = arguments["url"]
+            else:
+                self._urls.pop(session, None)
+        elif tool_name not in READ_ONLY_TOOLS and not self.is_cacheable(tool_name):
+            self._urls.pop(session, None)
+
+    def get(self, key: CacheKey) -> Optional[CallToolResult]:
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, result, _ = entry
+            if expires_at > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return result
+            self._drop(key)
+
+        if self._db is not None:
+            row = self._db.execute(
+                "SELECT expires_at, value FROM results WHERE key = ?", (self._db_key(key),)
+            ).fetchone()
+            if row is not None and row[0] > now:
+                result = CallToolResult.model_validate_json(row[1])
+                self._remember(key, row[0], result, len(row[1]))
+                self.hits += 1
+                self.disk_hits += 1
+                return result
+
+        self.misses += 1
+        return None
+
+    def put(self, key: CacheKey, result: CallToolResult) -> None:
+        if getattr(result, "isError", False):
+            return
+        expires_at = time.time() + self.policies[key[0]].ttl
+        serialized = result.model_dump_json()
+        self._remember(key, expires_at, result, len(serialized))
+        if self._db is not None:
+            self._db.execute(
+                "INSERT OR REPLACE INTO results (key, expires_at, value) VALUES (?, ?, ?)",
+                (self._db_key(key), expires_at, serialized),
+            )
+            self._db.execute("DELETE FROM results WHERE expires_at <= ?", (time.time(),))
+            self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_hits": self.disk_hits,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "evictions": self.evictions,
+        }
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _remember(self, key: CacheKey, expires_at: float, result: CallToolResult, size: int) -> None:
+        if size > self.max_bytes:
+            return
+        self._drop(key)
+        self._entries[key] = (expires_at, result, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def _drop(self, key: CacheKey) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    @staticmethod
+    def _db_key(key: CacheKey) -> str:
+        return json.dumps(key)
+
+
+class SingleFlight:
+    """Run at most one call per key at a time; concurrent callers share it.
+
+    Usage::
+
+        result = await single_flight.do(key, lambda: session.call_tool(name, args))
+
+    If the call that is being shared fails, every waiter gets its exception.
+    If it is cancelled, the waiters are not: one of them makes the call again.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        while key in self._calls:
+            future = self._calls[key]
+            await asyncio.wait({future})
+            if not future.cancelled():
+                self.coalesced += 1
+                return future.result()
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        self.calls += 1
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters re-raise it; don't warn when there were none
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._calls)}
@@ -0,0 +1,201 @@
+"""
+Size budgeting for tool results sent back to Gemini.
+
+``browserbase_get_text`` on a large page returns hundreds of kilobytes, all of
+which would otherwise go into the next Gemini request.  ``ResultShaper``
+strips boilerplate (scripts, styles, comments, runs of whitespace), and when
+a result is still over its tool's budget it sends only the first part, cut at
+a paragraph or sentence boundary.  The full text is kept in a local side
+store, and the model can page through it with the synthetic ``get_more`` tool,
+which is answered locally without touching the MCP server.
+
+One shaper serves every conversation of the HTTP server, so stored results
+belong to the ``scope`` (conversation id) that produced them: handles are
+random, and ``get_more`` only answers for handles of its own scope.
+"""
+
+import re
+import secrets
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from mcp.types import Tool
+
+
+@dataclass(frozen=True)
+class ShapingPolicy:
+    """Budget for one tool's results."""
+
+    max_chars: int
+    strip_html: bool = False
+
+
+DEFAULT_POLICIES: Dict[str, ShapingPolicy] = {
+    "browserbase_get_text": ShapingPolicy(max_chars=12000),
+    "browserbase_get_html": ShapingPolicy(max_chars=12000, strip_html=True),
+    "browserbase_extract": ShapingPolicy(max_chars=8000),
+    "browserbase_stagehand_extract": ShapingPolicy(max_chars=8000),
+    # Shared by all pages of one fetch_pages call
+    "fetch_pages": ShapingPolicy(max_chars=24000),
+}
+
+GET_MORE_TOOL = Tool(
+    name="get_more",
+    description=(
+        "Read more of a tool result that was truncated. Pass the handle and "
+        "offset given in the truncation notice."
+    ),
+    inputSchema={
+        "type": "object",
+        "properties": {
+            "handle": {"type": "string", "description": "Handle from the truncation notice"},
+            "offset": {"type": "integer", "description": "Character offset to continue from"},
+        },
+        "required": ["handle", "offset"],
+    },
+)
+
+_BOILERPLATE_ELEMENTS = re.compile(
+    r"<(script|style|noscript|svg|template)\b[^>]*>.*?</\1\s*>", re.IGNORECASE | re.DOTALL
+)
+_HTML_COMMENTS = re.compile(r"<!--.*?-->", re.DOTALL)
+_INLINE_STYLES = re.compile(r"\s(?:style|class)=\"[^\"]*\"", re.IGNORECASE)
+_HORIZONTAL_SPACE = re.compile(r"[ \t\f\v\u00a0]+")
+_BLANK_LINES = re.compile(r"\n\s*\n+")
+
+
+def estimate_tokens(chars: int) -> int:
+    """Rough token count for ``chars`` characters of English text."""
+    return chars // 4
+
+
+def strip_boilerplate(text: str, strip_html: bool = False) -> str:
+    """Drop markup that carries no content and collapse whitespace."""
+    if strip_html:
+        text = _BOILERPLATE_ELEMENTS.sub("", text)
+        text = _HTML_COMMENTS.sub("", text)
+        text = _INLINE_STYLES.sub("", text)
+    text = _HORIZONTAL_SPACE.sub(" ", text)
+    text = "\n".join(line.strip() for line in text.splitlines())
+    text = _BLANK_LINES.sub("\n\n", text)
+    return text.strip()
+
+
+def cut_point(text: str, start: int, max_chars: int) -> int:
+    """End offset of a page of at most ``max_chars`` starting at ``start``.
+
+    Prefers a paragraph break, then a line break, then a sentence end in the
+    last fifth of the page so that pages don't stop mid-sentence.
+    """
+    end = start + max_chars
+    if end >= len(text):
+        return len(text)
+    floor = start + max_chars * 4 // 5
+    for separator in ("\n\n", "\n", ". "):
+        index = text.rfind(separator, floor, end)
+        if index != -1:
+            return index + len(separator)
+    return end
+
+
+class ResultShaper:
+    """Trim tool results to per-tool budgets, keeping the rest pageable.
+
+    Usage::
+
+        text = shaper.shape("browserbase_get_text", raw_text, scope=conversation.id)
+        ...
+        page = shaper.get_more(handle, offset, scope=conversation.id)   # for a "get_more" call
+    """
+
+    def __init__(
+        self,
+        policies: Optional[Dict[str, ShapingPolicy]] = None,
+        default_max_chars: int = 8000,
+        store_max_chars: int = 16 * 1024 * 1024,
+    ):
+        self.policies = DEFAULT_POLICIES if policies is None else policies
+        self.default_max_chars = default_max_chars
+        self.store_max_chars = store_max_chars
+        # handle -> (scope, full text, page size)
+        self._store: "OrderedDict[str, Tuple[str, str, int]]" = OrderedDict()
+        self._store_chars = 0
+
+        self.raw_chars = 0
+        self.sent_chars = 0
+        self.raw_bytes = 0
+        self.sent_bytes = 0
+        self.truncated = 0
+        self.pages_served = 0
+
+    def policy_for(self, tool_name: str) -> ShapingPolicy:
+        return self.policies.get(tool_name) or ShapingPolicy(max_chars=self.default_max_chars)
+
+    def shape(self, tool_name: str, text: str, max_chars: Optional[int] = None, scope: str = "") -> str:
+        """Return ``text`` cleaned and cut down to the tool's budget (or ``max_chars``).
+
+        The rest of a truncated result can be read with ``get_more`` in ``scope`` only.
+        """
+        policy = self.policy_for(tool_name)
+        max_chars = policy.max_chars if max_chars is None else max_chars
+        cleaned = strip_boilerplate(text, policy.strip_html)
+        if len(cleaned) <= max_chars:
+            shaped = cleaned
+        else:
+            # get_more continues at the tool's normal page size
+            handle = self._remember(scope, cleaned, max(max_chars, policy.max_chars))
+            shaped = self._page(handle, cleaned, 0, max_chars)
+            self.truncated += 1
+        self._account(text, shaped)
+        return shaped
+
+    def get_more(self, handle: str, offset: int = 0, scope: str = "") -> str:
+        """Next page of a truncated result of ``scope`` (the ``get_more`` tool)."""
+        entry = self._store.get(handle)
+        if entry is None or entry[0] != scope:
+            # Other conversations' handles look the same as expired ones
+            return f"Unknown or expired handle '{handle}'; call the original tool again."
+        self._store.move_to_end(handle)
+        _, text, max_chars = entry
+        offset = max(0, int(offset))
+        if offset >= len(text):
+            return f"No more content for handle '{handle}' ({len(text)} characters total)."
+        self.pages_served += 1
+        return self._page(handle, text, offset, max_chars)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "raw_bytes": self.raw_bytes,
+            "sent_bytes": self.sent_bytes,
+            "bytes_saved": self.raw_bytes - self.sent_bytes,
+            "tokens_saved": estimate_tokens(self.raw_chars - self.sent_chars),
+            "truncated": self.truncated,
+            "pages_served": self.pages_served,
+            "stored_results": len(self._store),
+        }
+
+    def _page(self, handle: str, text: str, offset: int, max_chars: int) -> str:
+        end = cut_point(text, offset, max_chars)
+        page = text[offset:end]
+        if end >= len(text):
+            return page + f"\n\n[End of result '{handle}': characters {offset}-{end} of {len(text)}.]"
+        return page + (
+            f"\n\n[Truncated: showing characters {offset}-{end} of {len(text)}. "
+            f"Call get_more with handle='{handle}' and offset={end} to read more.]"
+        )
+
+    def _remember(self, scope: str, text: str, max_chars: int) -> str:
+        handle = secrets.token_hex(8)
+        self._store[handle] = (scope, text, max_chars)
+        self._store_chars += len(text)
+        while self._store_chars > self.store_max_chars and len(self._store) > 1:
+            _, (_, evicted, _) = self._store.popitem(last=False)
+            self._store_chars -= len(evicted)
+        return handle
+
+    def _account(self, raw: str, shaped: str) -> None:
+        self.raw_chars += len(raw)
+        self.sent_chars += len(shaped)
+        self.raw_bytes += len(raw.encode())
+        self.sent_bytes += len(shaped.encode())
@@ -0,0 +1,105 @@
+"""
+Screenshots passed to Gemini as inline image parts.
+
+MCP returns images as base64 text.  Each one is decoded once into a
+``memoryview`` that is hashed and handed on without further copies; if Pillow
+is installed, images larger than the configured dimensions or size are
+downscaled and re-encoded as JPEG first.  Identical frames (same content hash)
+are only attached once per conversation: re-sending a screenshot of a page
+that did not change costs upload time and tokens for nothing.
+"""
+
+import base64
+import hashlib
+import io
+from dataclasses import dataclass
+from typing import Any, Dict, List, Set, Tuple
+
+
+@dataclass
+class InlineImage:
+    """Decoded image bytes ready to attach to a Gemini message."""
+
+    data: memoryview
+    mime_type: str
+    digest: str
+
+    def to_part(self) -> Dict[str, Any]:
+        # The protobuf Blob needs real bytes; this is the only copy made.
+        return {"inline_data": {"mime_type": self.mime_type, "data": self.data.tobytes()}}
+
+
+def decode_image(data: str) -> memoryview:
+    """Decode base64 image data from an MCP ``ImageContent``."""
+    return memoryview(base64.b64decode(data))
+
+
+def downscale(data: memoryview, mime_type: str, max_dim: int, max_bytes: int, quality: int = 80) -> Tuple[memoryview, str]:
+    """Shrink an image that exceeds ``max_dim`` pixels or ``max_bytes``.
+
+    Returns the input unchanged when it is already small enough, when
+    Pillow is not installed, or when Pillow cannot read it (truncated or
+    unsupported data); the screenshot was still taken, so it is sent as is.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return data, mime_type
+
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            if max(image.size) <= max_dim and data.nbytes <= max_bytes:
+                return data, mime_type
+            image.thumbnail((max_dim, max_dim))
+            output = io.BytesIO()
+            image.convert("RGB").save(output, format="JPEG", quality=quality, optimize=True)
+    except OSError:
+        # PIL.UnidentifiedImageError and truncated-image errors are OSErrors
+        return data, mime_type
+    if output.tell() >= data.nbytes:
+        return data, mime_type
+    return output.getbuffer(), "image/jpeg"
+
+
+class ImageAttachments:
+    """Images collected from tool results, waiting to go to Gemini.
+
+    Usage::
+
+        note = attachments.add(content.data, content.mimeType)   # text for the function response
+        ...
+        parts = [*function_responses, *attachments.take_parts()]
+
+    One instance should live as long as the conversation, so that frames
+    already sent are recognized in later turns.
+    """
+
+    def __init__(self, max_dim: int = 1568, max_bytes: int = 1024 * 1024):
+        self.max_dim = max_dim
+        self.max_bytes = max_bytes
+        self.sent: Set[str] = set()
+        self.pending: List[InlineImage] = []
+        self.attached = 0
+        self.deduplicated = 0
+        self.bytes_saved = 0
+
+    def add(self, data: str, mime_type: str) -> str:
+        """Queue an image for the next message and describe it for the model."""
+        raw = decode_image(data)
+        digest = hashlib.sha256(raw).hexdigest()
+        if digest in self.sent or any(image.digest == digest for image in self.pending):
+            self.deduplicated += 1
+            return f"[Image {digest[:12]}: identical to a screenshot already shown, not attached again]"
+
+        image, image_type = downscale(raw, mime_type, self.max_dim, self.max_bytes)
+        self.bytes_saved += raw.nbytes - image.nbytes
+        self.pending.append(InlineImage(image, image_type, digest))
+        return f"[Image {digest[:12]} ({image_type}) attached to this message]"
+
+    def take_parts(self) -> List[Dict[str, Any]]:
+        """Inline image parts for everything queued since the last call."""
+        parts = [image.to_part() for image in self.pending]
+        self.sent.update(image.digest for image in self.pending)
+        self.attached += len(self.pending)
+        self.pending = []
+        return parts
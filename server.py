@@ -0,0 +1,388 @@
+"""
+HTTP front end - serve MCPSurfClient to many users at once.
+
+A small HTTP/1.1 server built on ``asyncio.start_server`` (no web framework
+needed).  All requests share one client and therefore one MCP session pool;
+each conversation keeps its own history.
+
+Endpoints:
+
+- ``POST /chat``: ``{"message": "...", "conversation_id": "...", "context": "..."}``
+  -> ``{"conversation_id", "response", "error", "elapsed"}``
+- ``POST /chat/stream``: same body, answered as Server-Sent Events: one
+  event per ``ChatEvent`` (``text``, ``tool_call``, ``tool_progress``,
+  ``tool_result``, ``error``, ``done``)
+- ``DELETE /conversations/<id>``: forget a conversation
+- ``GET /healthz``: load, pool and drain status
+- ``GET /metrics``: counters and latency histograms in the Prometheus text format
+
+Omitting ``conversation_id`` starts a new conversation; its id is returned.
+``context`` (a profile name from ``BROWSERBASE_CONTEXT_IDS``) picks the
+browser context of a new conversation; raw Browserbase context ids and
+unknown names are rejected with ``400``, so clients only reach the profiles
+the operator configured.
+At most ``max_in_flight`` turns run at once and ``max_queue`` more may wait;
+beyond that requests get ``503`` with ``Retry-After`` instead of piling up
+behind a saturated pool.  A turn that fails outright gets ``500``, or an
+``error`` event if its stream has already started.  On SIGINT/SIGTERM the server stops accepting
+connections and lets running turns finish (up to ``drain_timeout``).
+"""
+
+import asyncio
+import json
+import signal
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Optional, Set, Tuple
+
+from rich.console import Console
+
+from conversation import Conversation
+
+MAX_HEADER_BYTES = 64 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class HTTPError(Exception):
+    """An error answered with a JSON body and the given status."""
+
+    def __init__(self, status: int, message: str, headers: Optional[Dict[str, str]] = None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    headers: Dict[str, str] = field(default_factory=dict)
+    body: bytes = b""
+
+    def json(self) -> Dict[str, Any]:
+        try:
+            data = json.loads(self.body or b"{}")
+        except ValueError:
+            raise HTTPError(400, "Request body must be JSON")
+        if not isinstance(data, dict):
+            raise HTTPError(400, "Request body must be a JSON object")
+        return data
+
+
+async def read_request(reader: asyncio.StreamReader) -> Optional[Request]:
+    """Parse one HTTP request; None if the client closed the connection."""
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError:
+        return None
+    except asyncio.LimitOverrunError:
+        raise HTTPError(413, "Request headers too large")
+
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, _ = lines[0].split(" ", 2)
+    except ValueError:
+        raise HTTPError(400, "Malformed request line")
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get("content-length", "0") or 0)
+    except ValueError:
+        raise HTTPError(400, "Malformed Content-Length header")
+    if length < 0:
+        raise HTTPError(400, "Malformed Content-Length header")
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(413, "Request body too large")
+    body = await reader.readexactly(length) if length else b""
+    return Request(method.upper(), target.split("?", 1)[0], headers, body)
+
+
+def encode_response(status: int, body: bytes, content_type: str = "application/json", headers: Optional[Dict[str, str]] = None) -> bytes:
+    lines = [
+        f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+        f"Content-Type: {content_type}",
+        f"Content-Length: {len(body)}",
+        "Connection: close",
+    ]
+    lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+
+def json_response(status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> bytes:
+    return encode_response(status, json.dumps(payload, ensure_ascii=False).encode(), headers=headers)
+
+
+class ChatServer:
+    """Serve chat turns over HTTP with admission control and graceful drain.
+
+    Usage::
+
+        async with MCPSurfClient() as client:
+            server = ChatServer(client, port=8080)
+            await server.serve_forever()
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        host: str = "127.0.0.1",
+        port: int = 8080,
+        max_in_flight: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        max_conversations: int = 1000,
+        drain_timeout: float = 30.0,
+        console: Optional[Console] = None,
+    ):
+        self.client = client
+        self.host = host
+        self.port = port
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.max_conversations = max_conversations
+        self.drain_timeout = drain_timeout
+        self.console = console or client.console
+
+        self.conversations: "OrderedDict[str, Conversation]" = OrderedDict()
+        self.admitted = 0
+        self.running = 0
+        self.rejected = 0
+        self.completed = 0
+        self.draining = False
+        self.started_at = time.monotonic()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._turns: Optional[asyncio.Semaphore] = None
+        self._connections: Set[asyncio.Task] = set()
+        self._stop = asyncio.Event()
+
+    async def start(self) -> None:
+        """Start the MCP pool and begin accepting connections."""
+        await self.client.start()
+        if self.max_in_flight is None:
+            self.max_in_flight = self.client.pool.max_size
+        if self.max_queue is None:
+            self.max_queue = self.max_in_flight * 2
+        self._turns = asyncio.Semaphore(self.max_in_flight)
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port, limit=MAX_HEADER_BYTES)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        """Serve until SIGINT/SIGTERM (or stop()), then drain."""
+        if self._server is None:
+            await self.start()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except (NotImplementedError, RuntimeError):
+                pass
+        self.console.print(f"[green]🌐 Serving on http://{self.host}:{self.port} "
+                           f"({self.max_in_flight} turns at once, {self.max_queue} queued)[/green]")
+        try:
+            await self._stop.wait()
+        finally:
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                try:
+                    loop.remove_signal_handler(sig)
+                except (NotImplementedError, RuntimeError):
+                    pass
+            await self.drain()
+
+    def stop(self) -> None:
+        """Ask serve_forever() to drain and return."""
+        self._stop.set()
+
+    async def drain(self) -> None:
+        """Stop accepting connections and wait for in-flight requests."""
+        self.draining = True
+        if self._server is not None:
+            self._server.close()
+        if self._connections:
+            self.console.print(f"[yellow]⏳ Draining {len(self._connections)} open request(s)...[/yellow]")
+            _, pending = await asyncio.wait(set(self._connections), timeout=self.drain_timeout)
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.wait(pending)
+        if self._server is not None:
+            await self._server.wait_closed()
+        self.console.print("[yellow]👋 Server stopped[/yellow]")
+
+    def conversation(self, conversation_id: Optional[str], context: Optional[str] = None) -> Conversation:
+        """Look up (or create) a conversation, evicting the least recently used."""
+        if conversation_id and conversation_id in self.conversations:
+            self.conversations.move_to_end(conversation_id)
+            return self.conversations[conversation_id]
+        conversation = self.client.new_conversation(conversation_id, context=context)
+        self.conversations[conversation.id] = conversation
+        while len(self.conversations) > self.max_conversations:
+            self.conversations.popitem(last=False)
+        return conversation
+
+    def health(self) -> Dict[str, Any]:
+        pool = self.client.pool
+        return {
+            "status": "draining" if self.draining else "ok",
+            "uptime_s": round(time.monotonic() - self.started_at, 1),
+            "running": self.running,
+            "queued": self.admitted - self.running,
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "rejected": self.rejected,
+            "completed": self.completed,
+            "conversations": len(self.conversations),
+            "rate_limits": {
+                "gemini": self.client.gemini_limiter.stats(),
+                "browserbase": self.client.browserbase_limiter.stats(),
+            },
+            "tool_calls": {**self.client.single_flight.stats(), "cache": self.client.tool_cache.stats()},
+            "speculation": self.client.speculator.stats() if self.client.speculator is not None else None,
+            "pool": {"size": pool.size, "available": pool.available, **pool.stats.summary()} if pool else None,
+        }
+
+    def _admit(self) -> None:
+        """Reject the request up front if the server cannot take it soon."""
+        if self.draining:
+            raise HTTPError(503, "Server is shutting down", {"Retry-After": "5"})
+        if self.admitted >= self.max_in_flight + self.max_queue:
+            self.rejected += 1
+            raise HTTPError(503, "Server is at capacity, try again shortly", {"Retry-After": "2"})
+        self.admitted += 1
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            request = await read_request(reader)
+            if request is not None:
+                await self._route(request, writer)
+        except HTTPError as e:
+            writer.write(json_response(e.status, {"error": str(e)}, e.headers))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            # Pool failures while starting a turn, or a bug: answer instead of dropping the connection
+            self.console.print(f"[red]❌ Error handling request: {e}[/red]")
+            writer.write(json_response(500, {"error": "Internal server error"}))
+        finally:
+            self._connections.discard(task)
+            try:
+                await writer.drain()
+                writer.close()
+                await writer.wait_closed()
+            except (ConnectionError, RuntimeError):
+                pass
+
+    async def _route(self, request: Request, writer: asyncio.StreamWriter) -> None:
+        if request.path == "/healthz":
+            if request.method != "GET":
+                raise HTTPError(405, "Use GET")
+            writer.write(json_response(503 if self.draining else 200, self.health()))
+        elif request.path == "/metrics":
+            if request.method != "GET":
+                raise HTTPError(405, "Use GET")
+            body = self.client.metrics.registry.render_prometheus().encode()
+            writer.write(encode_response(200, body, "text/plain; version=0.0.4; charset=utf-8"))
+        elif request.path in ("/chat", "/chat/stream"):
+            if request.method != "POST":
+                raise HTTPError(405, "Use POST")
+            message, conversation_id, context = self._chat_params(request)
+            if context is not None and context not in self.client.browser_contexts:
+                raise HTTPError(400, 'Unknown "context"; use a name from BROWSERBASE_CONTEXT_IDS')
+            self._admit()
+            try:
+                if request.path == "/chat":
+                    await self._chat(message, self.conversation(conversation_id, context), writer)
+                else:
+                    await self._chat_stream(message, self.conversation(conversation_id, context), writer)
+            finally:
+                self.admitted -= 1
+        elif request.path.startswith("/conversations/"):
+            if request.method != "DELETE":
+                raise HTTPError(405, "Use DELETE")
+            if self.conversations.pop(request.path[len("/conversations/"):], None) is None:
+                raise HTTPError(404, "Unknown conversation")
+            writer.write(json_response(200, {"deleted": True}))
+        else:
+            raise HTTPError(404, f"No route for {request.path}")
+
+    @staticmethod
+    def _chat_params(request: Request) -> Tuple[str, Optional[str], Optional[str]]:
+        data = request.json()
+        message = data.get("message")
+        if not isinstance(message, str) or not message.strip():
+            raise HTTPError(400, '"message" must be a non-empty string')
+        conversation_id = data.get("conversation_id")
+        if conversation_id is not None and not isinstance(conversation_id, str):
+            raise HTTPError(400, '"conversation_id" must be a string')
+        context = data.get("context")
+        if context is not None and not isinstance(context, str):
+            raise HTTPError(400, '"context" must be a string')
+        return message, conversation_id, context
+
+    async def _events(self, message: str, conversation: Conversation):
+        async with self._turns:
+            self.running += 1
+            try:
+                async for event in self.client.chat_stream(message, conversation):
+                    yield event
+            finally:
+                self.running -= 1
+                self.completed += 1
+
+    async def _chat(self, message: str, conversation: Conversation, writer: asyncio.StreamWriter) -> None:
+        chunks, errors, elapsed = [], [], None
+        async for event in self._events(message, conversation):
+            if event.type == "text":
+                chunks.append(event.text)
+            elif event.type == "error":
+                errors.append(event.text)
+            elif event.type == "done":
+                elapsed = event.elapsed
+        writer.write(json_response(200, {
+            "conversation_id": conversation.id,
+            "response": "".join(chunks),
+            "error": "\n".join(errors) or None,
+            "elapsed": elapsed,
+        }))
+
+    async def _chat_stream(self, message: str, conversation: Conversation, writer: asyncio.StreamWriter) -> None:
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/event-stream\r\n"
+            b"Cache-Control: no-cache\r\n"
+            b"Connection: close\r\n\r\n"
+        )
+        events = self._events(message, conversation)
+        try:
+            async for event in events:
+                payload = {key: value for key, value in asdict(event).items() if value not in (None, "")}
+                if event.type == "done":
+                    payload["conversation_id"] = conversation.id
+                writer.write(f"event: {event.type}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n".encode())
+                # Backpressure: a slow reader slows down its own turn, nothing else
+                await writer.drain()
+        except ConnectionError:
+            raise
+        except Exception as e:
+            # The headers are out already: report the failure in the stream
+            self.console.print(f"[red]❌ Error streaming chat turn: {e}[/red]")
+            payload = {"type": "error", "text": "Internal server error"}
+            writer.write(f"event: error\ndata: {json.dumps(payload)}\n\n".encode())
+        finally:
+            # A client that went away ends its turn instead of leaving it running
+            await events.aclose()
@@ -0,0 +1,136 @@
+"""
+Speculative prefetching of the tool call Gemini is likely to make next.
+
+Nearly every browse starts with ``browserbase_navigate`` followed by
+``browserbase_get_text``.  While Gemini is still reading the navigate result
+and generating its next step, :class:`Speculator` already runs the predicted
+read-only call on the same session.  If Gemini then asks for exactly that
+call, it gets the prefetched result (or joins the call still in flight);
+otherwise the prefetch is discarded, and cancelled first if the next call may
+change the page.
+
+Only read-only tools are ever predicted, so a wrong guess costs one wasted
+MCP request, never a changed page.
+"""
+
+import asyncio
+import json
+import time
+import weakref
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from result_cache import READ_ONLY_TOOLS
+
+# Follow-up calls to prefetch after each tool: (tool name, arguments)
+DEFAULT_PREDICTIONS: Dict[str, List[Tuple[str, Dict[str, Any]]]] = {
+    "browserbase_navigate": [("browserbase_get_text", {})],
+}
+
+
+def _canonical(arguments: Dict[str, Any]) -> str:
+    return json.dumps(arguments or {}, sort_keys=True, separators=(",", ":"), default=str)
+
+
+@dataclass
+class Speculation:
+    """One prefetch running (or finished) on a session."""
+
+    tool_name: str
+    arguments: str
+    task: asyncio.Task
+    started: float = field(default_factory=time.perf_counter)
+    finished: Optional[float] = None
+
+    def saved(self) -> float:
+        """Seconds of the call that were already done when it was claimed."""
+        return (self.finished or time.perf_counter()) - self.started
+
+
+class Speculator:
+    """Prefetch predicted follow-up tool calls per session.
+
+    Usage::
+
+        prefetched = speculator.claim(session, tool_name, arguments)
+        result = await prefetched if prefetched else await call(tool_name, arguments)
+        for next_tool, next_args in speculator.predict(tool_name):
+            speculator.start(session, next_tool, next_args, lambda: call(next_tool, next_args))
+    """
+
+    def __init__(
+        self,
+        predictions: Optional[Dict[str, List[Tuple[str, Dict[str, Any]]]]] = None,
+        read_only: Optional[Set[str]] = None,
+    ):
+        self.predictions = DEFAULT_PREDICTIONS if predictions is None else predictions
+        self.read_only = READ_ONLY_TOOLS if read_only is None else read_only
+        self._pending: "weakref.WeakKeyDictionary[Any, Speculation]" = weakref.WeakKeyDictionary()
+
+        self.started = 0
+        self.hits = 0
+        self.wasted = 0
+        self.cancelled = 0
+        self.time_saved = 0.0
+
+    def predict(self, tool_name: str) -> List[Tuple[str, Dict[str, Any]]]:
+        """Calls likely to follow a successful ``tool_name`` call."""
+        return self.predictions.get(tool_name, [])
+
+    def start(self, session: Any, tool_name: str, arguments: Dict[str, Any], func: Callable[[], Awaitable[Any]]) -> None:
+        """Run ``func`` in the background as the prefetch of this call on ``session``."""
+        self._discard(session, cancel=True)
+        speculation = Speculation(tool_name, _canonical(arguments), asyncio.ensure_future(func()))
+
+        def finished(task: asyncio.Task) -> None:
+            speculation.finished = time.perf_counter()
+            if not task.cancelled():
+                # Retrieve it so an unclaimed failure is not reported as "never retrieved"
+                task.exception()
+
+        speculation.task.add_done_callback(finished)
+        self._pending[session] = speculation
+        self.started += 1
+
+    def claim(self, session: Any, tool_name: str, arguments: Dict[str, Any]) -> Optional[Speculation]:
+        """The prefetch of exactly this call, if there is one.
+
+        A call to a tool that may change the page cancels the prefetch.
+        """
+        speculation = self._pending.get(session)
+        if speculation is None:
+            return None
+        if speculation.tool_name == tool_name and speculation.arguments == _canonical(arguments):
+            del self._pending[session]
+            if speculation.task.done() and (speculation.task.cancelled() or speculation.task.exception()):
+                self.wasted += 1
+                return None
+            self.hits += 1
+            self.time_saved += speculation.saved()
+            return speculation
+        if tool_name not in self.read_only:
+            self._discard(session, cancel=True)
+        return None
+
+    def cancel_all(self) -> None:
+        for session in list(self._pending):
+            self._discard(session, cancel=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "started": self.started,
+            "hits": self.hits,
+            "wasted": self.wasted,
+            "cancelled": self.cancelled,
+            "hit_rate": round(self.hits / self.started, 3) if self.started else None,
+            "time_saved_s": round(self.time_saved, 3),
+        }
+
+    def _discard(self, session: Any, cancel: bool) -> None:
+        speculation = self._pending.pop(session, None)
+        if speculation is None:
+            return
+        self.wasted += 1
+        if cancel and not speculation.task.done():
+            speculation.task.cancel()
+            self.cancelled += 1
@@ -0,0 +1,1083 @@
+#!/usr/bin/env python3
+"""
+Offline tests - run the client against the stand-in MCP server and a scripted Gemini.
+
+No API keys, Node.js or network access are needed.
+"""
+
+import asyncio
+import json
+import os
+import re
+import signal
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add parent directory to path to import main
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+os.environ["MCP_SERVER_COMMAND"] = sys.executable
+os.environ["MCP_SERVER_ARGS"] = os.path.join(ROOT, "offline", "mcp_server.py")
+os.environ["GEMINI_SCRIPT"] = os.path.join(ROOT, "offline", "scripts", "browse_example.json")
+os.environ["MCP_TOOL_CACHE"] = os.path.join(tempfile.mkdtemp(), "tool_catalog.json")
+os.environ["STANDIN_HANG_HOSTS"] = "hang.example"
+
+from mcp import StdioServerParameters
+from mcp.types import ServerNotification, ToolListChangedNotification
+
+from main import MCPSurfClient
+from mcp_session import MCPSessionManager, MCPSessionPool, resolve_package_bin, server_command
+from offline.gemini import ScriptedModel
+from rate_limit import Priority, RateLimiter, is_browserbase_rate_limit, request_priority, with_retries
+from screenshots import downscale
+from speculation import Speculator
+from tool_catalog import ToolCatalog, sanitize_schema
+
+
+class CacheSession:
+    """A session object for exercising ToolResultCache without an MCP server."""
+
+
+async def _server_pid(session) -> int:
+    """Process id of the stand-in server behind ``session``."""
+    result = await session.call_tool("browserbase_session_create", {})
+    return int(re.search(r"standin-(\d+)", result.content[0].text).group(1))
+
+
+async def _kill_server(pid: int, manager) -> None:
+    """Kill a stand-in server, as a crash would, and wait for its manager to notice."""
+    os.kill(pid, signal.SIGKILL)
+    for _ in range(500):
+        if not manager.is_alive:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"server {pid} still looks alive")
+
+
+async def _connection() -> None:
+    async with MCPSurfClient() as client:
+        connected = await client._test_mcp_connection()
+        assert connected
+        names = {tool.name for tool in client.available_tools}
+        assert {"browserbase_navigate", "browserbase_get_text", "browserbase_take_screenshot"} <= names
+
+
+async def _browsing() -> None:
+    async with MCPSurfClient() as client:
+        async def navigate_and_read(session):
+            await client.call_tool(session, "browserbase_navigate", {"url": "https://example.com"})
+            return await client.call_tool(session, "browserbase_get_text", {})
+
+        result = await client._execute_with_mcp(navigate_and_read)
+        assert "Example Domain" in result.content[0].text
+
+
+async def _scripted_chat() -> None:
+    async with MCPSurfClient() as client:
+        tools_used = []
+        reply = ""
+        async for event in client.chat_stream("What is on https://example.com?"):
+            if event.type == "tool_result":
+                tools_used.append(event.tool_name)
+            elif event.type == "text":
+                reply += event.text
+        assert tools_used == ["browserbase_navigate", "browserbase_get_text"]
+        assert "Example Domain" in reply
+
+
+async def _ordered_function_calls() -> None:
+    async with MCPSurfClient() as client:
+        handle = client._handle_function_call
+        active, reads_while_changing, most_reads = [], 0, 0
+
+        async def slow_handle(session, name, args, attachments=None):
+            nonlocal reads_while_changing, most_reads
+            read_only = name != "browserbase_navigate"
+            if read_only and "browserbase_navigate" in active:
+                reads_while_changing += 1
+            active.append(name)
+            most_reads = max(most_reads, sum(call != "browserbase_navigate" for call in active))
+            try:
+                # Slow enough that unordered calls would overlap
+                await asyncio.sleep(0.05 if read_only else 0.1)
+                return await handle(session, name, args, attachments)
+            finally:
+                active.remove(name)
+
+        client._handle_function_call = slow_handle
+        calls = [
+            SimpleNamespace(name="browserbase_navigate", args={"url": "https://example.com"}),
+            SimpleNamespace(name="browserbase_get_text", args={}),
+            SimpleNamespace(name="browserbase_get_html", args={}),
+            SimpleNamespace(name="browserbase_navigate", args={"url": "https://shop.example/products/1"}),
+            SimpleNamespace(name="browserbase_get_text", args={}),
+        ]
+        async with client.pool.acquire() as session:
+            results = [""] * len(calls)
+            async for index, result, elapsed in client._run_function_calls(session, calls):
+                if elapsed is not None:
+                    results[index] = result
+        assert "Example Domain" in results[1]
+        assert "Example Domain" in results[2]
+        assert "Trail Runner 2" in results[4]
+        assert reads_while_changing == 0
+        assert most_reads == 2
+
+
+async def _long_page_shaping() -> None:
+    async with MCPSurfClient() as client:
+        async def read_long_article(session):
+            await client.call_tool(session, "browserbase_navigate", {"url": "https://news.example/long-article"})
+            first = await client.handle_function_call(session, SimpleNamespace(name="browserbase_get_text", args={}))
+            handle, offset = re.search(r"handle='(\w+)' and offset=(\d+)", first).groups()
+            get_more = SimpleNamespace(name="get_more", args={"handle": handle, "offset": float(offset)})
+            more = await client.handle_function_call(session, get_more)
+            # Another conversation cannot read the stored result
+            other = await client.handle_function_call(session, get_more, scope="another-conversation")
+            return first, more, other
+
+        first, more, other = await client._execute_with_mcp(read_long_article)
+        budget = client.result_shaper.policy_for("browserbase_get_text").max_chars
+        assert len(first) < budget + 200
+        assert "characters" in more
+        assert other.startswith("Unknown or expired handle")
+        assert client.result_shaper.stats()["bytes_saved"] > 0
+
+
+async def _screenshot_attachment() -> None:
+    screenshot = [{"function_call": {"name": "browserbase_take_screenshot", "args": {}}}]
+    async with MCPSurfClient() as client:
+        client.model = ScriptedModel([
+            [{"function_call": {"name": "browserbase_navigate", "args": {"url": "https://example.com"}}}],
+            screenshot,
+            screenshot,
+            "The page has not changed.",
+        ])
+        chats = []
+        start_chat = client.model.start_chat
+        client.model.start_chat = lambda **kwargs: chats.append(start_chat(**kwargs)) or chats[-1]
+        await client.chat("Take two screenshots of https://example.com")
+
+        inline_images = [
+            part for content in chats[0].history for part in content.parts
+            if type(part).pb(part).WhichOneof("data") == "inline_data"
+        ]
+        # The second, identical screenshot is not sent again
+        assert len(inline_images) == 1
+        assert inline_images[0].inline_data.mime_type == "image/png"
+
+    # Data Pillow cannot read is attached unchanged instead of failing the tool call
+    garbage = memoryview(b"\x89PNG\r\n\x1a\n truncated")
+    image, mime_type = downscale(garbage, "image/png", max_dim=16, max_bytes=8)
+    assert image.tobytes() == garbage.tobytes()
+    assert mime_type == "image/png"
+
+
+async def _conversation_memory() -> None:
+    async with MCPSurfClient() as client:
+        conversation = client.new_conversation()
+        await client.chat("What is on https://example.com?", conversation)
+        first_turn = len(conversation.history)
+        await client.chat("And what was the title again?", conversation)
+        both_turns = len(conversation.history)
+
+        conversation.max_tokens = 1
+        conversation.keep_turns = 1
+        assert first_turn > 0
+        assert both_turns == 2 * first_turn
+        compacted = await conversation.compact()
+        assert compacted
+        assert "Summary of our conversation" in conversation.history[0].parts[0].text
+
+
+async def _conversation_page() -> None:
+    async with MCPSurfClient() as client:
+        conversation = client.new_conversation()
+        await client.chat("What is on https://example.com?", conversation)
+        # Meanwhile another conversation sends the pooled browser elsewhere
+        async with client.pool.acquire() as session:
+            await client.call_tool(session, "browserbase_navigate", {"url": "https://shop.example/products/1"})
+            await client._restore_page(session, client.new_conversation())
+        async with client.pool.acquire() as session:
+            await client._restore_page(session, conversation)
+            text = (await session.call_tool("browserbase_get_text", {})).content[0].text
+        assert conversation.page_url == "https://example.com"
+        assert "Example Domain" in text
+
+
+async def _http_server() -> None:
+    from server import ChatServer
+
+    async def post(port: int, path: str, body: dict) -> str:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        data = json.dumps(body).encode()
+        writer.write(f"POST {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data)
+        response = (await reader.read()).decode()
+        writer.close()
+        return response
+
+    async with MCPSurfClient() as client:
+        server = ChatServer(client, port=0)
+        await server.start()
+        try:
+            response = await post(server.port, "/chat", {"message": "What is on https://example.com?"})
+            conversation_id = json.loads(response.split("\r\n\r\n", 1)[1])["conversation_id"]
+            stream = await post(server.port, "/chat/stream", {"message": "Again", "conversation_id": conversation_id})
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            writer.write(b"POST /chat HTTP/1.1\r\nHost: localhost\r\nContent-Length: lots\r\n\r\n")
+            malformed = (await reader.read()).decode()
+            writer.close()
+
+            # Clients pick a configured profile by name, never an arbitrary context id
+            client.browser_contexts = {"work": "ctx_work"}
+            unknown = await post(server.port, "/chat", {"message": "Hi", "context": "ctx_someone_else"})
+            named = await post(server.port, "/chat", {"message": "Hi", "context": "work"})
+            named_id = json.loads(named.split("\r\n\r\n", 1)[1])["conversation_id"]
+        finally:
+            await server.drain()
+        assert response.startswith("HTTP/1.1 200")
+        assert "event: tool_result" in stream
+        assert f'"conversation_id": "{conversation_id}"' in stream
+        assert len(server.conversations[conversation_id].history) > 0
+        assert malformed.startswith("HTTP/1.1 400")
+        assert unknown.startswith("HTTP/1.1 400")
+        assert named.startswith("HTTP/1.1 200")
+        assert server.conversations[named_id].context_id == "ctx_work"
+
+
+async def _http_server_failures() -> None:
+    from rich.console import Console
+
+    from main import ChatEvent
+    from server import ChatServer
+
+    async def post(port: int, path: str, body: dict) -> str:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        data = json.dumps(body).encode()
+        writer.write(f"POST {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data)
+        response = (await reader.read()).decode()
+        writer.close()
+        return response
+
+    async def broken_turn(message, conversation=None):
+        raise RuntimeError("MCP session pool is closed")
+        yield
+
+    ended = asyncio.Event()
+
+    async def endless_turn(message, conversation=None):
+        try:
+            while True:
+                yield ChatEvent("text", text="x" * 65536)
+                await asyncio.sleep(0.01)
+        finally:
+            ended.set()
+
+    async with MCPSurfClient() as client:
+        server = ChatServer(client, port=0, console=Console(quiet=True))
+        await server.start()
+        try:
+            # A failing turn gets a 500, or an error event once the stream has started
+            client.chat_stream = broken_turn
+            failed = await post(server.port, "/chat", {"message": "Hello"})
+            failed_stream = await post(server.port, "/chat/stream", {"message": "Hello"})
+
+            # A client that disconnects mid-stream ends its turn
+            client.chat_stream = endless_turn
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            data = json.dumps({"message": "Hello"}).encode()
+            writer.write(f"POST /chat/stream HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data)
+            await reader.readuntil(b"event: text")
+            writer.close()
+            await asyncio.wait_for(ended.wait(), 5)
+        finally:
+            await server.drain()
+        assert failed.startswith("HTTP/1.1 500 Internal Server Error")
+        assert failed_stream.startswith("HTTP/1.1 200")
+        assert "event: error" in failed_stream
+        assert failed_stream.count("HTTP/1.1") == 1
+        assert server.running == 0
+
+
+async def _coalesced_calls() -> None:
+    async with MCPSurfClient() as client:
+        async with client.pool.acquire() as first, client.pool.acquire() as second:
+            for session in (first, second):
+                await client.call_tool(session, "browserbase_navigate", {"url": "https://example.com"})
+            results = await asyncio.gather(
+                client.call_tool(first, "browserbase_get_text", {}),
+                client.call_tool(second, "browserbase_get_text", {}),
+            )
+        stats = client.single_flight.stats()
+        assert results[0] is results[1]
+        assert stats == {"calls": 1, "coalesced": 1, "in_flight": 0}
+
+
+async def _rate_limiting() -> None:
+    # 600 requests per minute, starting empty: one request every 0.1s
+    limiter = RateLimiter("test", rpm=600)
+    limiter.requests.level = 0
+    order = []
+
+    async def call(name: str, priority: int) -> None:
+        with request_priority(priority):
+            await limiter.acquire()
+        order.append(name)
+
+    batch = [asyncio.create_task(call(f"batch{i}", Priority.BATCH)) for i in range(3)]
+    await asyncio.sleep(0.01)
+    await call("interactive", Priority.INTERACTIVE)
+    await asyncio.gather(*batch)
+
+    attempts = []
+
+    async def flaky() -> str:
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("429 Too Many Requests. Please retry in 50ms")
+        return "ok"
+
+    result = await with_retries(flaky, limiter=limiter)
+    assert order[0] == "interactive"
+    assert result == "ok"
+    assert len(attempts) == 2
+    assert limiter.throttled == 1
+
+    # Only Browserbase's own 429/503 is a rate limit, never a target site's error or page text
+    assert is_browserbase_rate_limit('429 {"statusCode":429,"error":"Too Many Requests"}')
+    assert is_browserbase_rate_limit("Failed to create Browserbase session: 503 Service Unavailable")
+    assert not is_browserbase_rate_limit("Failed to navigate: 503 Service Unavailable")
+    assert not is_browserbase_rate_limit("Error: the page says you exceeded your quota (429)")
+
+
+async def _reconnect() -> None:
+    command, args = server_command()
+    async with MCPSessionManager(StdioServerParameters(command=command, args=args)) as manager:
+        pid = await manager.run(_server_pid)
+        await _kill_server(pid, manager)
+        # The next call starts a new server instead of failing
+        result = await manager.run(lambda session: session.call_tool("browserbase_navigate", {"url": "https://example.com"}))
+        new_pid = await manager.run(_server_pid)
+        assert not result.isError
+        assert new_pid != pid
+        assert manager.reconnects == 1
+
+
+async def _session_pool() -> None:
+    command, args = server_command()
+    params = StdioServerParameters(command=command, args=args)
+    try:
+        MCPSessionPool(params, min_size=3, max_size=2)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("min_size above max_size was accepted")
+
+    async with MCPSessionPool(params, min_size=1, max_size=2, health_check_interval=3600) as pool:
+        stats = pool.stats
+        # start() spawns min_size servers
+        assert pool.size == 1
+        assert pool.available == 1
+
+        # Up to max_size servers are spawned; the next caller queues for a checkin
+        release = asyncio.Event()
+
+        async def hold():
+            async with pool.acquire():
+                await release.wait()
+
+        holders = [asyncio.create_task(hold()) for _ in range(2)]
+        while len(pool._in_use) < 2:
+            await asyncio.sleep(0.01)
+        queued = asyncio.create_task(pool.run(lambda session: session.call_tool("browserbase_get_html", {})))
+        await asyncio.sleep(0.2)
+        assert not queued.done()
+        assert pool.size == 2
+        release.set()
+        await asyncio.gather(*holders)
+        await queued
+        assert stats.spawned == 2
+        assert stats.checkouts == 3
+        assert stats.queued_checkouts == 1
+        assert stats.queue_wait.count == 3
+        assert stats.summary()["queue_wait"]["max_ms"] >= 200
+        assert stats.checkout_latency.count == 3
+
+        # Sessions idle past idle_timeout are evicted down to min_size
+        pool.idle_timeout = 0
+        await asyncio.sleep(0.01)
+        await pool._reap()
+        pool.idle_timeout = 300
+        assert pool.size == 1
+        assert stats.evicted == 1
+
+        # An idle session whose server died is restarted when checked out
+        entry = pool._idle[-1]
+        async with pool.acquire() as session:
+            pid = await _server_pid(session)
+        await _kill_server(pid, entry.manager)
+        async with pool.acquire() as session:
+            new_pid = await _server_pid(session)
+        assert new_pid != pid
+        assert stats.health_check_failures == 1
+        assert stats.reconnects == 1
+        assert pool.size == 1
+
+        # A restart that fails shuts the server down and frees its slot
+        await _kill_server(new_pid, entry.manager)
+        entry.manager.server_params = StdioServerParameters(command=sys.executable, args=["-c", "pass"])
+        try:
+            async with pool.acquire():
+                pass
+        except Exception:
+            pass
+        else:
+            raise AssertionError("checkout of a server that cannot restart succeeded")
+        assert entry.manager._task is None
+        assert pool.size == 0
+        async with pool.acquire() as session:
+            pid = await _server_pid(session)
+        assert pool.size == 1
+
+
+async def _tool_catalog() -> None:
+    cache_path = Path(tempfile.mkdtemp()) / "tool_catalog.json"
+    command, args = server_command()
+    async with MCPSessionManager(StdioServerParameters(command=command, args=args)) as manager:
+        session = await manager.start()
+        version = manager.server_info.version
+
+        first = ToolCatalog("standin", cache_path)
+        tools = await first.ensure(session, version)
+        assert first.refreshes == 1
+        assert cache_path.exists()
+
+        # The next start loads the catalog from disk instead of listing tools
+        second = ToolCatalog("standin", cache_path)
+        cached = await second.ensure(session, version)
+        assert second.refreshes == 0
+        assert second.cache_hits == 1
+        assert [tool.name for tool in cached] == [tool.name for tool in tools]
+        assert second.gemini_tools
+
+        # A new server version is listed again
+        await second.ensure(session, "99.0.0")
+        assert second.refreshes == 1
+        assert second.server_version == "99.0.0"
+
+        # A cache entry that no longer matches its schema hash is ignored
+        cache = json.loads(cache_path.read_text())
+        cache[f"standin@{version}"]["tools"][0]["description"] = "edited by hand"
+        cache_path.write_text(json.dumps(cache))
+        third = ToolCatalog("standin", cache_path)
+        await third.ensure(session, version)
+        assert third.cache_hits == 0
+        assert third.refreshes == 1
+
+        # tools/list_changed forces a re-list even though the disk cache is current
+        await third.ensure(session, version)
+        assert third.refreshes == 1
+        await third.handle_message(ServerNotification(ToolListChangedNotification(method="notifications/tools/list_changed")))
+        assert third.stale
+        await third.ensure(session, version)
+        assert third.refreshes == 2
+        assert third.cache_hits == 0
+
+    # Schemas are reduced to what Gemini accepts
+    schema = {
+        "$schema": "http://json-schema.org/draft-07/schema#",
+        "type": "object",
+        "additionalProperties": False,
+        "properties": {
+            "url": {"type": "string", "description": "Page to open", "default": "about:blank"},
+            "count": {"anyOf": [{"type": "integer"}, {"type": "null"}]},
+            "mode": {"type": ["string", "null"], "enum": ["fast", "full"]},
+            "tags": {"type": "array"},
+            "options": {"type": "object", "properties": {}},
+        },
+        "required": ["url", "options"],
+    }
+    assert sanitize_schema(schema) == {
+        "type_": "OBJECT",
+        "properties": {
+            "url": {"type_": "STRING", "description": "Page to open"},
+            "count": {"type_": "INTEGER", "nullable": True},
+            "mode": {"type_": "STRING", "nullable": True, "enum": ["fast", "full"], "format_": "enum"},
+            "tags": {"type_": "ARRAY", "items": {"type_": "STRING"}},
+        },
+        "required": ["url"],
+    }
+    assert sanitize_schema({"type": "object", "properties": {}}) is None
+
+
+async def _context_affinity() -> None:
+    async with MCPSurfClient() as client:
+        client.browser_contexts = {"work": "ctx_work"}
+        conversation = client.new_conversation(context="work")
+
+        async def session_context(context_id):
+            async with client.pool.acquire(context_id) as session:
+                result = await session.call_tool("browserbase_session_create", {})
+                return result.content[0].text
+
+        first = await session_context(conversation.context_id)
+        again = await session_context(conversation.context_id)
+        default = await session_context(None)
+        stats = client.pool.stats
+        assert first.endswith("in context ctx_work")
+        assert again == first
+        assert "in context" not in default
+        assert stats.affinity_hits == 1
+        assert stats.affinity_misses == 1
+
+
+async def _result_cache() -> None:
+    from mcp.types import CallToolResult, TextContent
+
+    from result_cache import CachePolicy, ToolResultCache
+
+    def page(text: str) -> CallToolResult:
+        return CallToolResult(content=[TextContent(type="text", text=text)])
+
+    def key_on(cache: ToolResultCache, url: str):
+        session = CacheSession()
+        cache.record_call(session, "browserbase_navigate", {"url": url})
+        return session, cache.key_for(session, "browserbase_get_text", {})
+
+    # Entries expire after their tool's TTL
+    cache = ToolResultCache(policies={"browserbase_get_text": CachePolicy(ttl=0.05)})
+    _, key = key_on(cache, "https://example.com")
+    cache.put(key, page("Example Domain"))
+    assert cache.get(key) is not None
+    await asyncio.sleep(0.1)
+    assert cache.get(key) is None
+
+    # The least recently used entries go once the byte budget is exceeded
+    size = len(page("x" * 1000).model_dump_json())
+    cache = ToolResultCache(max_bytes=int(size * 2.5))
+    keys = [key_on(cache, f"https://example.com/{n}")[1] for n in range(3)]
+    cache.put(keys[0], page("x" * 1000))
+    cache.put(keys[1], page("x" * 1000))
+    cache.get(keys[0])
+    cache.put(keys[2], page("x" * 1000))
+    assert [cache.get(key) is not None for key in keys] == [True, False, True]
+    assert cache.stats()["evictions"] == 1
+
+    # The SQLite tier survives the process
+    db_path = Path(tempfile.mkdtemp()) / "results.db"
+    cache = ToolResultCache(db_path=db_path)
+    _, key = key_on(cache, "https://example.com")
+    cache.put(key, page("Example Domain"))
+    cache.close()
+    cache = ToolResultCache(db_path=db_path)
+    _, key = key_on(cache, "https://example.com")
+    from_disk = cache.get(key)
+    assert from_disk is not None
+    assert from_disk.content[0].text == "Example Domain"
+    assert cache.stats()["disk_hits"] == 1
+    cache.close()
+
+    # Clicks and typing are never cached and forget the page; screenshots and get_html keep it
+    cache = ToolResultCache()
+    session, _ = key_on(cache, "https://example.com")
+    assert cache.key_for(session, "browserbase_click", {"selector": "a"}) is None
+    for tool in ("browserbase_take_screenshot", "browserbase_get_html"):
+        cache.record_call(session, tool, {})
+    assert cache.key_for(session, "browserbase_get_text", {}) is not None
+    assert cache.key_for(session, "browserbase_type", {"selector": "input", "text": "shoes"}) is None
+    cache.record_call(session, "browserbase_type", {"selector": "input", "text": "shoes"})
+    assert cache.key_for(session, "browserbase_get_text", {}) is None
+
+    # A navigation that failed does not move the cache to its URL
+    session, _ = key_on(cache, "https://example.com")
+    failed = CallToolResult(content=[TextContent(type="text", text="net::ERR_NAME_NOT_RESOLVED")], isError=True)
+    cache.record_call(session, "browserbase_navigate", {"url": "https://down.example"}, failed)
+    assert cache.current_url(session) is None
+    assert cache.key_for(session, "browserbase_get_text", {}) is None
+
+
+async def _context_cache_isolation() -> None:
+    db_path = Path(tempfile.mkdtemp()) / "results.db"
+    os.environ["MCP_RESULT_CACHE_DB"] = str(db_path)
+    try:
+        async with MCPSurfClient() as client:
+            client.browser_contexts = {"work": "ctx_work", "personal": "ctx_personal"}
+
+            async def read(context_id):
+                async with client.pool.acquire(context_id) as session:
+                    await client.call_tool(session, "browserbase_navigate", {"url": "https://example.com"})
+                    return await client.call_tool(session, "browserbase_get_text", {})
+
+            await read("ctx_work")
+            await read("ctx_personal")
+            await read(None)
+            first_reads = client.tool_cache.stats()
+            await read("ctx_work")
+            stats = client.tool_cache.stats()
+    finally:
+        del os.environ["MCP_RESULT_CACHE_DB"]
+
+    # The persistent tier keeps the contexts apart across runs too
+    from result_cache import ToolResultCache
+    disk = ToolResultCache(db_path=db_path)
+    session = CacheSession()
+    disk.record_call(session, "browserbase_navigate", {"url": "https://example.com"})
+    work = disk.get(disk.key_for(session, "browserbase_get_text", {}, "ctx_work"))
+    guest = disk.get(disk.key_for(session, "browserbase_get_text", {}, "ctx_guest"))
+    disk.close()
+    assert first_reads["hits"] == 0
+    assert first_reads["misses"] == 3
+    assert stats["hits"] == 1
+    assert work is not None
+    assert guest is None
+
+
+async def _fetch_pages() -> None:
+    urls = [f"https://shop.example/products/{i}" for i in (1, 2, 3)]
+    async with MCPSurfClient() as client:
+        progress = []
+        async with client.pool.acquire() as session:
+            await client.call_tool(session, "browserbase_navigate", {"url": "https://example.com"})
+            result = await client.handle_function_call(
+                session, SimpleNamespace(name="fetch_pages", args={"urls": urls}), progress=progress.append
+            )
+            # The conversation's browser is back on its own page afterwards
+            page_after = (await session.call_tool("browserbase_get_text", {})).content[0].text
+            assert "Example Domain" in page_after
+            assert client._session_pages[session] == "https://example.com"
+        budget = client.result_shaper.policy_for("fetch_pages").max_chars
+
+    # Extra sessions that are slow to start don't hold up pages already fetched
+    async with MCPSurfClient() as client:
+        os.environ["STANDIN_STARTUP_MS"] = "3000"
+        try:
+            async with client.pool.acquire() as session:
+                started = time.perf_counter()
+                quick = await client.fetch_pages(session, ["https://example.com", urls[0]])
+                quick_in = time.perf_counter() - started
+        finally:
+            del os.environ["STANDIN_STARTUP_MS"]
+        assert client.pool.size == 2
+    for i, url in enumerate(urls, 1):
+        assert f"## Page {i} of 3: {url}" in result
+    assert "Price:" in result
+    assert len(result) < budget
+    assert len(progress) == 3
+    assert "## Page 2 of 2" in quick
+    assert quick_in < 2
+
+
+async def _speculative_prefetch() -> None:
+    async with MCPSurfClient() as client:
+        client.speculator = Speculator()
+        reply = ""
+        async for event in client.chat_stream("What is on https://example.com?"):
+            if event.type == "text":
+                reply += event.text
+        served = client.speculator.stats()
+
+        # A click may change the page: the pending prefetch is dropped
+        async def navigate_and_click(session):
+            await client.call_tool(session, "browserbase_navigate", {"url": "https://shop.example/products/1"})
+            await client.call_tool(session, "browserbase_click", {"selector": "a"})
+
+        await client._execute_with_mcp(navigate_and_click)
+        stats = client.speculator.stats()
+        assert "Example Domain" in reply
+        assert served["hits"] == 1
+        assert client.single_flight.stats()["calls"] >= 1
+        assert stats["started"] == 2
+        assert stats["wasted"] == 1
+
+
+async def _warm_startup() -> None:
+    client = MCPSurfClient(setup_gemini=False)
+    try:
+        startup = asyncio.create_task(client.start())
+        await asyncio.to_thread(client.setup_gemini)
+        await startup
+        connected = await client._test_mcp_connection()
+        assert connected
+        reply = await client.chat("What is on https://example.com?", client.conversation)
+        assert "Example Domain" in reply
+        # The connection test and the chat turn ran on the server spawned at startup
+        assert client.pool.stats.spawned == 1
+    finally:
+        await client.aclose()
+
+    # MCP_SERVER_USE_NODE finds the package's bin script the way npx would
+    package = os.path.join(tempfile.mkdtemp(), "node_modules", "@browserbasehq", "mcp")
+    os.makedirs(package)
+    with open(os.path.join(package, "package.json"), "w") as f:
+        json.dump({"bin": {"mcp-server-browserbase": "cli.js"}}, f)
+    open(os.path.join(package, "cli.js"), "w").close()
+    entry = resolve_package_bin("@browserbasehq/mcp", Path(package).parents[2] / "project")
+    assert entry == Path(package) / "cli.js"
+
+
+async def _cli_startup() -> None:
+    # `status` only reads env vars: it must not pay for importing google-generativeai or mcp
+    budget_ms = float(os.getenv("CLI_STARTUP_BUDGET_MS", "400"))
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "-X", "importtime", os.path.join(ROOT, "cli.py"), "status",
+        cwd=tempfile.mkdtemp(),
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    _, stderr = await process.communicate()
+    imported, total_us = set(), 0
+    for line in stderr.decode().splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+\d+ \|\s*(\S+)", line)
+        if match:
+            total_us += int(match.group(1))
+            imported.add(match.group(2).split(".")[0])
+    assert process.returncode == 0
+    assert not imported & {"google", "mcp"}
+    assert total_us / 1000 <= budget_ms
+
+    # `chat` imports google-generativeai in a thread while the MCP server starts, not with main
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "-X", "importtime", "-c", "import main",
+        cwd=ROOT,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    _, stderr = await process.communicate()
+    assert process.returncode == 0
+    assert " google.generativeai\n" not in stderr.decode()
+
+    # main.py as a script is the cli.py command line and parses arguments before its heavy imports
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "-X", "importtime", os.path.join(ROOT, "main.py"), "--help",
+        cwd=tempfile.mkdtemp(),
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    stdout, stderr = await process.communicate()
+    assert process.returncode == 0
+    assert "serve" in stdout.decode() and "status" in stdout.decode()
+    assert " mcp\n" not in stderr.decode()
+    assert " rich\n" not in stderr.decode()
+
+
+async def _benchmarks() -> None:
+    output = os.path.join(tempfile.mkdtemp(), "suite.json")
+    # The offline benchmarks must keep running against the current client
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, os.path.join(ROOT, "benchmarks", "gemini_concurrency.py"),
+        "--levels", "1", "2", "--turns-per-worker", "1", "--latency", "0.01",
+        cwd=ROOT,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    stdout, stderr = await process.communicate()
+    assert process.returncode == 0, stderr.decode()[-2000:]
+    assert "Concurrency" in stdout.decode()
+
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, os.path.join(ROOT, "benchmarks", "suite.py"),
+        "--scenarios", "server_per_call", "tool_call", "-n", "2", "--tool-latency-ms", "0", "--output", output,
+        cwd=ROOT,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    stdout, stderr = await process.communicate()
+    assert process.returncode == 0, stderr.decode()[-2000:]
+    scenarios = json.loads(Path(output).read_text())["scenarios"]
+    scenario = scenarios["tool_call"]
+    # Starting a server for every call is measured, and slower than a warm session
+    assert scenarios["server_per_call"]["p50_ms"] > scenario["p50_ms"]
+    # One stand-in server is far smaller than the client with Gemini and MCP
+    # loaded; it would match the client if it were measured with ru_maxrss
+    assert 0 < scenario["server_peak_rss_mb"] < 0.75 * scenario["client_peak_rss_mb"]
+
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, os.path.join(ROOT, "benchmarks", "metrics_overhead.py"), "--iterations", "400", "--rounds", "4",
+        cwd=ROOT,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    stdout, stderr = await process.communicate()
+    assert process.returncode == 0, stderr.decode()[-2000:]
+    assert "recording / call_tool" in stdout.decode()
+
+
+async def _metrics() -> None:
+    from server import ChatServer
+
+    async with MCPSurfClient() as client:
+        server = ChatServer(client, port=0)
+        await server.start()
+        try:
+            await client.chat("What is on https://example.com?", client.conversation)
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            writer.write(b"GET /metrics HTTP/1.1\r\nHost: localhost\r\n\r\n")
+            response = (await reader.read()).decode()
+            writer.close()
+        finally:
+            await server.drain()
+        metrics = client.metrics
+        assert response.startswith("HTTP/1.1 200")
+        assert "text/plain; version=0.0.4" in response
+        assert 'mcp_surf_tool_calls_total{tool="browserbase_navigate",result="ok"} 1' in response
+        assert 'mcp_surf_chat_turn_seconds_bucket{le="+Inf"} 1' in response
+        assert "mcp_surf_pool_spawned_total 1" in response
+        assert metrics.chat_turns.value("ok") == 1
+        assert metrics.tool_call_seconds.count("browserbase_get_text") == 1
+        assert metrics.gemini_request_seconds.count() >= 2
+        assert metrics.gemini_tokens.value("prompt") > 0
+
+
+async def _deadlines() -> None:
+    hang = [{"function_call": {"name": "browserbase_navigate", "args": {"url": "https://hang.example"}}}]
+    async with MCPSurfClient() as client:
+        # A hung page load times out and Gemini carries on with another page on the same session
+        client.tool_timeouts["browserbase_navigate"] = 0.5
+        client.model = ScriptedModel([
+            hang,
+            [{"function_call": {"name": "browserbase_navigate", "args": {"url": "https://example.com"}}}],
+            [{"function_call": {"name": "browserbase_get_text", "args": {}}}],
+            "The first page hung; https://example.com is the Example Domain page.",
+        ])
+        started = time.perf_counter()
+        recovered = await client.chat("Open https://hang.example, or else https://example.com")
+        recovered_in = time.perf_counter() - started
+
+        # With a longer tool limit, the turn budget ends the turn
+        client.tool_timeouts["browserbase_navigate"] = 30
+        client.turn_timeout = 0.5
+        client.model = ScriptedModel([hang, "Unreachable"])
+        started = time.perf_counter()
+        timed_out = await client.chat("Open https://hang.example")
+        timed_out_in = time.perf_counter() - started
+
+        # Cancelling a turn (Ctrl-C in the REPL) aborts its in-flight call
+        client.turn_timeout = None
+        turn = asyncio.create_task(client.chat("Open https://hang.example"))
+        await asyncio.sleep(0.3)
+        turn.cancel()
+        await asyncio.gather(turn, return_exceptions=True)
+
+        client.model = ScriptedModel.from_file(os.environ["GEMINI_SCRIPT"])
+        after = await client.chat("What is on https://example.com?")
+        metrics = client.metrics
+        assert "Example Domain" in recovered
+        assert recovered_in < 5
+        assert "ran out of time" in timed_out
+        assert timed_out_in < 5
+        assert turn.cancelled()
+        assert "Example Domain" in after
+        assert metrics.tool_calls.value("browserbase_navigate", "timeout") == 2
+        assert metrics.tool_calls.value("browserbase_navigate", "cancelled") == 1
+        assert metrics.chat_turns.value("timeout") == 1
+        assert metrics.chat_turns.value("cancelled") == 1
+        assert client.pool.stats.spawned == 1
+        assert client.pool.stats.reconnects == 0
+
+
+async def _batch_run() -> None:
+    from rich.console import Console
+
+    from batch import run_batch
+
+    folder = Path(tempfile.mkdtemp())
+    input_path, output_path = folder / "in.jsonl", folder / "out.jsonl"
+    input_path.write_text("\n".join([
+        json.dumps({"id": "fresh", "prompt": "What is on https://example.com?"}),
+        "not json",
+        json.dumps({"id": "no-prompt"}),
+        json.dumps({"id": "done", "prompt": "Already answered"}),
+    ]) + "\n")
+    output_path.write_text(json.dumps({"id": "done", "status": "ok", "response": "Earlier run"}) + "\n")
+    quiet = Console(quiet=True)
+
+    def records() -> dict:
+        return {record["id"]: record for record in map(json.loads, output_path.read_text().splitlines())}
+
+    async with MCPSurfClient() as client:
+        first = await run_batch(client, input_path, output_path, concurrency=2, timeout=60, console=quiet)
+        after_first = records()
+        # Resuming skips everything answered so far
+        resumed = await run_batch(client, input_path, output_path, concurrency=2, timeout=60, console=quiet)
+
+        client.model = ScriptedModel(["Too late"], latency=2.0)
+        slow_path = folder / "slow.jsonl"
+        slow_path.write_text(json.dumps({"id": "slow", "prompt": "Take your time"}) + "\n")
+        timed_out = await run_batch(client, slow_path, output_path, timeout=0.2, console=quiet)
+
+        # An aborted run stops its items before closing the output file, leaving them to a resume
+        aborted_path = folder / "aborted.jsonl"
+        aborted_path.write_text(json.dumps({"id": "aborted", "prompt": "Take your time"}) + "\n")
+        run = asyncio.create_task(run_batch(client, aborted_path, output_path, console=quiet))
+        await asyncio.sleep(0.2)
+        run.cancel()
+        await asyncio.gather(run, return_exceptions=True)
+        lines = output_path.read_text().splitlines()
+
+    final = records()
+    assert (first.succeeded, first.failed, first.skipped) == (1, 2, 1)
+    assert after_first["fresh"]["status"] == "ok"
+    assert "Example Domain" in after_first["fresh"]["response"]
+    assert after_first["2"]["status"] == "error"
+    assert after_first["no-prompt"]["status"] == "error"
+    assert (resumed.succeeded, resumed.skipped) == (0, 2)
+    assert timed_out.timed_out == 1
+    assert final["slow"]["status"] == "timeout"
+    assert run.cancelled()
+    assert "aborted" not in final
+    for line in lines:
+        json.loads(line)
+
+
+def test_standin_connection():
+    """The stand-in server starts and lists the browsing tools."""
+    asyncio.run(_connection())
+
+
+def test_standin_browsing():
+    """Navigation and text extraction work against the HTML fixtures."""
+    asyncio.run(_browsing())
+
+
+def test_scripted_chat():
+    """A scripted Gemini drives the tool loop end to end."""
+    asyncio.run(_scripted_chat())
+
+
+def test_ordered_function_calls():
+    """Calls that change the page run in order; the reads between them run concurrently."""
+    asyncio.run(_ordered_function_calls())
+
+
+def test_long_page_shaping():
+    """Large page text is truncated for Gemini and can be paged with get_more."""
+    asyncio.run(_long_page_shaping())
+
+
+def test_screenshot_attachment():
+    """Screenshots reach Gemini as inline images, once per distinct frame."""
+    asyncio.run(_screenshot_attachment())
+
+
+def test_conversation_memory():
+    """Turns of one conversation share history, which compacts when over budget."""
+    asyncio.run(_conversation_memory())
+
+
+def test_conversation_page():
+    """A follow-up turn on another conversation's browser first returns to its own page."""
+    asyncio.run(_conversation_page())
+
+
+def test_http_server():
+    """The HTTP front end answers /chat and streams /chat/stream as SSE, accepting only configured contexts."""
+    asyncio.run(_http_server())
+
+
+def test_http_server_failures():
+    """Failing turns get a 500 (or an SSE error event), and a disconnected stream ends its turn."""
+    asyncio.run(_http_server_failures())
+
+
+def test_coalesced_calls():
+    """Concurrent identical read-only calls share one MCP request."""
+    asyncio.run(_coalesced_calls())
+
+
+def test_rate_limiting():
+    """Interactive calls jump the rate limit queue, 429s are retried, and only Browserbase's own 429/503 pauses MCP calls."""
+    asyncio.run(_rate_limiting())
+
+
+def test_reconnect():
+    """A session whose MCP server died reconnects on the next call."""
+    asyncio.run(_reconnect())
+
+
+def test_session_pool():
+    """The session pool keeps min_size..max_size servers, queues callers, evicts idle servers and restarts dead ones."""
+    asyncio.run(_session_pool())
+
+
+def test_tool_catalog():
+    """The tool catalog is cached on disk per server version, re-listed on tools/list_changed, and sanitized for Gemini."""
+    asyncio.run(_tool_catalog())
+
+
+def test_context_affinity():
+    """Conversations get sessions bound to their Browserbase context, reused when idle."""
+    asyncio.run(_context_affinity())
+
+
+def test_result_cache():
+    """Cached results expire, are evicted least recently used first and persist in SQLite; clicks and failed navigations are never cached."""
+    asyncio.run(_result_cache())
+
+
+def test_context_cache_isolation():
+    """Cached page reads are never shared between Browserbase contexts."""
+    asyncio.run(_context_cache_isolation())
+
+
+def test_fetch_pages():
+    """fetch_pages reads several pages concurrently into one merged result and leaves the browser where it was."""
+    asyncio.run(_fetch_pages())
+
+
+def test_speculative_prefetch():
+    """get_text is prefetched after navigate and served from the prefetch."""
+    asyncio.run(_speculative_prefetch())
+
+
+def test_warm_startup():
+    """The server spawned at startup serves the connection test and the chat loop."""
+    asyncio.run(_warm_startup())
+
+
+def test_cli_startup():
+    """`cli.py status` stays within its import time budget (CLI_STARTUP_BUDGET_MS), and `import main` skips google-generativeai."""
+    asyncio.run(_cli_startup())
+
+
+def test_benchmarks():
+    """The offline benchmarks run to completion."""
+    asyncio.run(_benchmarks())
+
+
+def test_batch_run():
+    """Batch runs record bad lines, time out slow items, resume, and stop cleanly when aborted."""
+    asyncio.run(_batch_run())
+
+
+def test_metrics():
+    """Tool calls and chat turns are counted and served at GET /metrics."""
+    asyncio.run(_metrics())
+
+
+def test_deadlines():
+    """Hung tool calls time out or are cancelled without losing the MCP session."""
+    asyncio.run(_deadlines())
+
+
+if __name__ == "__main__":
+    failures = 0
+    for test in (test_standin_connection, test_standin_browsing, test_scripted_chat, test_ordered_function_calls, test_long_page_shaping,
+                 test_screenshot_attachment, test_conversation_memory, test_conversation_page,
+                 test_http_server, test_http_server_failures, test_coalesced_calls, test_rate_limiting, test_reconnect, test_session_pool, test_tool_catalog, test_context_affinity,
+                 test_result_cache, test_context_cache_isolation,
+                 test_fetch_pages, test_speculative_prefetch, test_warm_startup,
+                 test_cli_startup, test_benchmarks, test_batch_run, test_metrics, test_deadlines):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e or 'assertion failed'}")
+    if failures:
+        print(f"\n❌ {failures} offline test(s) failed")
+        sys.exit(1)
+    print("\n🎉 All offline tests passed!")
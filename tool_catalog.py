@@ -0,0 +1,234 @@
+"""
+Cached MCP tool catalog and precompiled Gemini function declarations.
+
+Tool discovery (``tools/list``) only has to happen when the server changes:
+the catalog is persisted to disk keyed by the server package and version, and
+its integrity is checked with a hash of every tool's input schema.  Gemini
+``Tool`` objects are built once per catalog version, with each JSON schema
+reduced to the subset Gemini accepts.  A ``notifications/tools/list_changed``
+from the server marks the catalog stale so the next turn re-lists the tools.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from mcp import ClientSession
+from mcp.types import ServerNotification, Tool, ToolListChangedNotification
+
+from tracing import tracer
+
+# JSON Schema -> Gemini Schema type names
+_GEMINI_TYPES = {
+    "string": "STRING",
+    "number": "NUMBER",
+    "integer": "INTEGER",
+    "boolean": "BOOLEAN",
+    "array": "ARRAY",
+    "object": "OBJECT",
+}
+
+
+def default_cache_path() -> Path:
+    """Location of the on-disk catalog (``MCP_TOOL_CACHE`` overrides it)."""
+    override = os.getenv("MCP_TOOL_CACHE")
+    if override:
+        return Path(override)
+    cache_home = os.getenv("XDG_CACHE_HOME") or os.path.join(Path.home(), ".cache")
+    return Path(cache_home) / "mcp-surf-demo" / "tool_catalog.json"
+
+
+def schema_hash(tools: List[Tool]) -> str:
+    """Stable hash over tool names, descriptions and input schemas."""
+    payload = [
+        {"name": tool.name, "description": tool.description, "inputSchema": tool.inputSchema}
+        for tool in sorted(tools, key=lambda t: t.name)
+    ]
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def sanitize_schema(schema: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Reduce a JSON schema to the fields Gemini's ``Schema`` proto accepts.
+
+    Drops keywords such as ``$schema``, ``additionalProperties`` and
+    ``default``, collapses ``anyOf``/``oneOf`` and ``["T", "null"]`` unions to
+    a single nullable type, and returns ``None`` for empty object schemas,
+    which Gemini rejects as function parameters.
+    """
+    if not isinstance(schema, dict):
+        return None
+
+    nullable = False
+    for union_key in ("anyOf", "oneOf"):
+        if union_key in schema:
+            options = [option for option in schema[union_key] if option.get("type") != "null"]
+            nullable = len(options) < len(schema[union_key])
+            merged = {k: v for k, v in schema.items() if k != union_key}
+            schema = {**(options[0] if options else {}), **merged}
+
+    json_type = schema.get("type", "object" if "properties" in schema else "string")
+    if isinstance(json_type, list):
+        non_null = [t for t in json_type if t != "null"]
+        nullable = nullable or len(non_null) < len(json_type)
+        json_type = non_null[0] if non_null else "string"
+
+    result: Dict[str, Any] = {"type_": _GEMINI_TYPES.get(json_type, "STRING")}
+    if schema.get("description"):
+        result["description"] = schema["description"]
+    if nullable or schema.get("nullable"):
+        result["nullable"] = True
+    if "enum" in schema and json_type == "string":
+        result["enum"] = [str(value) for value in schema["enum"]]
+        result["format_"] = "enum"
+
+    if json_type == "object":
+        properties = {}
+        for name, prop in (schema.get("properties") or {}).items():
+            converted = sanitize_schema(prop)
+            if converted is not None:
+                properties[name] = converted
+        if not properties:
+            return None
+        result["properties"] = properties
+        required = [name for name in schema.get("required", []) if name in properties]
+        if required:
+            result["required"] = required
+    elif json_type == "array":
+        result["items"] = sanitize_schema(schema.get("items") or {"type": "string"}) or {"type_": "STRING"}
+
+    return result
+
+
+class ToolCatalog:
+    """Tool list for one MCP server, backed by an on-disk cache.
+
+    Usage::
+
+        catalog = ToolCatalog("npx @browserbasehq/mcp")
+        await catalog.ensure(session, server_version)   # no-op on a warm cache
+        response = await chat.send_message_async(message, tools=catalog.gemini_tools)
+
+    ``local_tools`` are declared to Gemini alongside the server's tools but
+    are answered by the client itself (e.g. ``get_more`` for paging through
+    truncated results); they are never cached or sent to the server.
+    """
+
+    def __init__(self, server_key: str, cache_path: Optional[Path] = None, local_tools: Optional[List[Tool]] = None):
+        self.server_key = server_key
+        self.cache_path = cache_path or default_cache_path()
+        self.local_tools: List[Tool] = list(local_tools or [])
+        self.tools: List[Tool] = []
+        self.server_version: Optional[str] = None
+        self.schema_hash: Optional[str] = None
+        self.stale = True
+        self._invalidated = False
+        self.cache_hits = 0
+        self.refreshes = 0
+
+        self._gemini_tools: Optional[List[Any]] = None
+        self._gemini_tools_hash: Optional[str] = None
+        self._lock = asyncio.Lock()
+
+    def _entry_key(self, server_version: Optional[str]) -> str:
+        return f"{self.server_key}@{server_version or 'unknown'}"
+
+    def _read_cache(self) -> Dict[str, Any]:
+        try:
+            return json.loads(self.cache_path.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def _write_cache(self) -> None:
+        cache = self._read_cache()
+        cache[self._entry_key(self.server_version)] = {
+            "schema_hash": self.schema_hash,
+            "tools": [tool.model_dump(mode="json", exclude_none=True) for tool in self.tools],
+        }
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.cache_path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(cache, indent=2))
+            tmp_path.replace(self.cache_path)
+        except OSError:
+            # The cache is an optimization; an unwritable cache dir is not fatal.
+            pass
+
+    def load_cached(self, server_version: Optional[str]) -> bool:
+        """Load the catalog for ``server_version`` from disk if it is intact."""
+        entry = self._read_cache().get(self._entry_key(server_version))
+        if not entry:
+            return False
+        try:
+            tools = [Tool.model_validate(tool) for tool in entry["tools"]]
+        except (KeyError, ValueError):
+            return False
+        if schema_hash(tools) != entry.get("schema_hash"):
+            return False
+        self.set_tools(tools, server_version)
+        self.cache_hits += 1
+        return True
+
+    async def refresh(self, session: ClientSession, server_version: Optional[str]) -> None:
+        """Re-list tools from the server and persist them."""
+        with tracer.span("mcp.list_tools") as span:
+            tools_response = await session.list_tools()
+            span.set_attribute("mcp.tool_count", len(tools_response.tools))
+        self.set_tools(tools_response.tools, server_version)
+        self.refreshes += 1
+        self._write_cache()
+
+    async def ensure(self, session: ClientSession, server_version: Optional[str]) -> List[Tool]:
+        """Make sure the catalog matches the server, listing tools only when needed."""
+        async with self._lock:
+            if not self.stale and self.server_version == server_version:
+                return self.tools
+            if not self._invalidated and self.load_cached(server_version):
+                return self.tools
+            await self.refresh(session, server_version)
+            return self.tools
+
+    def invalidate(self) -> None:
+        """Force the next :meth:`ensure` to re-list tools from the server."""
+        self.stale = True
+        self._invalidated = True
+
+    async def handle_message(self, message: Any) -> None:
+        """``ClientSession`` message handler that reacts to ``tools/list_changed``."""
+        if isinstance(message, ServerNotification) and isinstance(message.root, ToolListChangedNotification):
+            self.invalidate()
+
+    def set_tools(self, tools: List[Tool], server_version: Optional[str]) -> None:
+        """Replace the catalog contents in memory (without touching the disk cache)."""
+        self.tools = list(tools)
+        self.server_version = server_version
+        self.schema_hash = schema_hash(self.tools)
+        self.stale = False
+        self._invalidated = False
+
+    @property
+    def gemini_tools(self) -> List[Any]:
+        """Gemini ``Tool`` objects for the current catalog, built once per schema hash."""
+        if self._gemini_tools is None or self._gemini_tools_hash != self.schema_hash:
+            self._gemini_tools = self._build_gemini_tools()
+            self._gemini_tools_hash = self.schema_hash
+        return self._gemini_tools
+
+    def _build_gemini_tools(self) -> List[Any]:
+        import google.generativeai as genai
+
+        declarations = []
+        for tool in [*self.tools, *self.local_tools]:
+            declaration = genai.protos.FunctionDeclaration(
+                name=tool.name,
+                description=tool.description or "",
+            )
+            parameters = sanitize_schema(tool.inputSchema or {})
+            if parameters is not None:
+                declaration.parameters = genai.protos.Schema(parameters)
+            declarations.append(declaration)
+        if not declarations:
+            return []
+        return [genai.protos.Tool(function_declarations=declarations)]
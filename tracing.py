@@ -0,0 +1,195 @@
+"""
+Lightweight, OpenTelemetry-compatible tracing.
+
+Spans nest through a context variable, so a span opened inside a chat turn
+(or inside a task created during it) becomes a child of the turn.  Finished
+spans are handed to a pluggable exporter; the built-in
+:class:`JsonLinesExporter` writes one OTLP-shaped JSON object per line and
+needs no dependencies.  Set ``MCP_SURF_TRACE_FILE`` to enable it, or install
+any object with ``export(span)`` / ``shutdown()`` via :func:`set_exporter`.
+
+With no exporter configured, :meth:`Tracer.span` returns a shared no-op span
+and costs next to nothing.
+
+Usage::
+
+    with tracer.span("mcp.call_tool", {"tool.name": name}) as span:
+        result = await session.call_tool(name, arguments)
+        span.set_attribute("response.bytes", size)
+"""
+
+import contextvars
+import json
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Protocol
+
+
+@dataclass
+class Span:
+    """A timed operation with attributes, shaped like an OTLP span."""
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_span_id: Optional[str] = None
+    start_time_unix_nano: int = 0
+    end_time_unix_nano: int = 0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    status_code: str = "UNSET"
+    status_message: str = ""
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> None:
+        self.attributes.update(attributes)
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_time_unix_nano - self.start_time_unix_nano) / 1e6
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_span_id,
+            "name": self.name,
+            "startTimeUnixNano": self.start_time_unix_nano,
+            "endTimeUnixNano": self.end_time_unix_nano,
+            "durationMs": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "status": {"code": self.status_code, "message": self.status_message},
+        }
+
+
+class _NoopSpan:
+    """Stand-in returned while tracing is disabled."""
+
+    name = ""
+    attributes: Dict[str, Any] = {}
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class SpanExporter(Protocol):
+    """Anything that can receive finished spans."""
+
+    def export(self, span: Span) -> None: ...
+
+    def shutdown(self) -> None: ...
+
+
+class JsonLinesExporter:
+    """Append each finished span to a file as one JSON object per line."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "a", buffering=1)
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+class InMemoryExporter:
+    """Keep finished spans in a list (handy in tests and benchmarks)."""
+
+    def __init__(self):
+        self.spans: List[Span] = []
+
+    def export(self, span: Span) -> None:
+        self.spans.append(span)
+
+    def shutdown(self) -> None:
+        pass
+
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+
+class Tracer:
+    """Creates nested spans and sends them to the configured exporter."""
+
+    def __init__(self, exporter: Optional[SpanExporter] = None):
+        self.exporter = exporter
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    @contextmanager
+    def span(self, name: str, attributes: Optional[Dict[str, Any]] = None, activate: bool = True) -> Iterator[Any]:
+        """Time the enclosed block as a span.
+
+        With ``activate=False`` the span does not become the parent of spans
+        opened inside the block; use it for leaf spans that wrap a ``yield``
+        in an async generator, where the consumer's code would otherwise run
+        "inside" the span.
+        """
+        exporter = self.exporter
+        if exporter is None:
+            yield NOOP_SPAN
+            return
+
+        parent = _current_span.get()
+        span = Span(
+            name=name,
+            trace_id=parent.trace_id if parent else secrets.token_hex(16),
+            span_id=secrets.token_hex(8),
+            parent_span_id=parent.span_id if parent else None,
+            start_time_unix_nano=time.time_ns(),
+            attributes=dict(attributes or {}),
+        )
+        token = _current_span.set(span) if activate else None
+        try:
+            yield span
+            if span.status_code == "UNSET":
+                span.status_code = "OK"
+        except BaseException as e:
+            span.status_code = "ERROR"
+            span.status_message = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.end_time_unix_nano = time.time_ns()
+            if token is not None:
+                try:
+                    _current_span.reset(token)
+                except ValueError:
+                    # An async generator finalized from another context
+                    pass
+            exporter.export(span)
+
+
+tracer = Tracer()
+
+
+def set_exporter(exporter: Optional[SpanExporter]) -> None:
+    """Install (or with ``None``, remove) the exporter for the global tracer."""
+    if tracer.exporter is not None:
+        tracer.exporter.shutdown()
+    tracer.exporter = exporter
+
+
+def configure_from_env() -> None:
+    """Enable JSON-lines export when ``MCP_SURF_TRACE_FILE`` is set."""
+    path = os.getenv("MCP_SURF_TRACE_FILE")
+    if path and tracer.exporter is None:
+        set_exporter(JsonLinesExporter(path))